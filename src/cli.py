@@ -4,10 +4,42 @@ from dateutil import tz
 import time
 import os
 import hashlib
+import json
+import shutil
+import signal
+import sqlite3
+import threading
+from concurrent.futures import as_completed, wait
+from pathlib import Path
 
+import typer
 
 from config import settings
+from pdf_ingestion.diskqueue import DiskQueue
+from pdf_ingestion.dispatcher import Dispatcher
+from pdf_ingestion.bench import CASES, baseline_path, compare, load_baseline, run_benchmarks, save_baseline
+from pdf_ingestion.breaker import CLOSED, HALF_OPEN, OPEN, parser_breaker
+from pdf_ingestion.changefeed import FeedOffset, feed_dir, read_feed
+from pdf_ingestion.errors import JobDeferred, ParserUnavailable
+from pdf_ingestion.journal import journal
+from pdf_ingestion.layout import expand, locate as locate_job
+from pdf_ingestion.ledger import ledger
+from pdf_ingestion.manifest import ManifestProgress, Throughput, iter_manifest
 from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.optimize import optimizer_pool
+from pdf_ingestion.pipeline import StagePipeline
+from pdf_ingestion.poller import ParsePoller
+from pdf_ingestion.prescan import prescan_cache
+from pdf_ingestion.profiling import MODES, run_profiler
+from pdf_ingestion.reprocess import plan_reprocess
+from pdf_ingestion.retries import RELEASED, append_job_row, retry_schedule
+from pdf_ingestion.search import search_index
+from pdf_ingestion.sinks import output_sink
+from pdf_ingestion.sources import DeficitRoundRobin, InboxFile, SourceMetrics, inbox_sources
+from pdf_ingestion.tiers import tier_policy
+from pdf_ingestion.trace import TraceRecord, read_traces, replay as replay_traces, trace_recorder
+from pdf_ingestion.workerpool import parser_pool
+from pdf_ingestion.writers import atomic_write_text
 from utils.context import RunContext
 from utils.logger import json_setup_logger
 
@@ -24,65 +56,103 @@ class PdfExtractCli:
     def __init__(self):
         self.logger = _logger 
         self._inbox = CFG['input']['dir']
+        self._sources = inbox_sources(CFG)
+        fair_share = CFG.get('fair_share', {})
+        self._quantum = fair_share.get('quantum_pages', 10)
+        self._rescan_s = fair_share.get('rescan_interval_s', 10)
+        self._metrics = SourceMetrics()
+        # Files found in the inboxes wait in a DiskQueue per source; at most
+        # [queue].window of them per source are held in the scheduler
+        self._queues = None
+        self._queue_window = CFG.get('queue', {}).get('window', 64)
+        # Deferred files taken off a work queue before their not_before time;
+        # they are not dispatched again until it passes (next cycle at the earliest)
+        self._defer_s = CFG.get('queue', {}).get('defer_s', 30.0)
+        self._held = []
+        self._scheduler = DeficitRoundRobin({source.name: source.weight for source in self._sources}, self._quantum)
+        self._futures = set()
+        # With [degradation].enabled, files are parsed at a lower tier while
+        # the backlog is deep or old
+        self._tiers = tier_policy()
+        # Start the parser and optimizer worker processes (if any) before the first job
+        parser_pool()
+        optimizer_pool()
         self._output_jsonl = CFG['output']['jsonl_dir']
         self._output_markdown = CFG['output']['markdown_dir']
         self._processed = CFG['processed']['dir']
         self._quarantine = CFG['quarantine']['dir']
         self._job_file = CFG['job']['job_file']
+        self._dispatcher = Dispatcher(
+            max_workers=CFG['concurrency']['max_workers'],
+            max_inflight_bytes=CFG['concurrency'].get('max_inflight_bytes', 0),
+            memory_multiplier=CFG['concurrency'].get('memory_multiplier', 1.0))
+        # Set on SIGTERM: no new jobs are dispatched. _stop is set once the
+        # drain timeout expires and makes in-flight jobs stop at their next
+        # stage boundary, leaving a checkpoint to resume from.
+        self._draining = threading.Event()
+        self._stop = threading.Event()
+        # With [llamaparse].submit_poll, files whose parse job is outstanding
+        # stay in the inbox until collected; they are not dispatched again
+        self._submit_poll = CFG['llamaparse'].get('submit_poll', False)
+        self._poller = None
+        # With [pipeline].enabled, files flow through a StagePipeline with a
+        # queue and workers per stage instead of one worker per file
+        self._pipeline_enabled = CFG.get('pipeline', {}).get('enabled', False)
+        self._pipeline = None
+        # Inbox files dispatched while the parser circuit was half-open and
+        # not finished yet; no more than half_open_probes are sent at once
+        self._probes = set()
+        # Inbox files dispatched and not finished yet, by path
+        self._in_progress = {}
+        self._in_progress_lock = threading.Lock()
 
+        self._cycle = 0
         self._utc_now = _UTC_FROM_LOCAL
         self._local_now = _LOCAL_NOW
         print(self._utc_now, self._local_now)
 
     
     def run(self):
+        # Cycles are profiled under the process run id, jobs under their own
+        self._cycle += 1
+        with run_profiler().capture(_RUN_ID, f"cycle-{self._cycle:05d}", sampled=False):
+            self._run_cycle()
+
+    def _run_cycle(self):
         try:
             self.logger.info("Starting PDF extraction workflow", extra={"datetime": self._utc_now})
 
-            # Create PdfExtractModel with run context
-            from pdf_ingestion.ingest import ingest
-
-            ## Check self._inbox folder for any files
-            ## if inbox not empty, get the entire file list
+            ## Queue the files that arrived in any inbox source, then
+            ## dispatch everything queued, including files left by a crash
+            self._release_retries()
             self.logger.info("Checking inbox for any files", extra={"datetime": self._utc_now})
-            if os.listdir(self._inbox):
-                file_list = os.listdir(self._inbox)
-                self.logger.info("Number of files found: {len(file_list)}", extra={"datetime": self._utc_now})
-
-                ## For each file in the list, perform the ingestion process
-                for file in file_list:
-                    run_id = RunContext.create(length=20, dry_run=False, verbose=False).run_id
-                    
-                    self.logger.info("Performing ingestion process for file: %s", file, extra={"run_id": run_id})
-
-                    ## create file name based on jsonl_file_format
-                    ## TODO: concatinate utc datetime to file name
-                    jsonl_file_name = CFG['output']['jsonl_file_format'].format(stem=file, cuid=run_id)
-                    markdown_file_name = CFG['output']['markdown_file_format'].format(stem=file, cuid=run_id)
-
-                    print(jsonl_file_name)
-                    print(markdown_file_name)
-
-                    ## Create model with proper file paths based on configuration
-                    req = PdfIngestionRequest(
-                        PdfInput=file,
-                        JsonOutput=jsonl_file_name,
-                        MarkdownOutput=markdown_file_name)
-                    
-                    ingestor = ingest(run_id)
-                    
-                    ## Run the extraction workflow
-                    ingestor.run(req)
-
-                self.logger.info("PDFExtractor initialized, starting extraction", 
-                            extra={"run_id": run_id})
-                
-                # Run the extraction workflow
-                #extractor.run()
-                
+            spooled = self._spool()
+            backlog = self._backlog()
+            if any(backlog.values()):
+                self.logger.info("Number of files queued: %d", sum(backlog.values()),
+                                 extra={"datetime": self._utc_now, "new": spooled, "sources": backlog})
+
+                self._dispatch()
+
+                ## Files held back by an open parser circuit stay queued.
+                ## If a probe closed the circuit during this cycle, send them
+                ## straight away instead of waiting for the next cycle.
+                held = sum(self._backlog().values())
+                if held and parser_breaker().state == CLOSED and not self._draining.is_set():
+                    self.logger.info("Parser circuit closed, dispatching held files",
+                                     extra={"datetime": self._utc_now, "held": held})
+                    self._dispatch()
+
+                self._flush_index()
+                self.logger.info("Inbox source metrics",
+                                 extra={"datetime": self._utc_now, "sources": self._metrics.snapshot()})
+                if self._pipeline is not None:
+                    self.logger.info("Stage pipeline status",
+                                     extra={"datetime": self._utc_now, "in_flight": self._pipeline.in_flight,
+                                            "stages": self._pipeline.stats()})
+
             else:
                 self.logger.info("Inbox is empty", extra={"datetime": self._utc_now})
-                file_list = []
 
             self.logger.info("PDF extraction workflow completed successfully", extra={"datetime": self._utc_now})
 
@@ -92,18 +162,626 @@ class PdfExtractCli:
                            extra={"datetime": self._utc_now, "error": str(e), "error_type": type(e).__name__})
             raise
 
-def main():
+    def _release_retries(self):
+        """Move quarantined files whose retry is due back to the inbox they came from."""
+        if not CFG.get('retry_queue', {}).get('enabled', True):
+            return
+        schedule = retry_schedule()
+        quarantine = Path(self._quarantine)
+        for entry in schedule.pop_due():
+            quarantined = quarantine / entry.file_name
+            target = Path(entry.inbox) / entry.file_name
+            if not quarantined.exists():
+                continue  # already moved by hand
+            if target.exists():
+                # A file of the same name is in the inbox; try again next cycle
+                schedule.defer(entry.key, self._rescan_s)
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(quarantined), str(target))
+            quarantined.with_name(f"{quarantined.name}.reason.txt").unlink(missing_ok=True)
+            append_job_row(Path(self._job_file), job_name=entry.file_name, status=RELEASED,
+                           retries=entry.attempts, input_file=str(target), quarantine_file=str(quarantined))
+            self.logger.info("Quarantined file released for retry: %s", entry.file_name,
+                             extra={"datetime": self._utc_now, "attempt": entry.attempts,
+                                    "max_retries": schedule.max_retries, "error": entry.error})
+
+    def _scan(self):
+        """List the files waiting in every inbox source."""
+        file_list = [file for source in self._sources for file in source.list_files()]
+        if CFG.get('prescan', {}).get('enabled', True):
+            file_list = self._schedule(file_list)
+        return file_list
+
+    def _work_queues(self):
+        if self._queues is None:
+            queue = CFG.get('queue', {})
+            root = Path(CFG['state']['dir']) / "queue"
+            self._queues = {
+                source.name: DiskQueue(root / source.name,
+                                       segment_bytes=queue.get('segment_bytes', 4 * 1024 * 1024),
+                                       fsync=queue.get('fsync', False))
+                for source in self._sources}
+        return self._queues
+
+    def _spool(self):
+        """Queue the files found in the inboxes and move them to their source's spool directory.
+
+        A file is queued before it is moved, so if the process dies in
+        between the file is found in the inbox again and the first entry is
+        skipped as stale when it is dequeued. Returns the number queued.
+        """
+        queues = self._work_queues()
+        spooled = 0
+        for file in self._scan():
+            target = file.source.spool_dir / file.name
+            if target.exists():
+                continue  # a file with this name is still queued; take this one after it
+            # Arrival is when the watcher first queues the file, not its mtime
+            file.arrived_at = time.time()
+            queues[file.source.name].put(file.record())
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.rename(file.path, target)
+            except FileNotFoundError:
+                continue
+            spooled += 1
+        return spooled
+
+    def _backlog(self):
+        """Files queued and not yet dispatched, per source."""
+        queues = self._work_queues()
+        held = [file.source.name for file in self._held]
+        return {source.name: len(queues[source.name]) + self._scheduler.pending(source.name) + held.count(source.name)
+                for source in self._sources}
+
+    def _refill(self):
+        """Top up each source in the scheduler to ``window`` files from its work queue.
+
+        Deferred files whose ``not_before`` time has not come are held
+        aside, so a dispatch pass never picks up a file it just deferred.
+        """
+        now = time.time()
+        due = [file for file in self._held if file.not_before <= now]
+        self._held = [file for file in self._held if file.not_before > now]
+        for file in due:
+            self._scheduler.push(file.source.name, file, file.cost)
+        for source in self._sources:
+            queue = self._work_queues()[source.name]
+            while self._scheduler.pending(source.name) < self._queue_window:
+                entry = queue.get()
+                if entry is None:
+                    break
+                receipt, record = entry
+                file = InboxFile.from_record(source, record, receipt)
+                if not file.path.exists():
+                    # Finished before a restart lost the ack, or never moved
+                    queue.ack(receipt)
+                    continue
+                if file.not_before > now:
+                    self._held.append(file)
+                    continue
+                self._scheduler.push(source.name, file, file.cost)
+
+    def _dispatch(self):
+        """Dispatch queued files to the worker pool until the work queues are empty.
+
+        Files are taken from the sources in weighted deficit-round-robin
+        order, and the inboxes are rescanned every ``rescan_interval_s`` so
+        files arriving during a long dispatch get their share too.
+        Dispatch blocks while the worker slots or the byte budget of
+        in-flight jobs are exhausted, and stops while the parser circuit is
+        open or a drain is in progress, leaving the rest queued.
+        """
+        scanned_at = time.monotonic()
+        self._refill()
+        while len(self._scheduler):
+            if self._draining.is_set():
+                self.logger.info("Draining, not dispatching remaining files",
+                                 extra={"datetime": self._utc_now, "skipped": sum(self._backlog().values())})
+                break
+            state = parser_breaker().state
+            with self._in_progress_lock:
+                probing = len(self._probes)
+            if _parser_held(state, probing):
+                self.logger.warning("Parser circuit %s, holding remaining files", state,
+                                    extra={"datetime": self._utc_now, "held": sum(self._backlog().values()),
+                                           "probes": probing,
+                                           "retry_after_s": round(parser_breaker().retry_after(), 1)})
+                break
+            _, file = self._scheduler.pop()
+            if state == HALF_OPEN:
+                with self._in_progress_lock:
+                    self._probes.add(file.key)
+            file.tier = self._select_tier(file)
+            run_id = RunContext.create(length=20, dry_run=False, verbose=False).run_id
+            self._metrics.dispatched(file)
+            if self._pipeline_enabled:
+                self._enqueue(file, run_id)
+            else:
+                future = self._dispatcher.submit(self._process, file.size_bytes, file, run_id)
+                with self._in_progress_lock:
+                    self._futures.add(future)
+                future.add_done_callback(lambda f, file=file: self._process_done(file, f))
+            if time.monotonic() - scanned_at >= self._rescan_s:
+                self._spool()
+                scanned_at = time.monotonic()
+            self._refill()
+
+        with self._in_progress_lock:
+            futures = list(self._futures)
+        wait(futures)
+
+    def _select_tier(self, file):
+        """Degradation tier for ``file`` from the backlog behind it and how long it waited."""
+        if self._tiers is None:
+            return None
+        previous = self._tiers.tier
+        tier = self._tiers.select(sum(self._backlog().values()), time.time() - file.arrived_at)
+        if tier != previous:
+            self.logger.warning("Degradation tier changed from %s to %s", previous, tier,
+                                extra={"datetime": self._utc_now, "backlog": sum(self._backlog().values()),
+                                       "age_s": round(time.time() - file.arrived_at, 1)})
+        return tier
+
+    def _process_done(self, file, future):
+        with self._in_progress_lock:
+            self._futures.discard(future)
+        error = future.exception()
+        if error is not None or future.result() is None:
+            # A tracked parse job (result is its id) is reported by _collected
+            self._finished(file, error)
+
+    def _finished(self, file, error):
+        if error is None:
+            outcome = "done"
+        elif isinstance(error, JobDeferred):
+            outcome = "deferred"
+        else:
+            outcome = "failed"
+        with self._in_progress_lock:
+            self._probes.discard(file.key)
+        self._metrics.finished(file, outcome)
+        self._log_outcome(file.key, error)
+        self._trace(file, outcome)
+        queue = self._work_queues()[file.source.name]
+        if outcome == "deferred":
+            # The file stays in the spool directory with its checkpoint; it is
+            # queued again, but not dispatched again in this pass
+            file.not_before = time.time() + self._defer_s
+            queue.put(file.record())
+        queue.ack(file.receipt)
+
+    def _trace(self, file, outcome):
+        recorder = trace_recorder()
+        if recorder is None:
+            return
+        recorder.record(TraceRecord(
+            name=file.name, source=file.source.name, arrived_at=file.arrived_at,
+            dispatched_at=file.dispatched_at or file.arrived_at, finished_at=time.time(),
+            size_bytes=file.size_bytes, pages=file.pages, parse_s=file.parse_s, outcome=outcome, tier=file.tier,
+            held_s=file.held_s, poll_s=file.poll_s))
+
+    def _log_outcome(self, file, error):
+        if isinstance(error, JobDeferred):
+            self.logger.warning("Ingestion deferred for file: %s", file,
+                                extra={"datetime": self._utc_now, "error": str(error)})
+        elif error is not None:
+            self.logger.error("Ingestion failed for file: %s", file,
+                              extra={"datetime": self._utc_now,
+                                     "error": str(error),
+                                     "error_type": type(error).__name__})
+
+    def _request(self, file, run_id, source=None, output=None, tier=None):
+        ## create file name based on jsonl_file_format
+        output = output or CFG['output']
+        now = datetime.now(UTC)
+        jsonl_file_name = expand(output['jsonl_file_format'], file, run_id, now)
+        markdown_file_name = expand(output['markdown_file_format'], file, run_id, now)
+
+        ## Create model with proper file paths based on configuration
+        return PdfIngestionRequest(
+            PdfInput=source or file,
+            JsonOutput=jsonl_file_name,
+            MarkdownOutput=markdown_file_name,
+            Tier=tier)
+
+    def _inbox_request(self, file, run_id):
+        return self._request(file.name, run_id, source=file.key, output=file.source.output, tier=file.tier)
+
+    def _enqueue(self, file, run_id):
+        """Send a file through the stage pipeline; blocks while its entry queue is full."""
+        from pdf_ingestion.ingest import ingest
+
+        self.logger.info("Queueing file for the stage pipeline: %s", file.key,
+                         extra={"run_id": run_id, "source": file.source.name})
+        ingestor = ingest(run_id)
+        pipeline = self._stage_pipeline(ingestor.parser)
+        with self._in_progress_lock:
+            self._in_progress[file.key] = file
+        ingestor.enqueue(pipeline, self._inbox_request(file, run_id), stop_event=self._stop)
+
+    def _stage_pipeline(self, parser):
+        with self._in_progress_lock:
+            if self._pipeline is None:
+                self._pipeline = self._new_stage_pipeline(parser, self._pipeline_done, self._pipeline_error)
+            return self._pipeline
+
+    def _new_stage_pipeline(self, parser, on_done, on_error):
+        from pdf_ingestion.ingest import stage_graph
+
+        poller = self._parse_poller(parser) if self._submit_poll else None
+        pipeline = None
+
+        def resolve(*args):
+            pipeline.resolve(*args)
+
+        pipeline = StagePipeline(stage_graph(poller, resolve=resolve), on_done=on_done, on_error=on_error)
+        return pipeline
+
+    def _pipeline_done(self, job):
+        with self._in_progress_lock:
+            file = self._in_progress.pop(job.req.PdfInput)
+        _copy_timings(file, job)
+        self._finished(file, None)
+
+    def _pipeline_error(self, job, error):
+        job.fail(error)
+        with self._in_progress_lock:
+            file = self._in_progress.pop(job.req.PdfInput)
+        _copy_timings(file, job)
+        self._finished(file, error)
+
+    def ingest_once(self, manifest, progress_interval=5.0):
+        """Ingest every file listed in ``manifest`` in place through the stage pipeline.
+
+        Entries finished by an earlier, interrupted run of the same manifest
+        are skipped. Live throughput goes to stderr every
+        ``progress_interval`` seconds.
+        """
+        with run_profiler().capture(_RUN_ID, "ingest-once", sampled=False):
+            self._ingest_manifest(manifest, progress_interval)
+
+    def _ingest_manifest(self, manifest, progress_interval):
+        from pdf_ingestion.ingest import ingest
+
+        progress = ManifestProgress.for_manifest(manifest)
+        meter = Throughput()
+        numbers = {}
+        # Entries submitted while the parser circuit was half-open
+        probes = set()
+        pipeline = None
+
+        def entry_done(job):
+            with self._in_progress_lock:
+                number = numbers.pop(id(job))
+                probes.discard(id(job))
+            progress.mark(number)
+            meter.add("done")
+
+        def entry_failed(job, error):
+            job.fail(error)
+            with self._in_progress_lock:
+                number = numbers.pop(id(job))
+                probes.discard(id(job))
+            if isinstance(error, JobDeferred):
+                # Pending, so the watermark moves on and the next run of this
+                # manifest retries it
+                progress.defer(number)
+                meter.add("deferred")
+            else:
+                progress.mark(number, failed=True)
+                meter.add("failed")
+            self._log_outcome(job.req.PdfInput, error)
+
+        reporting = threading.Event()
+
+        def report():
+            while not reporting.wait(progress_interval):
+                typer.echo(f"\r{meter.summary(pipeline.in_flight if pipeline else 0)}", err=True, nl=False)
+
+        reporter = threading.Thread(target=report, name="throughput", daemon=True)
+        reporter.start()
+        self.logger.info("Manifest ingest starting",
+                         extra={"datetime": self._utc_now, "manifest": str(manifest),
+                                "resume_watermark": progress.watermark})
+        try:
+            for entry in iter_manifest(manifest):
+                if self._draining.is_set():
+                    break
+                if progress.is_done(entry.number):
+                    meter.add("skipped")
+                    continue
+                if not entry.path.is_file():
+                    self.logger.error("Manifest entry not found: %s", entry.path,
+                                      extra={"datetime": self._utc_now, "entry": entry.number})
+                    progress.mark(entry.number, failed=True)
+                    meter.add("failed")
+                    continue
+                ## Hold the backfill while the parser circuit is open, and
+                ## while half-open once the probes are out
+                while _parser_held(parser_breaker().state, len(probes)) and not self._draining.is_set():
+                    self._draining.wait(max(parser_breaker().retry_after(), 1.0))
+                run_id = RunContext.create(length=20, dry_run=False, verbose=False).run_id
+                ingestor = ingest(run_id)
+                if pipeline is None:
+                    pipeline = self._new_stage_pipeline(ingestor.parser, entry_done, entry_failed)
+                with self._in_progress_lock:
+                    numbers[id(ingestor)] = entry.number
+                    if parser_breaker().state == HALF_OPEN:
+                        probes.add(id(ingestor))
+                ingestor.enqueue(pipeline, self._request(entry.path.name, run_id, source=str(entry.path)),
+                                 stop_event=self._stop, in_place=True)
+
+            if pipeline is not None:
+                while not pipeline.join(timeout=1) and not self._stop.is_set():
+                    pass
+        finally:
+            reporting.set()
+            if self._poller is not None:
+                self._poller.stop()
+            if pipeline is not None:
+                pipeline.close()
+            self._flush_index()
+            output_sink().close()
+            self._close_worker_pools()
+            progress.flush()
+            typer.echo(f"\r{meter.summary()}", err=True)
+            self.logger.info("Manifest ingest finished",
+                             extra={"datetime": self._utc_now, "manifest": str(manifest),
+                                    "done": meter.done, "failed": meter.failed,
+                                    "deferred": meter.deferred, "skipped": meter.skipped,
+                                    "docs_per_s": round(meter.rate(), 2)})
+
+    def _process(self, file, run_id):
+        from pdf_ingestion.ingest import ingest
+
+        self.logger.info("Performing ingestion process for file: %s", file.key,
+                         extra={"run_id": run_id, "source": file.source.name})
+
+        req = self._inbox_request(file, run_id)
+        ingestor = ingest(run_id)
+
+        ## Run the extraction workflow
+        if not self._submit_poll:
+            try:
+                ingestor.run(req, stop_event=self._stop)
+            finally:
+                _copy_timings(file, ingestor)
+            return None
+
+        ## Upload only; the poller collects the result and _collect runs
+        ## the remaining stages, so the worker is free while the job parses
+        poller = self._parse_poller(ingestor.parser)
+        poller.reserve()
+        try:
+            job_id = ingestor.start(req, stop_event=self._stop)
+        except BaseException:
+            poller.release()
+            raise
+        if job_id is None:
+            poller.release()
+            _copy_timings(file, ingestor)
+            return None
+        # The worker is released here until the poller hands the result back
+        file.held_s = max(0.0, time.time() - file.dispatched_at) if file.dispatched_at else 0.0
+        with self._in_progress_lock:
+            self._in_progress[file.key] = file
+        poller.track(job_id, lambda result, error: self._collect(file, ingestor, result, error))
+        return job_id
+
+    def _collect(self, file, ingestor, result, error):
+        # Runs on the poller's hand-off thread; the downstream stages go
+        # back through the dispatcher like any other work
+        future = self._dispatcher.submit(_held_while, file.size_bytes, file, ingestor.finish, result, error)
+        future.add_done_callback(lambda f: self._collected(file, ingestor, f))
+
+    def _collected(self, file, ingestor, future):
+        _copy_timings(file, ingestor)
+        with self._in_progress_lock:
+            self._in_progress.pop(file.key, None)
+        self._finished(file, future.exception())
+
+    def _parse_poller(self, parser):
+        with self._in_progress_lock:
+            if self._poller is None:
+                llamaparse = CFG['llamaparse']
+                self._poller = ParsePoller(
+                    base_url=parser.base_url,
+                    api_key=parser.api_key,
+                    poll_interval_s=llamaparse.get('poll_interval_s', 2.0),
+                    job_timeout_s=llamaparse.get('job_timeout_s', 1800.0),
+                    max_outstanding=llamaparse.get('max_outstanding_jobs', 200),
+                    concurrency=llamaparse.get('poll_concurrency', 16))
+            return self._poller
+
+    def shutdown(self):
+        """Wait for submitted parse jobs until the drain timeout, then stop.
+
+        Jobs still outstanding keep their job id in the checkpoint and are
+        collected again after a restart.
+        """
+        if self._pipeline is not None:
+            while not self._pipeline.join(timeout=1) and not self._stop.is_set():
+                pass
+        if self._poller is not None:
+            while self._poller.outstanding and not self._stop.is_set():
+                self._poller.wait_idle(timeout=1)
+            self._poller.stop()
+        if self._pipeline is not None:
+            self._pipeline.close()
+        self._dispatcher.shutdown(wait=True)
+        self._flush_index()
+        output_sink().close()
+        self._close_worker_pools()
+        for queue in (self._queues or {}).values():
+            queue.close()
+
+    def _close_worker_pools(self):
+        for pool in (parser_pool(), optimizer_pool()):
+            if pool is not None:
+                pool.close()
+
+    def resume(self):
+        """Finish checkpointed jobs whose input already left the inbox.
+
+        Jobs whose input is still in an inbox or queued resume through the
+        normal cycle; checkpoints whose files are gone entirely are dropped.
+        """
+        from pdf_ingestion.ingest import ingest
+
+        for checkpoint in journal().pending():
+            if checkpoint.in_place or any((folder / checkpoint.file_name).exists()
+                                          for source in self._sources
+                                          for folder in (source.dir, source.spool_dir)):
+                continue
+            if not checkpoint.processed_file or not Path(checkpoint.processed_file).exists():
+                self.logger.warning("Dropping checkpoint without input file: %s", checkpoint.file_name,
+                                    extra={"datetime": self._utc_now, "sha256": checkpoint.sha256})
+                journal().remove(checkpoint.key)
+                continue
+            run_id = RunContext.create(length=20, dry_run=False, verbose=False).run_id
+            try:
+                ingest(run_id).resume(checkpoint, stop_event=self._stop)
+            except Exception as e:
+                self.logger.error("Resume failed for file: %s", checkpoint.file_name,
+                                  extra={"datetime": self._utc_now, "error": str(e), "error_type": type(e).__name__})
+        self._flush_index()
+
+    @property
+    def draining(self):
+        return self._draining.is_set()
+
+    def drain(self, signum=None, frame=None):
+        """Signal handler: stop dispatching and give in-flight jobs time to finish."""
+        if self._draining.is_set():
+            return
+        timeout = CFG.get('shutdown', {}).get('drain_timeout_s', 300)
+        self.logger.info("Shutdown requested, draining in-flight jobs",
+                         extra={"datetime": self._utc_now, "signal": signum, "drain_timeout_s": timeout})
+        self._draining.set()
+        timer = threading.Timer(timeout, self._stop.set)
+        timer.daemon = True
+        timer.start()
+
+    def wait(self, seconds):
+        """Sleep until the next cycle, waking early when a drain starts."""
+        self._draining.wait(seconds)
+
+    def reprocess(self, force=False, dry_run=False, degraded=False):
+        plan = plan_reprocess(ledger(), force=force, degraded=degraded)
+        self.logger.info("Reprocess plan built", 
+                         extra={"datetime": self._utc_now, "entries": len(plan),
+                                "reparse": sum(item.reparse for item in plan)})
+        if dry_run:
+            for item in plan:
+                print(f"{item.entry['sha256'][:12]}  {item.entry.get('file_name', '')}  {','.join(sorted(item.stages))}")
+            return
+
+        futures = {}
+        for item in plan:
+            run_id = RunContext.create(length=20, dry_run=False, verbose=False).run_id
+            futures[self._dispatcher.submit(self._reprocess_one, item.size_bytes, item, run_id)] = item
+
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                self.logger.error("Reprocess failed for entry: %s", futures[future].entry['sha256'],
+                                  extra={"datetime": self._utc_now,
+                                         "error": str(future.exception()),
+                                         "error_type": type(future.exception()).__name__})
+        self._flush_index()
+
+    def _reprocess_one(self, item, run_id):
+        from pdf_ingestion.ingest import ingest
+
+        ingest(run_id).reprocess(item.entry, reparse=item.reparse)
+
+    def _flush_index(self):
+        if CFG.get('search', {}).get('enabled', True):
+            search_index().flush()
+
+    def _schedule(self, file_list):
+        """Order files smallest-first by prescanned page count and log the estimate.
+
+        The page counts are also each file's cost in the fair-share dispatch.
+        """
+        cache = prescan_cache()
+        for file in file_list:
+            try:
+                file.pages = cache.scan(file.path).page_count
+            except OSError:
+                file.pages = None
+            except Exception as e:
+                # One bad file must not stop the watcher; ingest quarantines it
+                self.logger.error("Prescan failed for file: %s", file.key,
+                                  extra={"datetime": self._utc_now,
+                                         "error": str(e),
+                                         "error_type": type(e).__name__})
+                file.pages = None
+        self.logger.info("Prescan estimate", 
+                         extra={"datetime": self._utc_now, "files": len(file_list),
+                                "estimated_pages": sum(f.pages or 0 for f in file_list)})
+        return sorted(file_list, key=lambda f: (f.pages is None, f.pages or 0))
+
+
+def _parser_held(state, probing):
+    """True while no more jobs should be sent: the circuit is open, or half-open with its probes out."""
+    return state == OPEN or (state == HALF_OPEN and probing >= parser_breaker().half_open_probes)
+
+
+def _copy_timings(file, ingestor):
+    """Carry the parse and poll times of a finished ``ingestor`` over to its inbox ``file``."""
+    file.parse_s = ingestor.parse_s
+    file.poll_s = ingestor.poll_s
+
+
+def _held_while(file, fn, *args):
+    """Run ``fn`` on a dispatcher worker, adding the time to ``file.held_s``."""
+    started = time.time()
+    try:
+        return fn(*args)
+    finally:
+        file.held_s = (file.held_s or 0.0) + time.time() - started
+
+
+app = typer.Typer(help="PDF ingestion pipeline", add_completion=False)
+
+
+def _profile_mode(value: str | None):
+    if value is not None and value not in MODES:
+        raise typer.BadParameter(f"must be one of: {', '.join(MODES)}")
+    return value
+
+
+_PROFILE_OPTION = typer.Option(None, "--profile", callback=_profile_mode,
+                               help="Profile cycles and jobs: 'cpu' (cProfile) or 'mem' (tracemalloc).")
+
+
+@app.callback(invoke_without_command=True)
+def _default(ctx: typer.Context, profile: str | None = _PROFILE_OPTION):
+    """Run the inbox watch loop when no subcommand is given."""
+    if ctx.invoked_subcommand is None:
+        watch(profile)
+
+
+@app.command()
+def watch(profile: str | None = _PROFILE_OPTION):
+    """Poll the inbox and ingest new files every cycle."""
     _logger.info(f"Extract CLI starting, App version: {CFG['version']['app_version']}", 
                extra={"app_version": CFG['version']['app_version']})
    
     try:
+        run_profiler(profile)
         cli = PdfExtractCli()
+        signal.signal(signal.SIGTERM, cli.drain)
+        cli.resume()
 
-        ## Loop until next cycle.
-        while True:
+        ## Loop until next cycle, or until SIGTERM drains the pipeline.
+        while not cli.draining:
             cli.run()
             print("Waiting for next cycle...")
-            time.sleep(10)
+            cli.wait(10)
+        cli.shutdown()
 
     except Exception as e:
         _logger.error("PDF Extract CLI failed", 
@@ -112,9 +790,140 @@ def main():
 
     _logger.info("Extract CLI completed successfully")
 
-if __name__ == "__main__":
-    main()
 
+@app.command()
+def reprocess(
+    force: bool = typer.Option(False, "--force", help="Re-parse every ledger entry regardless of fingerprints."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="List the entries and stages that would re-run."),
+    degraded: bool = typer.Option(False, "--degraded",
+                                  help="Only re-parse entries ingested below the base tier under load."),
+):
+    """Re-run only the stages whose recorded fingerprints differ from the current ones."""
+    PdfExtractCli().reprocess(force=force, dry_run=dry_run, degraded=degraded)
+
+
+@app.command("ingest-once")
+def ingest_once(
+    manifest: Path = typer.Option(..., "--manifest", exists=True, dir_okay=False,
+                                  help="CSV or JSONL manifest of PDF paths to ingest in place."),
+    progress_interval: float = typer.Option(5.0, "--progress-interval", help="Seconds between throughput lines."),
+    profile: str | None = _PROFILE_OPTION,
+):
+    """Ingest the files listed in a manifest once, resuming an interrupted run."""
+    run_profiler(profile)
+    cli = PdfExtractCli()
+    signal.signal(signal.SIGTERM, cli.drain)
+    cli.ingest_once(manifest, progress_interval=progress_interval)
+
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="FTS5 query, e.g. 'invoice AND \"account summary\"'."),
+    limit: int = typer.Option(20, "--limit", help="Maximum number of pages to return."),
+):
+    """Search indexed markdown pages."""
+    try:
+        hits = search_index().search(query, limit=limit)
+    except sqlite3.OperationalError as e:
+        # FTS5 reports a malformed query as an operational error
+        raise typer.BadParameter(str(e), param_hint="QUERY")
+    for hit in hits:
+        print(f"{hit.source}  p{hit.page}  {hit.sha256[:12]}  {hit.snippet}")
 
 
+@app.command()
+def locate(job_id: str = typer.Argument(..., help="Job id (cuid) of an ingestion run.")):
+    """Print the output and processed files of a job."""
+    processed = CFG['processed']
+    templates = {
+        "jsonl": CFG['output']['jsonl_file_format'],
+        "markdown": CFG['output']['markdown_file_format'],
+        "processed": str(Path(processed['dir']) / processed.get('subdir_format', '') / "{stem}"),
+    }
+    found = locate_job(job_id, templates, ledger().find_run(job_id))
+    if not any(found.values()):
+        print(f"No files found for job {job_id}")
+        raise typer.Exit(1)
+    for name, paths in found.items():
+        for path in paths:
+            print(f"{name}\t{path}")
 
+
+@app.command()
+def changes(
+    cursor: Path = typer.Option(None, "--cursor", dir_okay=False,
+                                help="File holding the offset to resume from; updated after printing."),
+    offset: str = typer.Option(None, "--from", help="Offset to read after, as printed by an earlier call."),
+    limit: int = typer.Option(None, "--limit", help="Maximum number of records to print."),
+):
+    """Print change feed records committed since an offset, one JSON line each."""
+    if offset is None and cursor is not None and cursor.exists():
+        offset = cursor.read_text()
+    try:
+        after = FeedOffset.parse(offset) if offset else None
+    except ValueError:
+        raise typer.BadParameter(f"not an offset: {offset!r}", param_hint="--from")
+    records, next_offset = read_feed(feed_dir(), after, limit=limit)
+    for record in records:
+        print(json.dumps(record, separators=(",", ":")))
+    if cursor is not None and next_offset is not None:
+        atomic_write_text(cursor, f"{next_offset}\n")
+    elif next_offset is not None:
+        typer.echo(f"next offset: {next_offset}", err=True)
+
+
+@app.command()
+def replay(
+    traces: list[Path] = typer.Argument(..., exists=True, dir_okay=False, help="Trace JSONL files to replay."),
+    workers: list[int] = typer.Option(None, "--workers",
+                                      help="Worker count to try; repeat to compare. Defaults to the configured one."),
+    speed: float = typer.Option(60.0, "--speed", help="How many times faster than recorded to replay."),
+):
+    """Replay recorded job traces against a parser stand-in at different worker counts."""
+    records = read_traces(traces)
+    concurrency = CFG['concurrency']
+    for count in workers or [concurrency['max_workers']]:
+        result = replay_traces(records, count, speed=speed,
+                               max_inflight_bytes=concurrency.get('max_inflight_bytes', 0),
+                               memory_multiplier=concurrency.get('memory_multiplier', 1.0))
+        print(f"workers={count}  jobs={result.jobs}  makespan={result.makespan_s}s  "
+              f"wait_p50={result.wait_p50_s}s  wait_p95={result.wait_p95_s}s  wait_max={result.wait_max_s}s  "
+              f"utilization={result.utilization:.0%}  jobs/h={result.jobs_per_hour:.1f}")
+
+
+@app.command()
+def bench(
+    only: list[str] = typer.Option(None, "--only", help=f"Case to run; repeat for several. One of: {', '.join(CASES)}."),
+    save: bool = typer.Option(False, "--save", help="Save the results as the new baseline."),
+    baseline: Path = typer.Option(None, "--baseline", dir_okay=False, help="Baseline file ([bench].baseline)."),
+    tolerance: float = typer.Option(None, "--tolerance", help="Allowed slowdown as a fraction ([bench].tolerance)."),
+):
+    """Time the CPU-side stages on synthetic input and fail on a regression against the baseline."""
+    bench_cfg = CFG.get('bench', {})
+    path = baseline or baseline_path()
+    tolerance = bench_cfg.get('tolerance', 0.25) if tolerance is None else tolerance
+    try:
+        results = run_benchmarks(only, repeat=bench_cfg.get('repeat', 5))
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--only")
+    previous = load_baseline(path) if path.exists() else {}
+    for name, seconds in results.items():
+        change = f"{seconds / previous[name] - 1:+.0%}" if previous.get(name) else "new"
+        print(f"{name:<24} {seconds * 1e6:>12.2f} us  {change}")
+    if save:
+        save_baseline(path, {**previous, **results})
+        print(f"Baseline saved to {path}")
+        return
+    regressions = compare(results, previous, tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression.name}: {regression.baseline_s * 1e6:.2f} us -> "
+              f"{regression.current_s * 1e6:.2f} us ({regression.ratio:.2f}x, tolerance {tolerance:.0%})")
+    if regressions:
+        raise typer.Exit(1)
+
+
+def main():
+    app()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Microbenchmarks of the CPU-side stages, with regression checks.
+
+Each case times one stage on a fixed synthetic corpus (seeded, so every
+run sees the same input): config loading, run id generation, a JSON log
+record, hashing, redaction, markdown-to-JSON conversion and the atomic
+output write. A case's result is the best per-call time over ``repeat``
+rounds of ``timeit``, which is the least noisy figure on a shared machine.
+
+``save_baseline`` records the results as JSON; ``compare`` reports every
+case more than ``tolerance`` (a fraction) slower than its baseline. The
+``bench`` command runs the suite and exits non-zero on a regression.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import platform
+import random
+import tempfile
+import timeit
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from config import settings
+from config.loader import reload_settings
+from pdf_ingestion.hashing import sha256_file
+from pdf_ingestion.mdjson import page_records
+from pdf_ingestion.redaction import redact
+from pdf_ingestion.writers import atomic_writer
+from utils.context import RunContext
+from utils.logger import json_setup_logger
+
+CFG = settings()
+
+SEED = 20240901
+CORPUS_PAGES = 200
+HASH_BYTES = 8 * 1024 * 1024
+
+_WORDS = ("account", "balance", "statement", "invoice", "total", "period", "payment", "due", "interest",
+          "transfer", "deposit", "summary", "customer", "reference", "amount", "charges", "fee", "date")
+
+
+def synthetic_pages(count: int = CORPUS_PAGES, seed: int = SEED) -> list[str]:
+    """Markdown pages shaped like parser output: headings, paragraphs, lists, tables and account numbers."""
+    rng = random.Random(seed)
+
+    def sentence():
+        words = rng.choices(_WORDS, k=rng.randint(8, 20))
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), "".join(rng.choices("0123456789", k=rng.randint(8, 16))))
+        return " ".join(words).capitalize() + "."
+
+    pages = []
+    for number in range(1, count + 1):
+        lines = [f"# Statement page {number}", ""]
+        for section in range(rng.randint(2, 4)):
+            lines += [f"## Section {section + 1}", "", " ".join(sentence() for _ in range(rng.randint(2, 5))), ""]
+            if rng.random() < 0.5:
+                lines += [f"- {sentence()}" for _ in range(rng.randint(2, 5))] + [""]
+            if rng.random() < 0.4:
+                lines += ["| Date | Description | Amount |", "| --- | --- | --- |"]
+                lines += [f"| 2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} | {rng.choice(_WORDS)} "
+                          f"| {rng.randint(1, 99999) / 100:.2f} |" for _ in range(rng.randint(3, 12))]
+                lines.append("")
+        pages.append("\n".join(lines))
+    return pages
+
+
+@dataclass
+class Regression:
+    """A case slower than its baseline by more than the tolerance."""
+
+    name: str
+    baseline_s: float
+    current_s: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_s / self.baseline_s
+
+
+def _config_settings(workdir: Path) -> Callable[[], object]:
+    return settings
+
+
+def _config_reload(workdir: Path) -> Callable[[], object]:
+    # Re-reads config.toml and the environment overrides, as a hot reload does
+    return reload_settings
+
+
+def _run_context(workdir: Path) -> Callable[[], object]:
+    return lambda: RunContext.create(length=20, dry_run=False, verbose=False)
+
+
+def _logging(workdir: Path) -> Callable[[], object]:
+    logger = json_setup_logger("bench", log_name="pdf_ingestion.bench", log_dir=str(workdir / "logs"))
+    # Time the file handler only; a console handler would measure the terminal
+    for handler in list(logger.handlers):
+        if not isinstance(handler, logging.FileHandler):
+            logger.removeHandler(handler)
+    logger.propagate = False
+    return lambda: logger.info("JSON output stored", extra={"run_id": "bench", "output": "bench.jsonl"})
+
+
+def _hashing(workdir: Path) -> Callable[[], object]:
+    path = workdir / "hash.bin"
+    path.write_bytes(random.Random(SEED).randbytes(HASH_BYTES))
+    return lambda: sha256_file(path)
+
+
+def _redaction(workdir: Path) -> Callable[[], object]:
+    text = "\n\n".join(synthetic_pages())
+    return lambda: redact(text, rules=["account_numbers"])
+
+
+def _markdown_to_json(workdir: Path) -> Callable[[], object]:
+    pages = synthetic_pages()
+    return lambda: list(page_records("0" * 64, "bench.pdf", pages))
+
+
+def _write_output(workdir: Path) -> Callable[[], object]:
+    lines = list(page_records("0" * 64, "bench.pdf", synthetic_pages()))
+    path = workdir / "outputs" / "bench.jsonl"
+
+    def write():
+        with atomic_writer(path) as f:
+            for line in lines:
+                f.write(line)
+
+    return write
+
+
+# Case name -> setup returning the call to time; setups may write under workdir
+CASES: dict[str, Callable[[Path], Callable[[], object]]] = {
+    "config.settings": _config_settings,
+    "config.reload_settings": _config_reload,
+    "run_context.create": _run_context,
+    "logging.info": _logging,
+    "hashing.sha256_file": _hashing,
+    "redaction.redact": _redaction,
+    "mdjson.page_records": _markdown_to_json,
+    "writers.atomic_write": _write_output,
+}
+
+
+def _close_logger() -> None:
+    logger = logging.getLogger("pdf_ingestion.bench")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    for log_filter in list(logger.filters):
+        logger.removeFilter(log_filter)
+
+
+def run_benchmarks(names: list[str] | None = None, repeat: int = 5, min_time: float = 0.2) -> dict[str, float]:
+    """Time each case (all by default) and return its best seconds per call.
+
+    Each round runs the call enough times to take at least ``min_time``.
+    """
+    unknown = sorted(set(names or []) - CASES.keys())
+    if unknown:
+        raise ValueError(f"Unknown benchmark: {', '.join(unknown)}")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="pdf-bench-") as tmp:
+        try:
+            for name in names or CASES:
+                call = CASES[name](Path(tmp))
+                timer = timeit.Timer(call)
+                number = 1
+                while timer.timeit(number) < min_time and number < 1_000_000:
+                    number *= 2
+                results[name] = min(timer.repeat(repeat=repeat, number=number)) / number
+        finally:
+            _close_logger()
+    return results
+
+
+def baseline_path() -> Path:
+    """``[bench].baseline``, by default under ``[state].dir``."""
+    return Path(CFG.get('bench', {}).get('baseline', Path(CFG['state']['dir']) / "bench-baseline.json"))
+
+
+def save_baseline(path: Path, results: dict[str, float]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }, indent=2) + "\n")
+
+
+def load_baseline(path: Path) -> dict[str, float]:
+    return json.loads(path.read_text())["results"]
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[Regression]:
+    """Cases in both ``results`` and ``baseline`` more than ``tolerance`` slower than the baseline."""
+    return [Regression(name, baseline[name], current) for name, current in results.items()
+            if baseline.get(name) and current > baseline[name] * (1 + tolerance)]
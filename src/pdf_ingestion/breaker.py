@@ -0,0 +1,166 @@
+"""Circuit breaker around calls to the remote parser.
+
+``closed``: calls go through; consecutive outage failures are counted and
+``failure_threshold`` of them open the circuit. ``open``: calls are refused
+without touching the network until ``reset_timeout_s`` has passed.
+``half_open``: up to ``half_open_probes`` calls are let through as probes;
+a probe that reaches the service closes the circuit, an outage re-opens it.
+
+Only outages count as failures (transport errors, timeouts, 5xx and 429
+responses). A document the parser rejects is a sign the service is up.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+import httpx
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.errors import ParserRejected
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_TIMEOUT_MESSAGE = "Timeout while parsing the file"
+
+
+def _chain(error: BaseException) -> Iterator[BaseException]:
+    """``error`` and the exceptions it chains from, innermost last."""
+    seen: set[int] = set()
+    current: BaseException | None = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield current
+        current = current.__cause__ or current.__context__
+
+
+def is_outage(error: BaseException) -> bool:
+    """True if ``error`` (or an exception it chains from) means the parser is unreachable."""
+    for current in _chain(error):
+        if isinstance(current, httpx.TransportError):
+            return True
+        if isinstance(current, httpx.HTTPStatusError):
+            status = current.response.status_code
+            return status >= 500 or status == 429
+        if _TIMEOUT_MESSAGE in str(current):
+            return True
+    return False
+
+
+def is_parser_reply(error: BaseException) -> bool:
+    """True if ``error`` (or an exception it chains from) is the parser answering with an error.
+
+    Unlike a local failure (reading the file, a worker crash), such a reply
+    shows the parser is reachable.
+    """
+    return any(isinstance(current, (httpx.HTTPStatusError, ParserRejected)) for current in _chain(error))
+
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open circuit breaker."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_timeout_s = reset_timeout_s
+        self._half_open_probes = max(1, half_open_probes)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._probes = 0
+        self._opened_at = 0.0
+
+    def _refresh_locked(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self._reset_timeout_s:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    def _open_locked(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probes = 0
+
+    @property
+    def half_open_probes(self) -> int:
+        return self._half_open_probes
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_locked()
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets probes through (0 if not open)."""
+        with self._lock:
+            self._refresh_locked()
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._reset_timeout_s - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Return whether a call may proceed; in half-open this takes a probe slot.
+
+        Every allowed call must be followed by ``record_success``,
+        ``record_failure`` or, when it ended without learning anything
+        about the service, ``release_probe``.
+        """
+        with self._lock:
+            self._refresh_locked()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self._half_open_probes:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot without judging the service."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open_locked()
+                return
+            self._failures += 1
+            if self._state == CLOSED and self._failures >= self._failure_threshold:
+                self._open_locked()
+
+
+_BREAKER: CircuitBreaker | None = None
+_BREAKER_LOCK = threading.Lock()
+singletons.register(__name__, "_BREAKER")
+
+
+def parser_breaker() -> CircuitBreaker:
+    """Return the process-wide breaker guarding parser calls, configured by ``[circuit_breaker]``."""
+    global _BREAKER
+    with _BREAKER_LOCK:
+        if _BREAKER is None:
+            cfg = settings().get("circuit_breaker", {})
+            _BREAKER = CircuitBreaker(
+                failure_threshold=cfg.get("failure_threshold", 5),
+                reset_timeout_s=cfg.get("reset_timeout_s", 30.0),
+                half_open_probes=cfg.get("half_open_probes", 1),
+            )
+        return _BREAKER
@@ -0,0 +1,208 @@
+"""Append-only change feed of committed jobs, for downstream loaders.
+
+Every job that commits (its outputs atomically in place and its ledger
+entry recorded) appends one JSON line to the feed: a commit sequence
+number, the job id, the content hash, the input file name and each
+output's location and size in bytes. Loaders tail the feed from a saved offset
+instead of rescanning the output directories, so each poll costs only
+the records committed since the last one.
+
+Records go to segment files named after the sequence number of their
+first record (``<root>/<seq:016d>.jsonl``); a new segment is started once
+the current one reaches ``segment_bytes``, and with ``keep_segments`` set
+the oldest segments beyond that many are deleted. An offset is the
+segment and byte position after the last record read (``"<segment>:<pos>"``).
+A reader whose segment was deleted resumes at the oldest one left, and
+sees the gap in the sequence numbers.
+
+One process appends to a feed at a time (the watcher or ``ingest-once``).
+A line torn by a crash is cut off when the feed is next opened for
+writing, and readers never return a line without its newline.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.ledger import state_dir
+
+CFG = settings()
+
+_FEED_DIR_NAME = "changefeed"
+_SEGMENT_SUFFIX = ".jsonl"
+
+
+@dataclass(frozen=True)
+class FeedOffset:
+    """Position in the feed just after the last record read."""
+
+    segment: int
+    position: int
+
+    def __str__(self) -> str:
+        return f"{self.segment}:{self.position}"
+
+    @classmethod
+    def parse(cls, text: str) -> FeedOffset:
+        segment, _, position = text.strip().partition(":")
+        return cls(int(segment), int(position))
+
+
+def _segment_name(first_seq: int) -> str:
+    return f"{first_seq:016d}{_SEGMENT_SUFFIX}"
+
+
+def _segments(root: Path) -> list[int]:
+    return sorted(int(p.stem) for p in root.glob(f"*{_SEGMENT_SUFFIX}")) if root.exists() else []
+
+
+class ChangeFeed:
+    """Appends commit records to the feed's segment files under ``root``."""
+
+    def __init__(self, root: Path, segment_bytes: int = 16 * 1024 * 1024, keep_segments: int = 0,
+                 fsync: bool = True):
+        self._root = root
+        self._segment_bytes = segment_bytes
+        self._keep_segments = keep_segments
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        root.mkdir(parents=True, exist_ok=True)
+        segments = _segments(root)
+        self._tail = segments[-1] if segments else 1
+        self._seq = self._recover() if segments else 0
+        self._writer = open(root / _segment_name(self._tail), "ab", buffering=0)
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the last record appended."""
+        return self._seq
+
+    def append(self, record: dict[str, Any]) -> int:
+        """Append ``record`` with the next sequence number and return that number."""
+        with self._lock:
+            self._seq += 1
+            line = json.dumps({"seq": self._seq, **record}, separators=(",", ":")).encode("utf-8") + b"\n"
+            if self._writer.tell() and self._writer.tell() + len(line) > self._segment_bytes:
+                self._roll()
+            # One write per record, so readers see whole lines or none
+            self._writer.write(line)
+            if self._fsync:
+                os.fsync(self._writer.fileno())
+            return self._seq
+
+    def commit(self, job_id: str, sha256: str, file_name: str, outputs: dict[str, str],
+               sizes: dict[str, int] | None = None, **extra: Any) -> int:
+        """Record a committed job whose ``outputs`` (kind -> location) are in place.
+
+        ``sizes`` (kind -> bytes) are the counts taken by the writer; an
+        output without one is stat'ed, which works for local files only.
+        """
+        sizes = sizes or {}
+        return self.append({
+            "job_id": job_id,
+            "sha256": sha256,
+            "file_name": file_name,
+            "committed_at": datetime.now(UTC).isoformat(),
+            "outputs": {kind: {"path": location, "bytes": sizes[kind] if kind in sizes else _size(location)}
+                        for kind, location in outputs.items()},
+            **extra,
+        })
+
+    def close(self) -> None:
+        with self._lock:
+            self._writer.close()
+
+    def _recover(self) -> int:
+        """Cut a torn last line off the tail segment; return the last sequence number."""
+        path = self._root / _segment_name(self._tail)
+        data = path.read_bytes()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            os.truncate(path, end)
+        if not end:
+            return self._tail - 1
+        return json.loads(data[data.rfind(b"\n", 0, end - 1) + 1:end])["seq"]
+
+    def _roll(self) -> None:
+        self._writer.close()
+        # self._seq is the number the first record of the new segment gets
+        self._tail = self._seq
+        self._writer = open(self._root / _segment_name(self._tail), "ab", buffering=0)
+        if self._keep_segments:
+            for number in _segments(self._root)[:-self._keep_segments]:
+                (self._root / _segment_name(number)).unlink(missing_ok=True)
+
+
+def _size(location: str) -> int | None:
+    # Only for outputs written before sizes were recorded; object storage
+    # locations are not stat'ed
+    try:
+        return os.stat(location).st_size
+    except (OSError, ValueError):
+        return None
+
+
+def read_feed(root: Path, after: FeedOffset | None = None,
+              limit: int | None = None) -> tuple[list[dict[str, Any]], FeedOffset | None]:
+    """Return the records after ``after`` (all when None), up to ``limit``, and the offset to resume from.
+
+    Only the segments from ``after`` onwards are opened, each at a seek,
+    so the cost is in the number of new records, not the size of the feed.
+    The offset comes back unchanged (or None for an empty feed) when
+    there is nothing new.
+    """
+    segments = _segments(root)
+    if not segments:
+        return [], after
+    if after is None or after.segment < segments[0]:
+        # Never read, or the segment was rotated away: start at the oldest left
+        offset = FeedOffset(segments[0], 0)
+    else:
+        offset = after
+    records: list[dict[str, Any]] = []
+    for number in [n for n in segments if n >= offset.segment]:
+        position = offset.position if number == offset.segment else 0
+        with open(root / _segment_name(number), "rb") as f:
+            f.seek(position)
+            for line in f:
+                if not line.endswith(b"\n") or (limit is not None and len(records) >= limit):
+                    break  # a record still being written, or enough for this call
+                records.append(json.loads(line))
+                position += len(line)
+        offset = FeedOffset(number, position)
+        if limit is not None and len(records) >= limit:
+            break
+    return records, offset
+
+
+def feed_dir() -> Path:
+    """``[changefeed].dir``, by default under ``[state].dir``."""
+    return Path(CFG.get('changefeed', {}).get('dir', state_dir() / _FEED_DIR_NAME))
+
+
+_FEED: ChangeFeed | None = None
+_FEED_LOCK = threading.Lock()
+singletons.register(__name__, "_FEED", ChangeFeed.close)
+
+
+def change_feed() -> ChangeFeed | None:
+    """Return the process-wide change feed, or None when ``[changefeed].enabled`` is off."""
+    global _FEED
+    changefeed = CFG.get('changefeed', {})
+    if not changefeed.get('enabled', True):
+        return None
+    with _FEED_LOCK:
+        if _FEED is None:
+            _FEED = ChangeFeed(feed_dir(),
+                               segment_bytes=changefeed.get('segment_bytes', 16 * 1024 * 1024),
+                               keep_segments=changefeed.get('keep_segments', 0),
+                               fsync=changefeed.get('fsync', True))
+        return _FEED
@@ -0,0 +1,227 @@
+"""Durable, segmented, append-only work queue with an acknowledgement cursor.
+
+Records are appended to numbered segment files
+(``<root>/<n:016d>.seg``) as ``length | crc32 | payload``; a segment is
+closed once it reaches ``segment_bytes`` and a new one is started.
+Consumers read forward from an in-memory read position and acknowledge
+records when their work is done, in any order. The ack cursor (the first
+position whose record is not yet acknowledged) is persisted to
+``<root>/ack.json``; segments wholly behind it are deleted. After a restart
+reading resumes at the ack cursor, so unacknowledged records are delivered
+again (at-least-once).
+
+``put`` and ``get`` are O(1) (one append, one read at a known offset), and
+memory holds only the records delivered but not yet acknowledged, however
+long the backlog. One lock makes a queue safe to share between producer
+and consumer threads of a process.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pdf_ingestion.writers import atomic_write_text
+
+_HEADER = struct.Struct(">II")
+_SEGMENT_SUFFIX = ".seg"
+_CURSOR_NAME = "ack.json"
+
+
+@dataclass(frozen=True)
+class Receipt:
+    """Identifies a delivered record for ``ack``."""
+
+    segment: int
+    offset: int
+    end: int
+
+
+def _segment_name(number: int) -> str:
+    return f"{number:016d}{_SEGMENT_SUFFIX}"
+
+
+class DiskQueue:
+    """FIFO of JSON-serializable items persisted in segment files."""
+
+    def __init__(self, root: Path, segment_bytes: int = 4 * 1024 * 1024, fsync: bool = False,
+                 cursor_flush_every: int = 64):
+        self._root = root
+        self._segment_bytes = max(_HEADER.size + 1, segment_bytes)
+        self._fsync = fsync
+        self._cursor_flush_every = max(1, cursor_flush_every)
+        self._cond = threading.Condition()
+        root.mkdir(parents=True, exist_ok=True)
+
+        segments = sorted(int(p.stem) for p in root.glob(f"*{_SEGMENT_SUFFIX}"))
+        cursor = self._load_cursor()
+        if cursor is None:
+            cursor = (segments[0], 0) if segments else (0, 0)
+        self._ack = cursor
+        # Delivered records not yet acknowledged, in delivery order
+        self._delivered: deque[Receipt] = deque()
+        self._acked: set[Receipt] = set()
+        self._unflushed_acks = 0
+
+        self._tail = max(segments[-1] if segments else 0, self._ack[0])
+        self._size = self._recover(segments)
+        self._writer = open(self._path(self._tail), "ab", buffering=0)
+        self._read_segment, self._read_offset = self._ack
+        self._reader = None
+        self._closed = False
+
+    # ------------------------------------------------------------ properties
+    def __len__(self) -> int:
+        """Records appended and not yet delivered."""
+        with self._cond:
+            return self._size
+
+    @property
+    def unacked(self) -> int:
+        with self._cond:
+            return len(self._delivered)
+
+    # -------------------------------------------------------------- producer
+    def put(self, item: Any) -> None:
+        payload = json.dumps(item, separators=(",", ":")).encode("utf-8")
+        record = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            if self._writer.tell() and self._writer.tell() + len(record) > self._segment_bytes:
+                self._roll()
+            self._writer.write(record)
+            if self._fsync:
+                os.fsync(self._writer.fileno())
+            self._size += 1
+            self._cond.notify()
+
+    # -------------------------------------------------------------- consumer
+    def get(self, timeout: float | None = 0) -> tuple[Receipt, Any] | None:
+        """Return the next ``(receipt, item)``, waiting up to ``timeout`` (None: forever)."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size > 0 or self._closed, timeout):
+                return None
+            if self._closed:
+                return None
+            while True:
+                reader = self._open_reader()
+                reader.seek(self._read_offset)
+                header = reader.read(_HEADER.size)
+                if len(header) == _HEADER.size:
+                    break
+                # End of a closed segment; records continue in the next one
+                self._read_segment, self._read_offset = self._read_segment + 1, 0
+            length, _ = _HEADER.unpack(header)
+            payload = reader.read(length)
+            receipt = Receipt(self._read_segment, self._read_offset, self._read_offset + _HEADER.size + length)
+            self._read_offset = receipt.end
+            self._size -= 1
+            self._delivered.append(receipt)
+            return receipt, json.loads(payload)
+
+    def ack(self, receipt: Receipt) -> None:
+        """Mark a delivered record done; the cursor advances past contiguous acks."""
+        with self._cond:
+            self._acked.add(receipt)
+            advanced = False
+            while self._delivered and self._delivered[0] in self._acked:
+                done = self._delivered.popleft()
+                self._acked.discard(done)
+                self._ack = (done.segment, done.end)
+                advanced = True
+            if advanced:
+                self._unflushed_acks += 1
+                reclaimed = self._reclaim()
+                if reclaimed or self._unflushed_acks >= self._cursor_flush_every:
+                    self._flush_cursor()
+
+    def flush(self) -> None:
+        with self._cond:
+            self._flush_cursor()
+
+    def close(self) -> None:
+        with self._cond:
+            self._flush_cursor()
+            self._closed = True
+            self._writer.close()
+            if self._reader is not None:
+                self._reader.close()
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------- internals
+    def _path(self, number: int) -> Path:
+        return self._root / _segment_name(number)
+
+    def _load_cursor(self) -> tuple[int, int] | None:
+        try:
+            state = json.loads((self._root / _CURSOR_NAME).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        return state["segment"], state["offset"]
+
+    def _flush_cursor(self) -> None:
+        segment, offset = self._ack
+        atomic_write_text(self._root / _CURSOR_NAME, json.dumps({"segment": segment, "offset": offset}))
+        self._unflushed_acks = 0
+
+    def _recover(self, segments: list[int]) -> int:
+        """Count unread records from the ack cursor; cut a torn record off the tail."""
+        count = 0
+        for number in segments:
+            if number < self._ack[0]:
+                self._path(number).unlink()  # acknowledged before the last shutdown
+                continue
+            offset = self._ack[1] if number == self._ack[0] else 0
+            with open(self._path(number), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                while offset + _HEADER.size <= size:
+                    f.seek(offset)
+                    length, crc = _HEADER.unpack(f.read(_HEADER.size))
+                    end = offset + _HEADER.size + length
+                    if end > size or (number == self._tail and zlib.crc32(f.read(length)) != crc):
+                        break
+                    count += 1
+                    offset = end
+            if number == self._tail and offset < size:
+                os.truncate(self._path(number), offset)
+        return count
+
+    def _roll(self) -> None:
+        if self._fsync:
+            os.fsync(self._writer.fileno())
+        self._writer.close()
+        self._tail += 1
+        self._writer = open(self._path(self._tail), "ab", buffering=0)
+
+    def _open_reader(self):
+        if self._reader is None or self._reader.name != str(self._path(self._read_segment)):
+            if self._reader is not None:
+                self._reader.close()
+            self._reader = open(self._path(self._read_segment), "rb")
+        return self._reader
+
+    def _reclaim(self) -> bool:
+        """Delete segments the ack cursor has moved past; True if any were."""
+        segment, offset = self._ack
+        reclaimed = False
+        # A cursor at the end of a closed segment belongs at the start of the next
+        while segment < self._tail and offset >= self._path(segment).stat().st_size:
+            segment, offset = segment + 1, 0
+        if segment != self._ack[0]:
+            for number in range(self._ack[0], segment):
+                if self._reader is not None and self._reader.name == str(self._path(number)):
+                    self._reader.close()
+                    self._reader = None
+                self._path(number).unlink(missing_ok=True)
+            self._ack = (segment, offset)
+            if self._read_segment < segment:
+                # Everything in the deleted segments was read and acknowledged
+                self._read_segment, self._read_offset = segment, 0
+            reclaimed = True
+        return reclaimed
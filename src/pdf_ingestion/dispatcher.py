@@ -0,0 +1,90 @@
+"""Job dispatcher with a bounded worker pool and byte-budget backpressure."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+
+class ByteBudget:
+    """Admission controller over the estimated in-memory bytes of in-flight jobs.
+
+    ``acquire`` blocks while admitting the job would push the total over
+    ``limit_bytes``. A single job larger than the whole budget is admitted
+    once nothing else is in flight, so oversized inputs run alone instead of
+    deadlocking. A limit of 0 disables the budget.
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = max(0, int(limit_bytes))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def in_flight_bytes(self) -> int:
+        with self._cond:
+            return self._in_flight
+
+    def _fits(self, nbytes: int) -> bool:
+        if not self.limit_bytes or self._in_flight == 0:
+            return True
+        return self._in_flight + nbytes <= self.limit_bytes
+
+    def acquire(self, nbytes: int, timeout: float | None = None) -> bool:
+        """Reserve ``nbytes``; return False if ``timeout`` expires first."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._fits(nbytes), timeout=timeout):
+                return False
+            self._in_flight += nbytes
+            return True
+
+    def release(self, nbytes: int) -> None:
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - nbytes)
+            self._cond.notify_all()
+
+
+class Dispatcher:
+    """Runs jobs on a thread pool, admitting them by worker slot and byte budget.
+
+    ``submit`` blocks the caller until a worker slot is free and the job's
+    estimated footprint (``size_bytes * memory_multiplier``) fits in the
+    budget, so nothing queues up in memory behind the pool.
+    """
+
+    def __init__(self, max_workers: int, max_inflight_bytes: int = 0, memory_multiplier: float = 1.0):
+        self.max_workers = max_workers
+        self.memory_multiplier = memory_multiplier
+        self.budget = ByteBudget(max_inflight_bytes)
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+
+    def estimate(self, size_bytes: int) -> int:
+        return int(size_bytes * self.memory_multiplier)
+
+    def submit(self, fn: Callable[..., Any], size_bytes: int, *args: Any, **kwargs: Any) -> Future[Any]:
+        cost = self.estimate(size_bytes)
+        self._slots.acquire()
+        try:
+            self.budget.acquire(cost)
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self.budget.release(cost)
+            self._slots.release()
+            raise
+
+        def _done(_: Future[Any]) -> None:
+            self.budget.release(cost)
+            self._slots.release()
+
+        future.add_done_callback(_done)
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
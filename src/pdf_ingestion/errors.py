@@ -0,0 +1,41 @@
+"""Exception hierarchy for the PDF ingestion pipeline."""
+
+
+class PdfIngestionError(Exception):
+    """Base class for all PDF ingestion errors."""
+
+
+class PdfSyntaxError(PdfIngestionError):
+    """Raised when a PDF's trailer, xref or object syntax cannot be read."""
+
+
+class PdfRejectedError(PdfIngestionError):
+    """Raised when a prescan rejects a PDF before it is sent for parsing."""
+
+
+class ParserRejected(PdfIngestionError):
+    """Raised when the parser answers a request with an error that is not an outage."""
+
+
+class OutputSchemaError(PdfIngestionError):
+    """Raised when a structured output record does not match its schema."""
+
+
+class JobDeferred(PdfIngestionError):
+    """Raised when a job is set aside to run again later.
+
+    The input stays in the inbox and the job's checkpoint is kept; the file
+    is not quarantined.
+    """
+
+
+class JobInterrupted(JobDeferred):
+    """Raised at a stage boundary when a job is stopped during shutdown."""
+
+
+class ParserUnavailable(JobDeferred):
+    """Raised when the parser circuit breaker is open or a call hits an outage."""
+
+
+class WorkerLost(JobDeferred):
+    """Raised when a worker process dies while running part of a job."""
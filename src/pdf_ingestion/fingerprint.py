@@ -0,0 +1,76 @@
+"""Fingerprints of the settings each pipeline stage depends on.
+
+Every ledger entry records the fingerprints its outputs were produced
+with. ``parse`` covers the parser and its options; ``render`` covers the
+stages downstream of parsing (redaction and output rendering). Comparing
+recorded fingerprints with the current ones tells ``reprocess`` which
+stages must run again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from importlib import metadata
+from typing import Any
+
+from config import settings
+from pdf_ingestion import redaction
+from pdf_ingestion.tiers import LOCAL, PREMIUM
+
+PARSE = "parse"
+RENDER = "render"
+
+
+def _digest(payload: dict[str, Any]) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _package_version(name: str) -> str:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def parse_options(tier: str | None = None) -> dict[str, Any]:
+    """Parser identity and options that change what the parser returns.
+
+    ``tier`` is the degradation tier a job was parsed at (see ``tiers``);
+    None means the configured parser.
+    """
+    if tier == LOCAL:
+        return {"parser": "local-text", "result_type": "text"}
+    cfg = settings().get("llamaparse", {})
+    return {
+        "parser": "llama-parse",
+        "parser_version": _package_version("llama-parse"),
+        "premium_mode": tier == PREMIUM if tier is not None else bool(cfg.get("premium_mode", False)),
+        "result_type": "json",
+    }
+
+
+def render_options() -> dict[str, Any]:
+    """Application version and downstream rules that shape the outputs."""
+    return {
+        "app_version": settings()["version"]["app_version"],
+        "redaction": redaction.rules_hash(),
+    }
+
+
+def current_fingerprints(tier: str | None = None) -> dict[str, str]:
+    return {PARSE: _digest(parse_options(tier)), RENDER: _digest(render_options())}
+
+
+def stale_stages(recorded: dict[str, str] | None, current: dict[str, str]) -> set[str]:
+    """Return the stages whose recorded fingerprint differs from ``current``.
+
+    A stale ``parse`` implies ``render`` too, since its outputs are rebuilt
+    from the new parse.
+    """
+    recorded = recorded or {}
+    stale = {stage for stage, value in current.items() if recorded.get(stage) != value}
+    if PARSE in stale:
+        stale.add(RENDER)
+    return stale
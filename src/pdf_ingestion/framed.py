@@ -0,0 +1,140 @@
+"""Compressed, seekable page-framed output format.
+
+A framed file is a sequence of independently compressed frames (gzip
+members or zstd frames), each holding up to ``pages_per_frame`` pages. The
+concatenation is still a valid ``.gz``/``.zst`` stream, so standard tools
+read it whole, pages joined by the output's separator. A sidecar
+``<file>.idx.json`` records each frame's byte offset and length and the
+decompressed offset and length of every page in it, so a single page is
+read with one seek and one frame decompression.
+
+Frames are compressed in parallel on a shared thread pool; zlib and
+zstandard both release the GIL while compressing.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from config import settings
+from pdf_ingestion.writers import atomic_writer
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+SUFFIXES = {GZIP: ".gz", ZSTD: ".zst"}
+INDEX_SUFFIX = ".idx.json"
+
+_DEFAULT_WORKERS = 4
+_POOL: ThreadPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            workers = settings()["output"].get("compression_workers", _DEFAULT_WORKERS)
+            _POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compress")
+        return _POOL
+
+
+def _check_codec(codec: str) -> None:
+    if codec not in SUFFIXES:
+        raise ValueError(f"Unknown output compression codec: {codec}")
+    if codec == ZSTD and zstandard is None:
+        raise RuntimeError("zstd output requires the 'zstandard' package")
+
+
+def _compress(codec: str, level: int, data: bytes) -> bytes:
+    if codec == ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def framed_path(path: Path, codec: str) -> Path:
+    """Path of the framed file written for an uncompressed output ``path``."""
+    return path.with_name(path.name + SUFFIXES[codec])
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def write_framed(path: Path, pages: list[bytes], codec: str = GZIP, pages_per_frame: int = 16, level: int = 6,
+                 sink: Any = None, separator: bytes = b"") -> tuple[Path, int]:
+    """Write ``pages`` to ``path`` as compressed frames plus an offset index.
+
+    ``separator`` goes between consecutive pages, across frame boundaries
+    too, so the decompressed stream matches the flat output. Returns the
+    path of the framed file and its size in bytes. Both the data file and the index
+    are replaced atomically; the index is written last. With an output
+    ``sink`` both are written through ``sink.open`` instead.
+    """
+    opener = sink.open if sink is not None else atomic_writer
+    _check_codec(codec)
+    if pages_per_frame <= 0:
+        raise ValueError("pages_per_frame must be positive")
+    # Every page but the document's first is preceded by the separator
+    groups = [[separator + page if i + j else page for j, page in enumerate(pages[i : i + pages_per_frame])]
+              for i in range(0, len(pages), pages_per_frame)]
+    compressed = _pool().map(lambda group: _compress(codec, level, b"".join(group)), groups)
+
+    frames: list[dict[str, Any]] = []
+    offset = 0
+    with opener(path) as f:
+        for number, (group, frame) in enumerate(zip(groups, compressed, strict=True)):
+            f.write(frame)
+            starts, lengths, position = [], [], 0
+            for j, part in enumerate(group):
+                skip = len(separator) if number or j else 0
+                starts.append(position + skip)
+                lengths.append(len(part) - skip)
+                position += len(part)
+            frames.append(
+                {
+                    "offset": offset,
+                    "length": len(frame),
+                    "first_page": number * pages_per_frame + 1,
+                    "page_offsets": starts,
+                    "page_lengths": lengths,
+                }
+            )
+            offset += len(frame)
+    index = {"codec": codec, "pages_per_frame": pages_per_frame, "pages": len(pages), "frames": frames}
+    with opener(index_path(path)) as f:
+        f.write(json.dumps(index).encode("utf-8"))
+    return path, offset
+
+
+def read_index(path: Path) -> dict[str, Any]:
+    return json.loads(index_path(path).read_text(encoding="utf-8"))
+
+
+def read_page(path: Path, page: int, index: dict[str, Any] | None = None) -> bytes:
+    """Read one page (1-based) from a framed file with a single seek."""
+    index = index or read_index(path)
+    if not 1 <= page <= index["pages"]:
+        raise IndexError(f"Page {page} out of range 1..{index['pages']}")
+    frame = index["frames"][(page - 1) // index["pages_per_frame"]]
+    with open(path, "rb") as f:
+        f.seek(frame["offset"])
+        data = _decompress(index["codec"], f.read(frame["length"]))
+    position = page - frame["first_page"]
+    start = frame["page_offsets"][position]
+    return data[start : start + frame["page_lengths"][position]]
@@ -0,0 +1,18 @@
+"""Content hashing helpers."""
+
+import hashlib
+from pathlib import Path
+
+# Read size used when hashing files; keeps memory flat for any input size
+_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: Path, chunk_size: int = _CHUNK_SIZE) -> str:
+    """Return the hex SHA256 of a file, reading it in fixed-size chunks."""
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb") as f:
+        while n := f.readinto(buffer):
+            digest.update(view[:n])
+    return digest.hexdigest()
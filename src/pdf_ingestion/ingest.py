@@ -1,6 +1,9 @@
 import os
 import json
+import shutil
 import sys
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 from llama_parse import LlamaParse
@@ -10,7 +13,32 @@ from utils.logger import json_setup_logger
 from utils.context import RunContext
 
 from config import settings, reload_settings
+from pdf_ingestion.breaker import is_outage, is_parser_reply, parser_breaker
+from pdf_ingestion.changefeed import change_feed
+from pdf_ingestion.errors import JobDeferred, JobInterrupted, ParserUnavailable, PdfIngestionError, PdfRejectedError, PdfSyntaxError
+from pdf_ingestion.fingerprint import current_fingerprints
+from pdf_ingestion.framed import framed_path, write_framed
+from pdf_ingestion.hashing import sha256_file
+from pdf_ingestion.journal import INGEST, STORE_JSON, STORE_MARKDOWN, STORE_PROCESSED, JobCheckpoint, journal
+from pdf_ingestion.layout import expand
+from pdf_ingestion.ledger import job_key, ledger, load_parsed, save_parsed
+from pdf_ingestion.localtext import extract_pages
+from pdf_ingestion.mdjson import page_records
 from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.optimize import optimize_for_upload
+from pdf_ingestion.pagecache import page_cache, page_hashes
+from pdf_ingestion.pipeline import PENDING, Stage
+from pdf_ingestion.prescan import prescan_cache, rejection_reason
+from pdf_ingestion.profiling import run_profiler
+from pdf_ingestion.redaction import redact
+from pdf_ingestion.retries import EXHAUSTED, SCHEDULED, append_job_row, is_retryable, retry_schedule
+from pdf_ingestion.search import search_index
+from pdf_ingestion.sinks import output_sink
+from pdf_ingestion.sources import SPOOL_DIR_NAME
+from pdf_ingestion.tiers import LOCAL, PREMIUM, STANDARD, base_tier, is_degraded
+from pdf_ingestion.upload import DEFAULT_UPLOAD_CHUNK_SIZE, MappedUploadStream
+from pdf_ingestion.workerpool import PARSE, SUBMIT, parse_in_worker, parser_pool, run_parser
+from pdf_ingestion.writers import atomic_write_text
 
 CFG = settings()
 reload_settings()
@@ -29,11 +57,17 @@ class ingest:
         self.inbox = CFG['input']['dir']
         self.parser = LlamaParse(
             verbose=CFG['llamaparse']['verbose'],
-            premium_mode=CFG['llamaparse']['premium_mode']
+            premium_mode=CFG['llamaparse']['premium_mode'],
+            ignore_errors=False
         )
         self._INPUT_DIR = Path(CFG['input']['dir'])
         self._OUTPUT_JSON_DIR = Path(CFG['output']['jsonl_dir'])
         self._OUTPUT_MARKDOWN_DIR = Path(CFG['output']['markdown_dir'])
+        self._PROCESSED_DIR = Path(CFG['processed']['dir'])
+        self._QUARANTINE_DIR = Path(CFG['quarantine']['dir'])
+        self._stage_lock = threading.Lock()
+        # Holds the parser circuit's admission between _admit_parser and the call
+        self._admitted = False
         self._init()
         self.logger.info("PDFExtractor initialized", 
                         extra={"run_id": self.RUN_ID, "inbox": str(self.inbox)})
@@ -43,79 +77,711 @@ class ingest:
         self._OUTPUT_JSON_DIR.mkdir(parents=True, exist_ok=True)
         self._OUTPUT_MARKDOWN_DIR.mkdir(parents=True, exist_ok=True)
 
-    def run(self, req: PdfIngestionRequest):
-        self.logger.info("Starting PDF extraction workflow", extra={"run_id": self.RUN_ID})
-        
+    def run(self, req: PdfIngestionRequest, stop_event=None):
+        self._begin(req, stop_event)
         try:
-            # Update the job record
-            self.logger.info("Updating job record", extra={"run_id": self.RUN_ID})
-            self._update_job_record()
-            
-            # Ingest the pdf file
-            self.logger.info("Ingesting PDF file", extra={"run_id": self.RUN_ID})
-            self._ingest()
-            
-            # Store the json file output
-            self.logger.info("Storing JSON output", extra={"run_id": self.RUN_ID})
-            self._store_json()
-            
-            # Store the markdown file output
-            self.logger.info("Storing Markdown output", extra={"run_id": self.RUN_ID})
-            self._store_markdown()
-            
-            # Store the processed file in the processed directory
-            self.logger.info("Moving file to processed directory", extra={"run_id": self.RUN_ID})
-            self._store_processed()
-            
-            # Store the run file
-            self.logger.info("Storing run metadata", extra={"run_id": self.RUN_ID})
-            self._store_run()
-            
+            with run_profiler().capture(self.RUN_ID, "ingest"):
+                self._prepare()
+                self._run_stages()
             self.logger.info("PDF extraction workflow completed successfully", 
                            extra={"run_id": self.RUN_ID})
-            
         except Exception as e:
-            self.logger.error("PDF extraction workflow failed, moving to quarantine", 
-                            extra={"run_id": self.RUN_ID, "error": str(e), "error_type": type(e).__name__})
-            # If failed, Store the failed file in the quarantine directory
-            try:
-                self._store_quarantine()
-            except Exception as quarantine_error:
-                self.logger.error("Failed to quarantine file", 
-                                extra={"run_id": self.RUN_ID, "quarantine_error": str(quarantine_error)})
+            self.fail(e)
+            raise
+
+    def start(self, req: PdfIngestionRequest, stop_event=None):
+        """Run the stages up to the parse upload and return the remote job id.
+
+        The result is collected separately (see ``ParsePoller``) and handed
+        to ``finish``. A job id already in the checkpoint is returned without
+        uploading again. Returns ``None`` when no remote parse is needed, in
+        which case the job has been finished in place.
+        """
+        self._begin(req, stop_event)
+        try:
+            with run_profiler().capture(self.RUN_ID, "submit"):
+                self._prepare()
+                if INGEST not in self._checkpoint.completed:
+                    self._check_stop()
+                    job_id = self._submit_parse()
+                    if job_id is not None:
+                        return job_id
+                self._run_stages()
+            self.logger.info("PDF extraction workflow completed successfully", extra={"run_id": self.RUN_ID})
+            return None
+        except Exception as e:
+            self.fail(e)
             raise
 
+    def finish(self, result, error=None):
+        """Apply a collected parse ``result`` (or its ``error``) and run the remaining stages."""
+        try:
+            with run_profiler().capture(self.RUN_ID, "finish"):
+                self._collect_parse(result, error)
+                self._run_stages()
+            self.logger.info("PDF extraction workflow completed successfully", extra={"run_id": self.RUN_ID})
+        except Exception as e:
+            self.fail(e)
+            raise
+
+    def enqueue(self, pipeline, req: PdfIngestionRequest, stop_event=None, in_place=False):
+        """Send this job for ``req`` through a ``StagePipeline`` built from ``stage_graph``.
+
+        ``req.PdfInput`` may be an absolute path outside the inbox; with
+        ``in_place`` the file is neither moved to processed nor quarantined.
+        """
+        self._begin(req, stop_event, in_place)
+        pipeline.submit(self)
+
+    def _submit_parse(self):
+        """Upload the pages that need parsing and return the remote job id.
+
+        A job id already in the checkpoint is returned without uploading
+        again. Returns ``None`` when every page came from the page cache.
+        """
+        if not self._checkpoint.job_id:
+            self._admit_parser()
+        try:
+            targets = self._plan_parse()
+            if self._checkpoint.job_id:
+                self.logger.info("Resuming collection of submitted parse job",
+                                 extra={"run_id": self.RUN_ID, "job_id": self._checkpoint.job_id})
+                return self._checkpoint.job_id
+            if targets == [] or self.tier == LOCAL:
+                # Nothing to upload: every page is cached or extracted locally
+                job_id, pages = self._parse(target_pages=targets) if targets != [] else (None, [])
+                self._apply_parse(job_id, pages, targets)
+                journal().complete(self._checkpoint, INGEST)
+                return None
+            self.logger.info("Submitting PDF for parsing", extra={"run_id": self.RUN_ID})
+            self._submitted_at = time.monotonic()
+            job_id = self._submit(targets)
+        finally:
+            self._release_admission()
+        self._checkpoint.job_id = job_id
+        self._checkpoint.parse_targets = targets
+        journal().save(self._checkpoint)
+        self.logger.info("PDF submitted for parsing", extra={"run_id": self.RUN_ID, "job_id": job_id})
+        return job_id
+
+    def _collect_parse(self, result, error=None):
+        try:
+            if error is not None:
+                raise error
+            pages = [page.get("md", "") for page in result.get("pages", [])]
+            if self._submitted_at is not None:
+                # Spent remotely, with no worker held while it was polled for
+                self.parse_s = self.poll_s = time.monotonic() - self._submitted_at
+            self._apply_parse(self._checkpoint.job_id, pages, self._checkpoint.parse_targets)
+        except Exception:
+            # The remote job is spent; a retry uploads again
+            self._checkpoint.job_id = None
+            self._checkpoint.parse_targets = None
+            journal().save(self._checkpoint)
+            raise
+        journal().complete(self._checkpoint, INGEST, job_id=None, parse_targets=None)
+
+    def _begin(self, req, stop_event, in_place=False):
+        self.logger.info("Starting PDF extraction workflow", extra={"run_id": self.RUN_ID})
+        self.req = req
+        pdf_input = Path(req.PdfInput)
+        self._pdf_path = pdf_input if pdf_input.is_absolute() else self._INPUT_DIR / pdf_input
+        # Where the file came from; with its hash it keys the checkpoint and ledger entry
+        self._source = str(self._pdf_path.resolve())
+        self._stop_event = stop_event
+        self._in_place = in_place
+        self.prescan = None
+        self.sha256 = None
+        self.pages = []
+        self.redacted_pages = []
+        self.processed_path = None
+        self.output_files = {}
+        self.output_bytes = {}
+        self.tier = req.Tier or base_tier()
+        # Seconds spent parsing, and of those waiting on a submitted parse,
+        # for the job trace (None if not parsed here or not polled for)
+        self.parse_s = None
+        self.poll_s = None
+        self._submitted_at = None
+
+    def _prepare(self):
+        # Update the job record
+        self.logger.info("Updating job record", extra={"run_id": self.RUN_ID})
+        self._update_job_record()
+        
+        # Prescan the pdf file before spending parse quota
+        self.logger.info("Prescanning PDF file", extra={"run_id": self.RUN_ID})
+        self._prescan()
+        
+        # Pick up the checkpoint of an interrupted earlier run of this file
+        self._open_checkpoint()
+
+    def fail(self, e):
+        """Defer or quarantine the job after ``e``; the caller re-raises or reports it."""
+        if isinstance(e, JobDeferred):
+            # Left in the inbox with its checkpoint; a later cycle picks it up
+            self.logger.warning("PDF extraction workflow deferred, progress checkpointed",
+                                extra={"run_id": self.RUN_ID, "sha256": self.sha256,
+                                       "error": str(e), "error_type": type(e).__name__})
+            return
+        self.logger.error("PDF extraction workflow failed, moving to quarantine", 
+                        extra={"run_id": self.RUN_ID, "error": str(e), "error_type": type(e).__name__})
+        # If failed, Store the failed file in the quarantine directory
+        try:
+            self._store_quarantine(e)
+        except Exception as quarantine_error:
+            self.logger.error("Failed to quarantine file", 
+                            extra={"run_id": self.RUN_ID, "quarantine_error": str(quarantine_error)})
+        if self.sha256:
+            journal().remove(self.state_key)
+
+    @property
+    def state_key(self):
+        """Key of this job's checkpoint and ledger entry (see ``ledger.job_key``)."""
+        return job_key(self.sha256, self._source)
+
+    def resume(self, checkpoint: JobCheckpoint, stop_event=None):
+        """Finish a checkpointed job whose input already left the inbox.
+
+        Used at startup for jobs interrupted after the processed-file move;
+        jobs still in the inbox resume through ``run``.
+        """
+        self.logger.info("Resuming checkpointed PDF extraction workflow",
+                         extra={"run_id": self.RUN_ID, "sha256": checkpoint.sha256,
+                                "completed": checkpoint.completed})
+        self.req = PdfIngestionRequest(
+            PdfInput=checkpoint.file_name,
+            JsonOutput=checkpoint.json_output,
+            MarkdownOutput=checkpoint.markdown_output)
+        self._pdf_path = Path(checkpoint.processed_file)
+        self._source = checkpoint.source
+        self._stop_event = stop_event
+        self._in_place = False
+        self.sha256 = checkpoint.sha256
+        self.pages = []
+        self.redacted_pages = []
+        self.processed_path = None
+        self.output_files = {}
+        self.output_bytes = {}
+        self.tier = checkpoint.tier or base_tier()
+        self._checkpoint = checkpoint
+        self._restore_checkpoint()
+        self._run_stages()
+        self.logger.info("PDF extraction workflow completed successfully", extra={"run_id": self.RUN_ID})
+
+    def _run_stages(self):
+        # Ingest the pdf file
+        self._stage(INGEST, "Ingesting PDF file", self._ingest)
+        
+        # Redact the parsed output before anything is persisted
+        self.logger.info("Redacting parsed output", extra={"run_id": self.RUN_ID})
+        self._redact()
+        
+        # Store the json file output
+        self._stage(STORE_JSON, "Storing JSON output", self._store_json)
+        
+        # Store the markdown file output
+        self._stage(STORE_MARKDOWN, "Storing Markdown output", self._store_markdown)
+        
+        # Update the full-text search index
+        self.logger.info("Indexing Markdown output", extra={"run_id": self.RUN_ID})
+        self._index()
+        
+        # Store the processed file in the processed directory
+        self._stage(STORE_PROCESSED, "Moving file to processed directory", self._store_processed)
+        
+        # Store the run file
+        self._check_stop()
+        self.logger.info("Storing run metadata", extra={"run_id": self.RUN_ID})
+        self._store_run()
+        journal().remove(self.state_key)
+
+    def _stage(self, name, message, fn):
+        # Stages are skipped when the checkpoint shows they already completed;
+        # a requested stop takes effect only between stages
+        self._check_stop()
+        if name in self._checkpoint.completed:
+            self.logger.info(f"{message} skipped, restored from checkpoint", extra={"run_id": self.RUN_ID})
+            return
+        self.logger.info(message, extra={"run_id": self.RUN_ID})
+        fn()
+        # Stages may run in parallel under a StagePipeline; the last one to
+        # record sees every artifact set so far
+        with self._stage_lock:
+            journal().complete(
+                self._checkpoint, name,
+                output_files=dict(self.output_files),
+                output_bytes=dict(self.output_bytes),
+                processed_file=str(self.processed_path) if self.processed_path else None)
+
+    def _check_stop(self):
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise JobInterrupted(f"Stopped before completing {self._pdf_path.name}")
+
+    def _open_checkpoint(self):
+        checkpoint = journal().load(self.state_key)
+        if checkpoint is None:
+            self._checkpoint = JobCheckpoint(
+                sha256=self.sha256,
+                file_name=self._pdf_path.name,
+                source=self._source,
+                run_id=self.RUN_ID,
+                json_output=self.req.JsonOutput,
+                markdown_output=self.req.MarkdownOutput,
+                in_place=self._in_place,
+                tier=self.tier)
+            return
+        self.logger.info("Resuming from checkpoint",
+                         extra={"run_id": self.RUN_ID, "checkpoint_run_id": checkpoint.run_id,
+                                "completed": checkpoint.completed})
+        # Keep writing to the outputs the interrupted run chose
+        self.req = PdfIngestionRequest(
+            PdfInput=self.req.PdfInput,
+            JsonOutput=checkpoint.json_output,
+            MarkdownOutput=checkpoint.markdown_output,
+            Tier=self.req.Tier)
+        self._checkpoint = checkpoint
+        self._restore_checkpoint()
+
+    def _restore_checkpoint(self):
+        checkpoint = self._checkpoint
+        self.output_files = dict(checkpoint.output_files)
+        self.output_bytes = dict(checkpoint.output_bytes)
+        if checkpoint.processed_file:
+            self.processed_path = Path(checkpoint.processed_file)
+        if INGEST in checkpoint.completed:
+            self.pages = load_parsed(self.sha256)
+            if self.pages is None:
+                # The stored parse is gone; parsing again is the only way forward
+                checkpoint.completed.remove(INGEST)
+                self.pages = []
+        if checkpoint.tier and (INGEST in checkpoint.completed or checkpoint.job_id):
+            # Parsed (or submitted) at the interrupted run's tier
+            self.tier = checkpoint.tier
+        checkpoint.tier = self.tier
+
+    def reprocess(self, entry: dict, reparse: bool):
+        """Re-run the stages made stale by a fingerprint change for a ledger entry.
+
+        The source PDF is read from the processed directory. Unless
+        ``reparse`` is set (or the stored parse is missing) the previous
+        parser output is reused and only the downstream stages run.
+        """
+        self.logger.info("Starting PDF reprocess workflow",
+                         extra={"run_id": self.RUN_ID, "sha256": entry["sha256"], "reparse": reparse})
+        self.req = PdfIngestionRequest(
+            PdfInput=entry["processed_file"],
+            JsonOutput=entry["json_output"],
+            MarkdownOutput=entry["markdown_output"])
+        self._pdf_path = Path(entry["processed_file"])
+        self._source = entry["source"]
+        self.processed_path = self._pdf_path
+        self.sha256 = entry["sha256"]
+        self.output_files = {}
+        self.output_bytes = {}
+        # Re-parsing upgrades a degraded entry to the base tier
+        self.tier = base_tier() if reparse else entry.get("tier") or base_tier()
+        self.pages = [] if reparse else (load_parsed(self.sha256) or [])
+
+        if not self.pages:
+            self.logger.info("Re-parsing PDF file", extra={"run_id": self.RUN_ID})
+            self._ingest()
+        self._redact()
+        self._store_json()
+        self._store_markdown()
+        self._index()
+        self._store_run()
+        self.logger.info("PDF reprocess workflow completed successfully", extra={"run_id": self.RUN_ID})
+
     def _update_job_record(self):
         # TODO: Implement job record update
         self.logger.info("Job record updated", extra={"run_id": self.RUN_ID})
         pass
     
+    def _prescan(self):
+        if not CFG.get('prescan', {}).get('enabled', True):
+            self.sha256 = sha256_file(self._pdf_path)
+            return
+        self.prescan = prescan_cache().scan(self._pdf_path)
+        self.sha256 = self.prescan.sha256
+        reason = rejection_reason(self.prescan)
+        if reason:
+            raise PdfRejectedError(reason)
+        self.logger.info("PDF prescan completed", 
+                        extra={"run_id": self.RUN_ID, "sha256": self.prescan.sha256,
+                               "page_count": self.prescan.page_count,
+                               "has_text_layer": self.prescan.has_text_layer})
+
     def _ingest(self):
-        # TODO: Implement PDF ingestion using LlamaParse
-        self.logger.info("PDF ingestion completed", extra={"run_id": self.RUN_ID})
-        pass
+        self._admit_parser()
+        try:
+            targets = self._plan_parse()
+            job_id, pages = None, []
+            if targets != []:
+                job_id, pages = self._parse(target_pages=targets)
+        finally:
+            self._release_admission()
+        self._apply_parse(job_id, pages, targets)
+
+    def _admit_parser(self):
+        """Take the parser circuit's admission before hashing pages or optimizing.
+
+        A job the circuit would refuse fails here, before spending CPU on
+        it. ``_call_parser`` uses the admission; if no parser call follows
+        (every page cached) ``_release_admission`` gives it back.
+        """
+        if self.tier == LOCAL:
+            return
+        if not parser_breaker().allow():
+            raise ParserUnavailable(f"Parser circuit is open, holding {self._pdf_path.name}")
+        self._admitted = True
+
+    def _release_admission(self):
+        if self._admitted:
+            self._admitted = False
+            parser_breaker().release_probe()
+
+    def _plan_parse(self):
+        """Work out which pages need a remote parse.
+
+        Pages already parsed in an earlier document come from the page
+        cache; only the first occurrence of each uncached page is parsed.
+        Returns ``None`` to parse the whole document, otherwise the 0-based
+        page numbers to parse (empty when every page is cached).
+        """
+        self._page_hash_list = self._page_hashes()
+        self._cached_pages = {}
+        if not self._page_hash_list:
+            return None
+        cache = page_cache()
+        missing = {}
+        for number, page_hash in enumerate(self._page_hash_list):
+            if page_hash in self._cached_pages or page_hash in missing:
+                continue
+            markdown = cache.get(page_hash)
+            if markdown is None:
+                missing[page_hash] = number
+            else:
+                self._cached_pages[page_hash] = markdown
+        numbers = list(missing.values())
+        return None if len(numbers) == len(self._page_hash_list) else numbers
+
+    def _apply_parse(self, job_id, pages, targets):
+        """Merge parsed ``pages`` for ``targets`` with cached pages, in page order."""
+        hashes = self._page_hash_list
+        # Pages parsed below the base tier are not shared with other documents
+        cache = page_cache() if not is_degraded(self.tier) else None
+        if targets is None:
+            self.pages = pages
+            if cache is not None and hashes and len(pages) == len(hashes):
+                for page_hash, markdown in zip(hashes, pages):
+                    cache.put(page_hash, markdown)
+            elif cache is not None and hashes:
+                # The parser and the page tree disagree; keep the parser's pages uncached
+                self.logger.warning("Parsed page count differs from page tree, not caching pages",
+                                    extra={"run_id": self.RUN_ID, "pages": len(pages),
+                                           "page_tree_pages": len(hashes)})
+        else:
+            if len(pages) != len(targets):
+                raise PdfIngestionError(
+                    f"Parser returned {len(pages)} pages for {self._pdf_path.name}, expected {len(targets)}")
+            by_hash = dict(self._cached_pages)
+            for number, markdown in zip(targets, pages):
+                if cache is not None:
+                    cache.put(hashes[number], markdown)
+                by_hash[hashes[number]] = markdown
+            self.pages = [by_hash[page_hash] for page_hash in hashes]
+        save_parsed(self.sha256, self.pages)
+        self.logger.info("PDF ingestion completed", 
+                        extra={"run_id": self.RUN_ID, "job_id": job_id, "tier": self.tier,
+                               "pages": len(self.pages), "parsed_pages": len(pages)})
+
+    def _page_hashes(self):
+        if not CFG.get('page_cache', {}).get('enabled', True):
+            return None
+        try:
+            return page_hashes(self._pdf_path) or None
+        except PdfSyntaxError as e:
+            self.logger.warning("Page hashing failed, parsing all pages",
+                                extra={"run_id": self.RUN_ID, "error": str(e)})
+            return None
+
+    def _parse(self, target_pages=None):
+        started = time.monotonic()
+        try:
+            return self._parse_pages(target_pages)
+        finally:
+            self.parse_s = time.monotonic() - started
+
+    def _parse_pages(self, target_pages):
+        if self.tier == LOCAL:
+            try:
+                return None, extract_pages(self._pdf_path, target_pages)
+            except PdfSyntaxError as e:
+                self.logger.warning("Local extraction failed, parsing at the standard tier",
+                                    extra={"run_id": self.RUN_ID, "error": str(e)})
+                self.tier = STANDARD
+        results = self._call_parser(PARSE, target_pages)
+        if not results:
+            raise PdfIngestionError(f"Parser returned no result for {self._pdf_path.name}")
+        return results[0].get("job_id"), [page.get("md", "") for page in results[0].get("pages", [])]
+
+    def _submit(self, target_pages=None):
+        # Upload only; the job's result is collected by the ParsePoller
+        return self._call_parser(SUBMIT, target_pages)
+
+    def _call_parser(self, method, target_pages):
+        # Stream the upload from a memory-mapped file in fixed-size chunks so
+        # peak memory per worker does not grow with the size of the PDF
+        chunk_size = CFG['llamaparse'].get('upload_chunk_size', DEFAULT_UPLOAD_CHUNK_SIZE)
+        # Refuse without a network call while the parser circuit is open,
+        # unless the job was admitted before its pages were hashed
+        breaker = parser_breaker()
+        if self._admitted:
+            self._admitted = False
+        elif not breaker.allow():
+            raise ParserUnavailable(f"Parser circuit is open, holding {self._pdf_path.name}")
+        # With [workers].processes the call runs in a recycled worker process
+        pool = parser_pool()
+        # target_pages is 0-based; each ingest instance owns its parser
+        self.parser.target_pages = ",".join(map(str, target_pages)) if target_pages else None
+        self.parser.premium_mode = self.tier == PREMIUM
+        upload = self._upload_path()
+        try:
+            if pool is not None:
+                args = (method, str(upload), target_pages, chunk_size)
+                if is_degraded(self.tier):
+                    args += (self.tier == PREMIUM,)
+                result = pool.call(parse_in_worker, *args)
+            else:
+                with MappedUploadStream(upload, chunk_size=chunk_size) as stream:
+                    result = run_parser(self.parser, method, stream, self._pdf_path.name)
+        except Exception as e:
+            if isinstance(e, ParserUnavailable) or is_outage(e):
+                breaker.record_failure()
+                raise ParserUnavailable(f"Parser unavailable: {e}") from e
+            if is_parser_reply(e):
+                breaker.record_success()
+            else:
+                # A local failure (the file, a lost worker) says nothing
+                # about the parser, but a probe slot must not leak
+                breaker.release_probe()
+            raise
+        finally:
+            self.parser.target_pages = None
+            if upload != self._pdf_path:
+                shutil.rmtree(upload.parent, ignore_errors=True)
+                try:
+                    upload.parent.parent.rmdir()
+                except OSError:
+                    pass  # still holds the copy of another job on the same file
+        breaker.record_success()
+        return result
+
+    def _upload_path(self):
+        """The file to upload: the original, or a smaller optimized copy (see ``optimize``)."""
+        try:
+            optimized = optimize_for_upload(self._pdf_path, self.sha256, self.RUN_ID)
+        except Exception as e:
+            # Optimization only saves upload time; never fail the job over it
+            self.logger.warning("Pre-upload optimization failed, uploading the original",
+                                extra={"run_id": self.RUN_ID, "error": str(e), "error_type": type(e).__name__})
+            return self._pdf_path
+        if optimized is None:
+            return self._pdf_path
+        path, result = optimized
+        self.logger.info("PDF optimized for upload",
+                         extra={"run_id": self.RUN_ID, "input_bytes": result.input_bytes,
+                                "output_bytes": result.output_bytes, "images": result.images,
+                                "downsampled": result.downsampled, "objects_dropped": result.objects_dropped})
+        return path
     
+    def _redact(self):
+        self.redacted_pages = [redact(page) for page in self.pages]
+        self.logger.info("Parsed output redacted", extra={"run_id": self.RUN_ID})
+
     def _store_json(self):
-        # TODO: Implement JSON storage
-        self.logger.info("JSON output stored", extra={"run_id": self.RUN_ID, "output_dir": str(self._OUTPUT_JSON_DIR)})
-        pass
+        # One structured record per page, converted while it is written
+        lines = page_records(self.sha256, self._pdf_path.name, self.redacted_pages,
+                             validate=CFG['output'].get('validate_json', True),
+                             tier=self.tier if is_degraded(self.tier) else None)
+        output, size = self._write_output(Path(self.req.JsonOutput), lines, b"")
+        self.output_files["json"] = output
+        self.output_bytes["json"] = size
+        self.logger.info("JSON output stored", extra={"run_id": self.RUN_ID, "output": str(output)})
     
     def _store_markdown(self):
-        # TODO: Implement Markdown storage
-        self.logger.info("Markdown output stored", extra={"run_id": self.RUN_ID, "output_dir": str(self._OUTPUT_MARKDOWN_DIR)})
-        pass
+        pages = [page.encode("utf-8") for page in self.redacted_pages]
+        if is_degraded(self.tier) and pages:
+            pages[0] = f"<!-- tier: {self.tier} -->\n\n".encode() + pages[0]
+        output, size = self._write_output(Path(self.req.MarkdownOutput), pages, b"\n\n")
+        self.output_files["markdown"] = output
+        self.output_bytes["markdown"] = size
+        self.logger.info("Markdown output stored", extra={"run_id": self.RUN_ID, "output": str(output)})
+
+    def _index(self):
+        if not CFG.get('search', {}).get('enabled', True):
+            return
+        search_index().add(self.sha256, self._pdf_path.name, self.redacted_pages)
+        self.logger.info("Markdown output indexed", extra={"run_id": self.RUN_ID, "pages": len(self.redacted_pages)})
+
+    def _write_output(self, path, pages, separator):
+        # Pages stream to the configured sink (local files or object
+        # storage); the returned location is what the ledger records and
+        # the byte count, taken while writing, what the change feed does.
+        # With [output].compression set, pages are written as compressed
+        # frames with a sidecar offset index instead of one flat file
+        sink = output_sink()
+        codec = CFG['output'].get('compression')
+        if not codec:
+            size = 0
+            with sink.open(path) as f:
+                for number, page in enumerate(pages):
+                    if number:
+                        f.write(separator)
+                        size += len(separator)
+                    f.write(page)
+                    size += len(page)
+            return sink.location(path), size
+        framed, size = write_framed(framed_path(path, codec), list(pages), codec=codec,
+                                    pages_per_frame=CFG['output'].get('pages_per_frame', 16),
+                                    level=CFG['output'].get('compression_level', 6), sink=sink,
+                                    separator=separator)
+        return sink.location(framed), size
 
     def _store_processed(self):
-        # TODO: Implement processed file storage
-        self.logger.info("File moved to processed directory", extra={"run_id": self.RUN_ID})
-        pass
+        if self._in_place:
+            # Manifest backfills leave source files where they are
+            self.processed_path = self._pdf_path
+            self.logger.info("File left in place", extra={"run_id": self.RUN_ID, "path": str(self._pdf_path)})
+            return
+        directory = self._PROCESSED_DIR / expand(CFG['processed'].get('subdir_format', ''),
+                                                 self._pdf_path.name, self.RUN_ID)
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / self._pdf_path.name
+        if target.exists() and not CFG['processed'].get('overwrite_on_dup', True):
+            target = directory / f"{self._pdf_path.stem}-{self.RUN_ID}{self._pdf_path.suffix}"
+        shutil.move(str(self._pdf_path), str(target))
+        self.processed_path = target
+        self.logger.info("File moved to processed directory", extra={"run_id": self.RUN_ID, "path": str(target)})
     
-    def _store_quarantine(self):
-        # TODO: Implement quarantine file storage
-        self.logger.info("File moved to quarantine directory", extra={"run_id": self.RUN_ID})
-        pass
+    def _store_quarantine(self, error: Exception):
+        if not self._pdf_path.exists():
+            return
+        self._QUARANTINE_DIR.mkdir(parents=True, exist_ok=True)
+        target = self._QUARANTINE_DIR / self._pdf_path.name
+        reason = f"run_id: {self.RUN_ID}\nerror_type: {type(error).__name__}\nerror: {error}\n"
+        if self._in_place:
+            # Only the reason is recorded; the source file stays where it is
+            atomic_write_text(target.with_name(f"{target.name}.reason.txt"), f"source: {self._pdf_path}\n{reason}")
+            self.logger.info("Failure recorded in quarantine directory", extra={"run_id": self.RUN_ID, "path": str(target)})
+            return
+        shutil.move(str(self._pdf_path), str(target))
+        retry = self._schedule_retry(error, target)
+        if retry is not None and retry.due_at is not None:
+            reason += (f"retry_attempt: {retry.attempts}\n"
+                       f"retry_at: {datetime.fromtimestamp(retry.due_at).astimezone().isoformat()}\n")
+        atomic_write_text(target.with_name(f"{target.name}.reason.txt"), reason)
+        self.logger.info("File moved to quarantine directory",
+                         extra={"run_id": self.RUN_ID, "path": str(target),
+                                "retry_at": retry.due_at if retry is not None else None})
+
+    def _schedule_retry(self, error, target):
+        # Retryable failures go back to their inbox later (see retries.py);
+        # every quarantine is logged to the job file either way
+        retry = None
+        if CFG.get('retry_queue', {}).get('enabled', True) and is_retryable(error):
+            inbox = self._pdf_path.parent
+            if inbox.name == SPOOL_DIR_NAME:
+                inbox = inbox.parent
+            retry = retry_schedule().schedule(self.sha256 or target.name, target.name, str(inbox),
+                                              f"{type(error).__name__}: {error}")
+        append_job_row(Path(CFG['job']['job_file']), job_id=self.RUN_ID, job_name=target.name,
+                       status=SCHEDULED if retry is not None and retry.due_at is not None else EXHAUSTED,
+                       retries=retry.attempts if retry is not None else 0,
+                       input_file=str(self._pdf_path), quarantine_file=str(target))
+        return retry
 
     def _store_run(self):
-        # TODO: Implement run metadata storage
-        self.logger.info("Run metadata stored", extra={"run_id": self.RUN_ID})
-        pass
\ No newline at end of file
+        ledger().record(
+            self.sha256,
+            self._source,
+            file_name=self._pdf_path.name,
+            run_id=self.RUN_ID,
+            processed_file=str(self.processed_path),
+            json_output=self.req.JsonOutput,
+            markdown_output=self.req.MarkdownOutput,
+            output_files=self.output_files,
+            tier=self.tier,
+            fingerprints=current_fingerprints(self.tier if is_degraded(self.tier) else None))
+        retry_schedule().clear(self.sha256)
+        self.logger.info("Run metadata stored", extra={"run_id": self.RUN_ID, "sha256": self.sha256})
+        # Outputs are in place and recorded; announce them to downstream loaders
+        feed = change_feed()
+        if feed is not None:
+            seq = feed.commit(self.RUN_ID, self.sha256, self._pdf_path.name, self.output_files, self.output_bytes)
+            self.logger.info("Commit appended to change feed", extra={"run_id": self.RUN_ID, "seq": seq})
+
+
+def stage_graph(poller=None, resolve=None):
+    """Stages of ``ingest`` for a ``StagePipeline``, sized by ``[pipeline]``.
+
+    JSON output, Markdown output and indexing only need the redacted pages,
+    so they run in parallel; the processed-file move waits for all three.
+    With a ``ParsePoller`` the parse stage only uploads and returns
+    ``PENDING``; ``resolve(job, stage, error)`` is called when the poller
+    collects the result.
+    """
+    workers = CFG.get('pipeline', {}).get('workers', {})
+    queue_size = CFG.get('pipeline', {}).get('queue_size', 16)
+
+    def parse(job):
+        if poller is None:
+            job._stage(INGEST, "Ingesting PDF file", job._ingest)
+            return None
+        job._check_stop()
+        if INGEST in job._checkpoint.completed:
+            return None
+        poller.reserve()
+        try:
+            job_id = job._submit_parse()
+        except BaseException:
+            poller.release()
+            raise
+        if job_id is None:
+            poller.release()
+            return None
+        poller.track(job_id, lambda result, error: collected(job, result, error))
+        return PENDING
+
+    def collected(job, result, error):
+        try:
+            job._collect_parse(result, error)
+        except Exception as e:
+            resolve(job, "parse", e)
+            return
+        resolve(job, "parse")
+
+    def redact(job):
+        job._check_stop()
+        job._redact()
+
+    def store_run(job):
+        job._check_stop()
+        job._store_run()
+        journal().remove(job.state_key)
+
+    stages = [
+        ("prepare", lambda job: job._prepare(), ()),
+        ("parse", parse, ("prepare",)),
+        ("redact", redact, ("parse",)),
+        ("store_json", lambda job: job._stage(STORE_JSON, "Storing JSON output", job._store_json), ("redact",)),
+        ("store_markdown", lambda job: job._stage(STORE_MARKDOWN, "Storing Markdown output", job._store_markdown), ("redact",)),
+        ("index", lambda job: job._index(), ("redact",)),
+        ("store_processed", lambda job: job._stage(STORE_PROCESSED, "Moving file to processed directory", job._store_processed),
+         ("store_json", "store_markdown", "index")),
+        ("store_run", store_run, ("store_processed",)),
+    ]
+    profiler = run_profiler()
+    return [Stage(name, profiler.wrap(fn, name), workers=workers.get(name, 1), queue_size=queue_size, after=after)
+            for name, fn, after in stages]
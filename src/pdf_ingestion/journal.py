@@ -0,0 +1,121 @@
+"""Per-job checkpoint journal so interrupted jobs resume where they stopped.
+
+Each in-flight job has a JSON checkpoint at ``[state].dir/journal/<key>.json``,
+keyed by its file's content hash and source path (``ledger.job_key``) so
+identical files ingested from different paths never share progress. It
+records the stages the job has completed and the artifacts they produced
+(output paths, the processed file). The parse itself is the artifact saved
+by ``ledger.save_parsed``, so a job interrupted after parsing resumes at
+its first incomplete stage without paying for another parse. The
+checkpoint is removed once the job is recorded in the ledger or
+quarantined.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from pdf_ingestion import singletons
+from pdf_ingestion.ledger import job_key, state_dir
+from pdf_ingestion.writers import atomic_write_text
+
+INGEST = "ingest"
+STORE_JSON = "store_json"
+STORE_MARKDOWN = "store_markdown"
+STORE_PROCESSED = "store_processed"
+
+_JOURNAL_DIR_NAME = "journal"
+
+
+@dataclass
+class JobCheckpoint:
+    """Progress of one job through the checkpointed stages."""
+
+    sha256: str
+    file_name: str
+    # Path the file was ingested from; with sha256 it keys the checkpoint
+    source: str
+    run_id: str
+    json_output: str
+    markdown_output: str
+    completed: list[str] = field(default_factory=list)
+    output_files: dict[str, str] = field(default_factory=dict)
+    # Bytes written to each output, as counted by the writer
+    output_bytes: dict[str, int] = field(default_factory=dict)
+    processed_file: str | None = None
+    # Remote parse job awaiting collection, and the pages it was asked for
+    job_id: str | None = None
+    parse_targets: list[int] | None = None
+    # Manifest backfill job reading its source in place (resumed by ingest-once)
+    in_place: bool = False
+    # Degradation tier the job was parsed at
+    tier: str | None = None
+    updated_at: str | None = None
+
+    @property
+    def key(self) -> str:
+        return job_key(self.sha256, self.source)
+
+
+class Journal:
+    """Directory of job checkpoints, each replaced atomically on update."""
+
+    def __init__(self, root: Path):
+        self._root = root
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self._root / f"{key}.json"
+
+    def load(self, key: str) -> JobCheckpoint | None:
+        """Return the checkpoint stored under ``key`` (see ``ledger.job_key``), if any."""
+        try:
+            return JobCheckpoint(**json.loads(self._path(key).read_text(encoding="utf-8")))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError):
+            # A checkpoint we cannot read only costs a re-run of its stages
+            return None
+
+    def save(self, checkpoint: JobCheckpoint) -> None:
+        checkpoint.updated_at = datetime.now(UTC).isoformat()
+        with self._lock:
+            atomic_write_text(self._path(checkpoint.key), json.dumps(asdict(checkpoint), indent=2))
+
+    def complete(self, checkpoint: JobCheckpoint, stage: str, **artifacts: Any) -> None:
+        """Mark ``stage`` done, merge its ``artifacts`` and persist the checkpoint."""
+        for name, value in artifacts.items():
+            setattr(checkpoint, name, value)
+        if stage not in checkpoint.completed:
+            checkpoint.completed.append(stage)
+        self.save(checkpoint)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._path(key).unlink(missing_ok=True)
+
+    def pending(self) -> list[JobCheckpoint]:
+        """Checkpoints of jobs that have not finished, oldest first."""
+        if not self._root.exists():
+            return []
+        checkpoints = [self.load(path.stem) for path in self._root.glob("*.json")]
+        return sorted((c for c in checkpoints if c is not None), key=lambda c: c.updated_at or "")
+
+
+_JOURNAL: Journal | None = None
+_JOURNAL_LOCK = threading.Lock()
+singletons.register(__name__, "_JOURNAL")
+
+
+def journal() -> Journal:
+    """Return the process-wide checkpoint journal under ``[state].dir``."""
+    global _JOURNAL
+    with _JOURNAL_LOCK:
+        if _JOURNAL is None:
+            _JOURNAL = Journal(state_dir() / _JOURNAL_DIR_NAME)
+        return _JOURNAL
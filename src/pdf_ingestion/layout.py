@@ -0,0 +1,89 @@
+"""Sharded directory layout for outputs and processed files.
+
+Output file formats (``[output].jsonl_file_format`` and friends) and
+``[processed].subdir_format`` are expanded with:
+
+* ``{stem}``: the input file name
+* ``{cuid}``: the job id
+* ``{ts}``: the UTC time the job's paths were made, ``YYYYMMDDTHHMMSSZ``
+* ``{date}``: the UTC date as ``YYYY/MM/DD`` partitions
+* ``{shard}``: ``[layout].shard_levels`` directories of
+  ``[layout].shard_width`` hex digits of the SHA-256 of the job id, e.g.
+  ``3f/a2``
+
+With ``{shard}`` in a path each directory holds a bounded share of the
+files (``16 ** (levels * width)`` directories), so creating, finding and
+listing files does not slow down as the total grows, and a job's directory
+follows from its id alone. ``locate`` resolves a job id to its files.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import string
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from config import settings
+from pdf_ingestion.framed import SUFFIXES as FRAMED_SUFFIXES
+
+CFG = settings()
+
+_FORMATTER = string.Formatter()
+# Template name -> ``output_files`` kind, and -> requested-path ledger field
+_OUTPUT_KINDS = {"jsonl": "json", "markdown": "markdown"}
+_RECORDED = {"jsonl": "json_output", "markdown": "markdown_output", "processed": "processed_file"}
+
+
+def shard(job_id: str, levels: int | None = None, width: int | None = None) -> str:
+    """Hash-prefix directories for ``job_id``, e.g. ``"3f/a2"``."""
+    layout = CFG.get('layout', {})
+    levels = layout.get('shard_levels', 2) if levels is None else levels
+    width = layout.get('shard_width', 2) if width is None else width
+    digest = hashlib.sha256(job_id.encode("utf-8")).hexdigest()
+    return "/".join(digest[level * width:(level + 1) * width] for level in range(levels))
+
+
+def placeholders(template: str) -> set[str]:
+    return {name for _, name, _, _ in _FORMATTER.parse(template) if name}
+
+
+def expand(template: str, stem: str, cuid: str, now: datetime | None = None) -> str:
+    """Fill in the layout placeholders of ``template`` for one job."""
+    now = now or datetime.now(UTC)
+    return template.format(stem=stem, cuid=cuid, ts=now.strftime("%Y%m%dT%H%M%SZ"),
+                           date=now.strftime("%Y/%m/%d"), shard=shard(cuid))
+
+
+def locate(job_id: str, templates: Mapping[str, str],
+           entry: Mapping[str, Any] | None = None) -> dict[str, list[Path | str]]:
+    """Resolve ``job_id`` to its files for each named path template.
+
+    A ledger ``entry`` for the job gives the recorded locations: the files
+    actually written (``output_files``, which may be framed ``.gz``/``.zst``
+    files or ``s3://`` URLs, returned as strings), else the requested paths.
+    Otherwise the directory is computed from the template, which works when
+    it only depends on the job id (``{cuid}``, ``{shard}``): the file, plain
+    or framed, is then found in that one directory without walking the tree.
+    """
+    found: dict[str, list[Path | str]] = {}
+    written = (entry or {}).get("output_files") or {}
+    for name, template in templates.items():
+        location = written.get(_OUTPUT_KINDS.get(name, name))
+        if location:
+            found[name] = [location if "://" in location else Path(location)]
+            continue
+        if entry is not None and entry.get(_RECORDED.get(name, name)):
+            found[name] = [Path(entry[_RECORDED.get(name, name)])]
+            continue
+        path = Path(template)
+        if placeholders(str(path.parent)) - {"cuid", "shard"}:
+            found[name] = []  # partitioned by date or name; only the ledger knows
+            continue
+        directory = Path(str(path.parent).format(cuid=job_id, shard=shard(job_id)))
+        pattern = path.name.format(stem="*", cuid=job_id, ts="*", date="*", shard="*")
+        found[name] = sorted(match for suffix in ("", *FRAMED_SUFFIXES.values())
+                             for match in directory.glob(pattern + suffix)) if directory.is_dir() else []
+    return found
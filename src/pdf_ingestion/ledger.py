@@ -0,0 +1,176 @@
+"""Ledger of processed files, keyed by content hash and source path.
+
+The ledger is a SQLite database at ``[state].dir/ledger.db`` with one row
+per job key (see ``job_key``) and indexes on the content hash and the run
+id, so recording a job or looking one up costs the same however many
+documents have been ingested. Identical files from different paths keep
+their own rows; the content hash alone only finds a copy of a file. Each
+entry (a JSON document in the row) records where a file's outputs went and
+the stage fingerprints they were produced with, which is what
+``reprocess`` scans. A ``ledger.json`` from earlier versions is imported
+once and renamed. Raw parser output is kept next to it under ``parsed/``
+so outputs can be re-rendered without paying for another parse.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.writers import atomic_write_text
+
+_LEDGER_FILE_NAME = "ledger.db"
+_LEGACY_FILE_NAME = "ledger.json"
+_PARSED_DIR_NAME = "parsed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    job_key TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    run_id TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_sha256 ON entries (sha256);
+CREATE INDEX IF NOT EXISTS entries_run_id ON entries (run_id);
+"""
+
+
+def job_key(sha256: str, source: str) -> str:
+    """Key of the state kept for one file: its content hash and the path it was ingested from."""
+    return f"{sha256}-{hashlib.sha256(source.encode()).hexdigest()[:16]}"
+
+
+class Ledger:
+    """Thread-safe ledger of processed files."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._import_legacy(path.with_name(_LEGACY_FILE_NAME))
+
+    def _import_legacy(self, legacy: Path) -> None:
+        if not legacy.exists():
+            return
+        entries = json.loads(legacy.read_text(encoding="utf-8") or "{}")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO entries (job_key, sha256, run_id, entry) VALUES (?, ?, ?, ?)",
+                    [(job_key(sha256, source), sha256, entry.get("run_id"), json.dumps(dict(entry, source=source)))
+                     for sha256, entry in entries.items()
+                     for source in [entry.get("file_name", "")]])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        legacy.rename(legacy.with_name(f"{legacy.name}.imported"))
+
+    def get(self, sha256: str) -> dict[str, Any] | None:
+        """Return the entry last recorded for any file with content ``sha256``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entry FROM entries WHERE sha256 = ? ORDER BY rowid DESC LIMIT 1", (sha256,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def get_job(self, sha256: str, source: str) -> dict[str, Any] | None:
+        """Return the entry for the file with content ``sha256`` ingested from ``source``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entry FROM entries WHERE job_key = ?", (job_key(sha256, source),)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def find_run(self, run_id: str) -> dict[str, Any] | None:
+        """Return the entry last written by job ``run_id``."""
+        with self._lock:
+            row = self._conn.execute("SELECT entry FROM entries WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def entries(self) -> list[dict[str, Any]]:
+        return list(self.iter_entries())
+
+    def iter_entries(self) -> Iterator[dict[str, Any]]:
+        """Yield every entry in the order first recorded, without loading them all at once."""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, entry FROM entries WHERE rowid > ? ORDER BY rowid LIMIT 1000", (last,)).fetchall()
+            if not rows:
+                return
+            for last, entry in rows:
+                yield json.loads(entry)
+
+    def record(self, sha256: str, source: str, **fields: Any) -> dict[str, Any]:
+        """Merge ``fields`` into the entry for ``sha256`` from ``source`` and persist it."""
+        key = job_key(sha256, source)
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT entry FROM entries WHERE job_key = ?", (key,)).fetchone()
+                entry = json.loads(row[0]) if row is not None else {"sha256": sha256, "source": source}
+                entry.update(fields)
+                entry["updated_at"] = datetime.now(UTC).isoformat()
+                conn.execute(
+                    "INSERT INTO entries (job_key, sha256, run_id, entry) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (job_key) DO UPDATE SET run_id = excluded.run_id, entry = excluded.entry",
+                    (key, sha256, entry.get("run_id"), json.dumps(entry, sort_keys=True)))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return entry
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def state_dir() -> Path:
+    return Path(settings()["state"]["dir"])
+
+
+def parsed_artifact_path(sha256: str) -> Path:
+    return state_dir() / _PARSED_DIR_NAME / f"{sha256}.json"
+
+
+def save_parsed(sha256: str, pages: list[str]) -> Path:
+    """Persist raw parser output (markdown per page) for later re-rendering."""
+    path = parsed_artifact_path(sha256)
+    atomic_write_text(path, json.dumps({"sha256": sha256, "pages": pages}))
+    return path
+
+
+def load_parsed(sha256: str) -> list[str] | None:
+    path = parsed_artifact_path(sha256)
+    if not path.exists():
+        return None
+    return list(json.loads(path.read_text(encoding="utf-8"))["pages"])
+
+
+_LEDGER: Ledger | None = None
+_LEDGER_LOCK = threading.Lock()
+singletons.register(__name__, "_LEDGER", Ledger.close)
+
+
+def ledger() -> Ledger:
+    """Return the process-wide ledger stored under ``[state].dir``."""
+    global _LEDGER
+    with _LEDGER_LOCK:
+        if _LEDGER is None:
+            _LEDGER = Ledger(state_dir() / _LEDGER_FILE_NAME)
+        return _LEDGER
@@ -0,0 +1,170 @@
+"""Local text extraction, used by the ``local`` degradation tier.
+
+Pages are read with the same object reader as the prescan and their
+content streams are scanned for text-showing operators, so no parse quota
+or network call is spent. Fonts with a ``/ToUnicode`` map are decoded
+through it and other fonts as WinAnsi. Each text line becomes one line of
+the page's markdown; headings, tables, text in form XObjects and scanned
+pages are not recovered, which is why these outputs are tagged for a later
+re-parse.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+import zlib
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from pdf_ingestion.errors import PdfSyntaxError
+from pdf_ingestion.pdfobjects import PdfPage, PdfReader, PdfStream, iter_operations
+
+# A TJ adjustment (thousandths of an em) wider than this is a word gap
+_WORD_GAP = 200
+# Largest bfrange expanded from a ToUnicode map
+_MAX_RANGE = 1 << 16
+
+_BFCHAR_RE = re.compile(rb"beginbfchar(.*?)endbfchar", re.S)
+_BFRANGE_RE = re.compile(rb"beginbfrange(.*?)endbfrange", re.S)
+_CMAP_TOKEN_RE = re.compile(rb"<([0-9A-Fa-f\s]*)>|\[|\]")
+
+
+def _winansi(data: bytes) -> str:
+    return data.decode("cp1252", errors="replace")
+
+
+def _hex(token: bytes) -> bytes:
+    digits = re.sub(rb"\s", b"", token)
+    return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii"))
+
+
+def _utf16(data: bytes) -> str:
+    return data.decode("utf-16-be", errors="replace")
+
+
+class _ToUnicode:
+    """Character codes to text from a ``/ToUnicode`` CMap (bfchar and bfrange)."""
+
+    def __init__(self, cmap: bytes):
+        self._map: dict[bytes, str] = {}
+        for body in _BFCHAR_RE.findall(cmap):
+            codes = [_hex(m.group(1)) for m in _CMAP_TOKEN_RE.finditer(body) if m.group(1) is not None]
+            for src, dst in zip(codes[0::2], codes[1::2], strict=False):
+                self._map[src] = _utf16(dst)
+        for body in _BFRANGE_RE.findall(cmap):
+            self._add_ranges(body)
+        self._widths = sorted({len(code) for code in self._map}, reverse=True) or [1]
+
+    def _add_ranges(self, body: bytes) -> None:
+        tokens: list[Any] = []
+        array: list[bytes] | None = None
+        for m in _CMAP_TOKEN_RE.finditer(body):
+            if m.group() == b"[":
+                array = []
+            elif m.group() == b"]":
+                tokens.append(array or [])
+                array = None
+            elif array is not None:
+                array.append(_hex(m.group(1)))
+            else:
+                tokens.append(_hex(m.group(1)))
+        for low, high, dst in zip(tokens[0::3], tokens[1::3], tokens[2::3], strict=False):
+            if not isinstance(low, bytes) or not isinstance(high, bytes):
+                continue
+            first, last = int.from_bytes(low, "big"), int.from_bytes(high, "big")
+            for offset in range(min(last - first + 1, _MAX_RANGE)):
+                code = (first + offset).to_bytes(len(low), "big")
+                if isinstance(dst, list):
+                    if offset < len(dst):
+                        self._map[code] = _utf16(dst[offset])
+                elif dst:
+                    value = int.from_bytes(dst, "big") + offset
+                    self._map[code] = _utf16(value.to_bytes(len(dst), "big"))
+
+    def __call__(self, data: bytes) -> str:
+        out = []
+        pos = 0
+        while pos < len(data):
+            for width in self._widths:
+                text = self._map.get(data[pos : pos + width])
+                if text is not None:
+                    out.append(text)
+                    pos += width
+                    break
+            else:
+                # Unmapped; a one-byte code falls back to WinAnsi
+                out.append(_winansi(data[pos : pos + 1]) if self._widths[-1] == 1 else "")
+                pos += self._widths[-1]
+        return "".join(out)
+
+
+def _decoder(reader: PdfReader, font: Any) -> Callable[[bytes], str]:
+    if isinstance(font, dict):
+        cmap = reader.resolve(font.get("ToUnicode"))
+        if isinstance(cmap, PdfStream):
+            try:
+                return _ToUnicode(reader.decode_stream(cmap))
+            except (PdfSyntaxError, ValueError):
+                pass
+    return _winansi
+
+
+def page_text(reader: PdfReader, page: PdfPage) -> str:
+    """Text shown on ``page``, one line per text line."""
+    fonts = reader.resolve(page.resources.get("Font")) or {}
+    decoders: dict[str, Callable[[bytes], str]] = {}
+    decode = _winansi
+    lines: list[str] = []
+    line: list[str] = []
+
+    def end_line() -> None:
+        text = "".join(line).strip()
+        if text:
+            lines.append(text)
+        line.clear()
+
+    for operator, operands in iter_operations(reader.page_content(page)):
+        if operator == "Tf" and operands and isinstance(operands[0], str):
+            name = operands[0]
+            if name not in decoders:
+                decoders[name] = _decoder(reader, reader.resolve(fonts.get(name)))
+            decode = decoders[name]
+        elif operator in ("Tj", "'", '"'):
+            if operator != "Tj":
+                end_line()
+            if operands and isinstance(operands[-1], bytes):
+                line.append(decode(operands[-1]))
+        elif operator == "TJ":
+            for item in operands[-1] if operands and isinstance(operands[-1], list) else []:
+                if isinstance(item, bytes):
+                    line.append(decode(item))
+                elif isinstance(item, (int, float)) and item < -_WORD_GAP:
+                    line.append(" ")
+        elif operator in ("Td", "TD"):
+            if len(operands) >= 2 and operands[1] != 0:
+                end_line()
+        elif operator in ("T*", "Tm", "ET"):
+            end_line()
+    end_line()
+    return "\n".join(lines)
+
+
+def extract_pages(path: Path, pages: list[int] | None = None) -> list[str]:
+    """Return the text of ``pages`` (0-based, every page when None) of ``path``.
+
+    Raises ``PdfSyntaxError`` if the page tree or a content stream cannot
+    be read.
+    """
+    wanted = None if pages is None else set(pages)
+    found: dict[int, str] = {}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        try:
+            reader = PdfReader(buf)
+            for number, page in enumerate(reader.iter_pages()):
+                if wanted is None or number in wanted:
+                    found[number] = page_text(reader, page)
+        except (ValueError, KeyError, IndexError, TypeError, zlib.error) as e:
+            raise PdfSyntaxError(f"Unreadable page content: {e}") from e
+    return [found.get(number, "") for number in (pages if pages is not None else sorted(found))]
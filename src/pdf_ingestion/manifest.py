@@ -0,0 +1,245 @@
+"""Manifest-driven bulk ingest: lazy manifest reading and resumable progress.
+
+A manifest lists source PDFs, one per entry, as JSONL (``{"path": ...}`` or
+a bare JSON string per line) or CSV (a ``path`` column, or the first column
+when there is no such header). Entries are read lazily so manifests with
+millions of rows never sit in memory.
+
+Progress is tracked per manifest under ``[state].dir/manifests/`` as a
+watermark (every entry at or below it is settled) plus the finished
+entries above it. The pipeline finishes entries out of order, but only
+within its in-flight window, so the set above the watermark stays small.
+Deferred entries are recorded as pending: the watermark moves past them,
+and the next run of the manifest retries them.
+
+The progress file is an append log: each finished or deferred entry adds
+one JSON line, so a flush writes only what changed since the last one. A
+snapshot line of the whole state starts the file, and the log is
+rewritten as a fresh snapshot once it has grown well past the state it
+describes.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from pdf_ingestion.ledger import state_dir
+from pdf_ingestion.writers import atomic_write_text
+
+_PROGRESS_DIR_NAME = "manifests"
+_PATH_COLUMN = "path"
+# Log lines before a compaction is considered, however small the state
+_COMPACT_MIN_LINES = 100_000
+
+
+@dataclass
+class ManifestEntry:
+    """One manifest row; ``number`` is its 1-based position among entries."""
+
+    number: int
+    path: Path
+
+
+def iter_manifest(path: Path) -> Iterator[ManifestEntry]:
+    """Yield the entries of a ``.jsonl`` or ``.csv`` manifest lazily.
+
+    Blank lines are skipped. Relative paths resolve against the manifest's
+    directory.
+    """
+    base = path.resolve().parent
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = _iter_csv(f) if path.suffix.lower() == ".csv" else _iter_jsonl(f)
+        for number, value in enumerate(rows, start=1):
+            source = Path(value).expanduser()
+            yield ManifestEntry(number, source if source.is_absolute() else base / source)
+
+
+def _iter_jsonl(f) -> Iterator[str]:
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        value = json.loads(line)
+        if isinstance(value, dict):
+            value = value.get(_PATH_COLUMN)
+        if not isinstance(value, str) or not value:
+            raise ValueError(f"Manifest line {line_number} has no path")
+        yield value
+
+
+def _iter_csv(f) -> Iterator[str]:
+    reader = csv.reader(f)
+    column = 0
+    for row_number, row in enumerate(reader, start=1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if row_number == 1 and _PATH_COLUMN in (cell.strip().lower() for cell in row):
+            column = [cell.strip().lower() for cell in row].index(_PATH_COLUMN)
+            continue
+        yield row[column].strip()
+
+
+class ManifestProgress:
+    """Finished-entry tracking for one manifest, persisted as an append log."""
+
+    def __init__(self, path: Path, flush_every: int = 100):
+        self._path = path
+        self._flush_every = flush_every
+        self._lock = threading.Lock()
+        self._watermark = 0
+        self._done_above: set[int] = set()
+        # Deferred entries; these stay pending below the watermark too
+        self._pending: set[int] = set()
+        self._failed = 0
+        self._unflushed: list[dict] = []
+        self._logged = 0
+        if path.exists():
+            self._load()
+        # Each run starts the file on a fresh snapshot: lines appended after
+        # a torn one would be lost on replay, and a whole-state file written
+        # before the log has no trailing newline
+        self._rewrite = True
+
+    @classmethod
+    def for_manifest(cls, manifest: Path) -> ManifestProgress:
+        """Progress file keyed by the manifest's resolved path."""
+        key = hashlib.sha256(str(manifest.resolve()).encode()).hexdigest()[:16]
+        return cls(state_dir() / _PROGRESS_DIR_NAME / f"{manifest.stem}-{key}.json")
+
+    @property
+    def watermark(self) -> int:
+        with self._lock:
+            return self._watermark
+
+    @property
+    def failed(self) -> int:
+        with self._lock:
+            return self._failed
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def is_done(self, number: int) -> bool:
+        with self._lock:
+            return self._is_done_locked(number)
+
+    def mark(self, number: int, failed: bool = False) -> None:
+        """Record entry ``number`` as finished (successfully or quarantined)."""
+        with self._lock:
+            if self._is_done_locked(number):
+                return
+            self._apply(number, failed=failed)
+            self._log_locked({"n": number, "failed": True} if failed else {"n": number})
+
+    def defer(self, number: int) -> None:
+        """Record entry ``number`` as pending, for the next run to retry."""
+        with self._lock:
+            if self._is_done_locked(number) or number in self._pending:
+                return
+            self._apply(number, pending=True)
+            self._log_locked({"n": number, "pending": True})
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _is_done_locked(self, number: int) -> bool:
+        return number not in self._pending and (number <= self._watermark or number in self._done_above)
+
+    def _apply(self, number: int, failed: bool = False, pending: bool = False) -> None:
+        if pending:
+            self._pending.add(number)
+            if number > self._watermark:
+                self._done_above.add(number)
+        else:
+            self._pending.discard(number)
+            self._failed += failed
+            if number > self._watermark:
+                self._done_above.add(number)
+        while self._watermark + 1 in self._done_above:
+            self._watermark += 1
+            self._done_above.discard(self._watermark)
+
+    def _log_locked(self, record: dict) -> None:
+        self._unflushed.append(record)
+        if len(self._unflushed) >= self._flush_every:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._rewrite or self._logged + len(self._unflushed) >= max(
+                _COMPACT_MIN_LINES, 4 * (len(self._done_above) + len(self._pending))):
+            # Rewriting costs the size of the state, so do it only once the
+            # log has outgrown it several times over
+            atomic_write_text(self._path, json.dumps(self._snapshot()) + "\n")
+            self._logged = 1
+            self._rewrite = False
+        elif self._unflushed:
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(record) + "\n" for record in self._unflushed))
+                f.flush()
+                os.fsync(f.fileno())
+            self._logged += len(self._unflushed)
+        self._unflushed = []
+
+    def _snapshot(self) -> dict:
+        # Pending entries above the watermark are in done_above as well
+        return {"watermark": self._watermark, "done_above": sorted(self._done_above),
+                "pending": sorted(self._pending), "failed": self._failed}
+
+    def _load(self) -> None:
+        with open(self._path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # a line torn by a crash; everything before it stands
+                self._logged += 1
+                if "watermark" in record:
+                    # A snapshot, or a whole-state file from before the log
+                    self._watermark = record["watermark"]
+                    self._done_above = set(record["done_above"])
+                    self._pending = set(record.get("pending", ()))
+                    self._failed = record.get("failed", 0)
+                else:
+                    self._apply(record["n"], failed=record.get("failed", False),
+                                pending=record.get("pending", False))
+
+
+class Throughput:
+    """Counters for a bulk run and a one-line live summary."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._started = clock()
+        self._lock = threading.Lock()
+        self.done = 0
+        self.failed = 0
+        self.deferred = 0
+        self.skipped = 0
+
+    def add(self, field: str, count: int = 1) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + count)
+
+    def rate(self) -> float:
+        elapsed = self._clock() - self._started
+        with self._lock:
+            finished = self.done + self.failed
+        return finished / elapsed if elapsed > 0 else 0.0
+
+    def summary(self, in_flight: int = 0) -> str:
+        elapsed = int(self._clock() - self._started)
+        with self._lock:
+            counts = f"done {self.done}  failed {self.failed}  deferred {self.deferred}  skipped {self.skipped}"
+        return (f"{counts}  in flight {in_flight}  {self.rate():.1f} docs/s  "
+                f"elapsed {elapsed // 3600:02d}:{elapsed // 60 % 60:02d}:{elapsed % 60:02d}")
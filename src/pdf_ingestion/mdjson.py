@@ -0,0 +1,187 @@
+"""Single-pass conversion of parsed page markdown into structured JSONL.
+
+Each page becomes one JSON line holding the page markdown and its typed
+blocks:
+
+* ``heading``: ``level``, ``text``
+* ``paragraph``: ``text`` (wrapped lines joined, one line per list item)
+* ``table``: ``header`` and ``rows`` (cells as strings)
+* ``kv``: ``key``, ``value`` for ``Key: value`` lines
+* ``code``: ``text`` of a fenced block, kept verbatim
+
+Every block carries ``path``, the heading titles it sits under. The
+heading path carries across pages, so a section continuing on the next
+page keeps its context. Lines are visited once, in order, with a cheap
+prefix test before any regular expression.
+
+Records are serialized with orjson when it is installed (``pip install
+ingest-pdf[json]``) and the standard library otherwise. ``validate_page``
+checks a record with plain type tests instead of a pydantic model per
+record.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from pdf_ingestion.errors import OutputSchemaError
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+HEADING = "heading"
+PARAGRAPH = "paragraph"
+TABLE = "table"
+KV = "kv"
+CODE = "code"
+
+_HEADING_RE = re.compile(r"(#{1,6})[ \t]+(.*?)[ \t#]*$")
+_TABLE_RULE_RE = re.compile(r"\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?")
+# A short label, optionally bold or bulleted, then ": value"; "http://x" has no space after the colon
+_KV_RE = re.compile(r"(?:[-*+][ \t]+)?(\*\*|__)?([^:|*_#.][^:|.]{0,40}?)\1?[ \t]*:(?:\*\*|__)?[ \t]+(\S.*)")
+_LIST_RE = re.compile(r"(?:[-*+]|\d{1,3}[.)])[ \t]+")
+
+# Per block type: required fields and their types, beyond "type" and "path"
+BLOCK_SCHEMA: dict[str, dict[str, type]] = {
+    HEADING: {"level": int, "text": str},
+    PARAGRAPH: {"text": str},
+    TABLE: {"header": list, "rows": list},
+    KV: {"key": str, "value": str},
+    CODE: {"text": str},
+}
+PAGE_SCHEMA: dict[str, type] = {"sha256": str, "source": str, "page": int, "markdown": str, "blocks": list}
+
+
+def _cells(line: str) -> list[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+class MarkdownConverter:
+    """Turns the pages of one document into block lists, keeping the heading path."""
+
+    def __init__(self):
+        self._headings: list[str] = []
+        self._path: list[str] = []
+
+    def blocks(self, markdown: str) -> list[dict[str, Any]]:
+        blocks: list[dict[str, Any]] = []
+        paragraph: list[str] = []
+        table: dict[str, Any] | None = None
+        fence: list[str] | None = None
+        fence_marker = ""
+
+        def flush_paragraph():
+            if paragraph:
+                blocks.append({"type": PARAGRAPH, "path": self._path, "text": "\n".join(paragraph)})
+                paragraph.clear()
+
+        for raw in markdown.splitlines():
+            line = raw.strip()
+            if fence is not None:
+                if line.startswith(fence_marker):
+                    blocks.append({"type": CODE, "path": self._path, "text": "\n".join(fence)})
+                    fence = None
+                else:
+                    fence.append(raw)
+                continue
+            if table is not None:
+                if line.startswith("|"):
+                    if not table["rows"] and _TABLE_RULE_RE.fullmatch(line):
+                        continue
+                    table["rows"].append(_cells(line))
+                    continue
+                table = None
+            if not line:
+                flush_paragraph()
+                continue
+            first = line[0]
+            if first == "#":
+                match = _HEADING_RE.match(line)
+                if match:
+                    flush_paragraph()
+                    level = len(match.group(1))
+                    del self._headings[level - 1:]
+                    self._headings.extend([""] * (level - 1 - len(self._headings)))
+                    self._headings.append(match.group(2))
+                    # Blocks share one path list until the next heading
+                    self._path = [title for title in self._headings if title]
+                    blocks.append({"type": HEADING, "path": self._path, "level": level, "text": match.group(2)})
+                    continue
+            elif first == "|":
+                flush_paragraph()
+                table = {"type": TABLE, "path": self._path, "header": _cells(line), "rows": []}
+                blocks.append(table)
+                continue
+            elif first in "`~" and line[:3] in ("```", "~~~"):
+                flush_paragraph()
+                fence, fence_marker = [], line[:3]
+                continue
+            if ":" in line:
+                match = _KV_RE.fullmatch(line)
+                if match:
+                    flush_paragraph()
+                    blocks.append({"type": KV, "path": self._path,
+                                   "key": match.group(2).strip(), "value": match.group(3).strip()})
+                    continue
+            if paragraph and _LIST_RE.match(line) is None and _LIST_RE.match(paragraph[-1]) is None:
+                paragraph[-1] += " " + line
+            else:
+                paragraph.append(line)
+        if fence is not None:
+            blocks.append({"type": CODE, "path": self._path, "text": "\n".join(fence)})
+        flush_paragraph()
+        return blocks
+
+
+def validate_page(record: dict[str, Any]) -> None:
+    """Raise ``OutputSchemaError`` unless ``record`` matches the page schema."""
+    for field, kind in PAGE_SCHEMA.items():
+        if type(record.get(field)) is not kind:
+            raise OutputSchemaError(f"Page record field {field!r} must be {kind.__name__}")
+    for number, block in enumerate(record["blocks"]):
+        schema = BLOCK_SCHEMA.get(block.get("type"))
+        if schema is None:
+            raise OutputSchemaError(f"Block {number} on page {record['page']} has unknown type {block.get('type')!r}")
+        if type(block.get("path")) is not list:
+            raise OutputSchemaError(f"Block {number} on page {record['page']} has no heading path")
+        for field, kind in schema.items():
+            if type(block.get(field)) is not kind:
+                raise OutputSchemaError(
+                    f"{block['type']} block {number} on page {record['page']}: {field!r} must be {kind.__name__}")
+
+
+if orjson is not None:
+    def dumps_line(record: dict[str, Any]) -> bytes:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+else:
+    _ENCODER = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":"))
+
+    def dumps_line(record: dict[str, Any]) -> bytes:
+        return (_ENCODER.encode(record) + "\n").encode("utf-8")
+
+
+def page_records(sha256: str, source: str, pages: Iterable[str], validate: bool = True,
+                 tier: str | None = None) -> Iterator[bytes]:
+    """Yield one encoded JSONL line per page of a document, in page order.
+
+    A ``tier`` (set for degraded jobs) is added to every record.
+    """
+    converter = MarkdownConverter()
+    for number, markdown in enumerate(pages, start=1):
+        record = {"sha256": sha256, "source": source, "page": number, "markdown": markdown,
+                  "blocks": converter.blocks(markdown)}
+        if tier is not None:
+            record["tier"] = tier
+        if validate:
+            validate_page(record)
+        yield dumps_line(record)
@@ -8,12 +8,14 @@ from pydantic import BaseModel
 PdfInput: file path to the pdf file
 JsonOutput: file path to the json file
 MarkdownOutput: file path to the markdown file
+Tier: degradation tier to parse at (see pdf_ingestion.tiers), None for the base tier
 """
 
 class PdfIngestionRequest(BaseModel):
     PdfInput: str
     JsonOutput: str
     MarkdownOutput: str
+    Tier: str | None = None
 
 class PdfIngestionResult(BaseModel):
     PdfInput: str
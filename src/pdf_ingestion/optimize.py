@@ -0,0 +1,332 @@
+"""Pre-upload optimization of image-heavy PDFs.
+
+Scanned statements are mostly page images at several hundred dpi, far more
+than the parser needs, and uploading them dominates a job. With
+``[optimize].enabled`` a file of at least ``min_size_bytes`` is rewritten
+before upload into ``[state].dir/optimized/``:
+
+* embedded 8-bit gray and RGB images (JPEG or Flate) above
+  ``target_dpi`` are downsampled and re-encoded as JPEG at
+  ``jpeg_quality``
+* only objects reachable from the document catalog are written, which
+  drops unused and superseded objects
+
+The file in ``[processed].dir`` is always the original; the copy is
+removed once it has been uploaded, and if it is not smaller, or cannot be
+made, the original is uploaded. An image's dpi is taken from the size of
+the largest page it is drawn on, which never overestimates it, so images
+are only ever downsampled to at least ``target_dpi``. Images with masks,
+decode arrays, 1-bit or CMYK data are copied unchanged.
+
+The rewrite runs in ``[optimize].processes`` worker processes (see
+``workerpool``) so it does not hold up the daemon's threads. Downsampling
+needs Pillow (``pip install ingest-pdf[images]``). Files are not
+linearized: that only helps viewers fetching byte ranges, not an upload.
+"""
+
+from __future__ import annotations
+
+import io
+import mmap
+import threading
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.errors import PdfSyntaxError
+from pdf_ingestion.ledger import state_dir
+from pdf_ingestion.pdfobjects import PdfName, PdfReader, PdfRef, PdfStream
+from pdf_ingestion.workerpool import WorkerPool
+from pdf_ingestion.writers import atomic_writer
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+CFG = settings()
+
+_OPTIMIZED_DIR_NAME = "optimized"
+
+# Letter, for pages without a readable /MediaBox
+_DEFAULT_PAGE_PT = (612.0, 792.0)
+# Images within this factor of target_dpi are left alone
+_SLACK = 1.1
+_MODES = {"DeviceGray": "L", "DeviceRGB": "RGB"}
+_CHANNELS = {"L": 1, "RGB": 3}
+_NAME_SAFE = frozenset(range(0x21, 0x7F)) - frozenset(b"()<>[]{}/%#")
+
+
+@dataclass
+class OptimizeResult:
+    """Size of a file before and after optimization."""
+
+    input_bytes: int
+    output_bytes: int
+    images: int
+    downsampled: int
+    objects_dropped: int
+
+
+def optimized_path(sha256: str, run_id: str, file_name: str) -> Path:
+    # Keyed by content hash and job, so jobs on identical files never share
+    # a copy; the file name is kept for the upload
+    return state_dir() / _OPTIMIZED_DIR_NAME / sha256 / run_id / file_name
+
+
+def _page_inches(reader: PdfReader, page_dict: dict[str, Any]) -> tuple[float, float]:
+    box = reader.resolve(page_dict.get("MediaBox"))
+    try:
+        x0, y0, x1, y1 = (float(reader.resolve(v)) for v in box)
+        return abs(x1 - x0) / 72 or _DEFAULT_PAGE_PT[0] / 72, abs(y1 - y0) / 72 or _DEFAULT_PAGE_PT[1] / 72
+    except (TypeError, ValueError):
+        return _DEFAULT_PAGE_PT[0] / 72, _DEFAULT_PAGE_PT[1] / 72
+
+
+def _page_images(reader: PdfReader) -> dict[int, tuple[float, float]]:
+    """Image object number -> size in inches of the largest page it is drawn on."""
+    images: dict[int, tuple[float, float]] = {}
+    for page in reader.iter_pages():
+        width, height = _page_inches(reader, page.dict)
+        stack = [page.resources]
+        seen: set[int] = set()
+        while stack:
+            resources = reader.resolve(stack.pop())
+            xobjects = reader.resolve(resources.get("XObject")) if isinstance(resources, dict) else None
+            if not isinstance(xobjects, dict):
+                continue
+            for ref in xobjects.values():
+                if not isinstance(ref, PdfRef) or ref.num in seen:
+                    continue
+                seen.add(ref.num)
+                xobject = reader.resolve(ref)
+                if not isinstance(xobject, PdfStream):
+                    continue
+                if xobject.dict.get("Subtype") == "Image":
+                    w, h = images.get(ref.num, (0.0, 0.0))
+                    images[ref.num] = (max(w, width), max(h, height))
+                elif xobject.dict.get("Subtype") == "Form":
+                    stack.append(reader.resolve(xobject.dict.get("Resources")) or {})
+    return images
+
+
+def _filters(reader: PdfReader, stream: PdfStream) -> list[str]:
+    filters = reader.resolve(stream.dict.get("Filter"))
+    if filters is None:
+        return []
+    return [str(reader.resolve(f)) for f in (filters if isinstance(filters, list) else [filters])]
+
+
+def _color_mode(reader: PdfReader, stream: PdfStream) -> str | None:
+    space = reader.resolve(stream.dict.get("ColorSpace"))
+    if isinstance(space, list) and space and space[0] == "ICCBased":
+        profile = reader.resolve(space[1]) if len(space) > 1 else None
+        n = reader.resolve(profile.dict.get("N")) if isinstance(profile, PdfStream) else None
+        return {1: "L", 3: "RGB"}.get(n)
+    return _MODES.get(space) if isinstance(space, str) else None
+
+
+def _downsample(reader: PdfReader, stream: PdfStream, inches: tuple[float, float],
+                target_dpi: int, jpeg_quality: int) -> tuple[dict[str, Any], bytes] | None:
+    """Return the new dictionary and JPEG data for an image, or None to keep it."""
+    info = stream.dict
+    width, height = reader.resolve(info.get("Width")), reader.resolve(info.get("Height"))
+    if not isinstance(width, int) or not isinstance(height, int) or width <= 0 or height <= 0:
+        return None
+    if (reader.resolve(info.get("BitsPerComponent")) != 8 or info.get("ImageMask") or "Mask" in info
+            or "Decode" in info):
+        return None
+    dpi = max(width / inches[0], height / inches[1])
+    if dpi <= target_dpi * _SLACK:
+        return None
+    mode = _color_mode(reader, stream)
+    filters = _filters(reader, stream)
+    if mode is None:
+        return None
+    if filters[-1:] == ["DCTDecode"]:
+        # JPEG data, possibly wrapped in ASCII filters
+        outer = PdfStream(dict(info, Filter=[PdfName(f) for f in filters[:-1]], DecodeParms=None),
+                          stream.start, stream.length)
+        image = Image.open(io.BytesIO(reader.decode_stream(outer) if filters[:-1] else reader.stream_data(stream)))
+        if image.mode not in ("L", "RGB"):
+            return None
+    else:
+        # Raw samples; unsupported filters raise PdfSyntaxError and keep the image
+        data = reader.decode_stream(stream)
+        if len(data) != width * height * _CHANNELS[mode]:
+            return None
+        image = Image.frombytes(mode, (width, height), data)
+    scale = target_dpi / dpi
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    out = io.BytesIO()
+    image.resize(size, Image.LANCZOS).save(out, "JPEG", quality=jpeg_quality, optimize=True)
+    data = out.getvalue()
+    if len(data) >= stream.length:
+        return None
+    new = {key: value for key, value in info.items() if key not in ("Length", "DecodeParms", "Filter")}
+    new.update({PdfName("Width"): size[0], PdfName("Height"): size[1], PdfName("BitsPerComponent"): 8,
+                PdfName("Filter"): PdfName("DCTDecode")})
+    return new, data
+
+
+def _name(name: str) -> bytes:
+    raw = name.encode("latin-1")
+    return b"/" + b"".join(bytes([c]) if c in _NAME_SAFE else b"#%02X" % c for c in raw)
+
+
+def _number(value: float) -> bytes:
+    text = f"{value:.6f}".rstrip("0").rstrip(".")
+    return (text if text not in ("", "-0") else "0").encode()
+
+
+def _serialize(obj: Any, renumber: dict[int, int]) -> bytes:
+    if isinstance(obj, PdfRef):
+        return b"%d 0 R" % renumber[obj.num] if obj.num in renumber else b"null"
+    if isinstance(obj, PdfName):
+        return _name(obj)
+    if isinstance(obj, dict):
+        return b"<<" + b"".join(_name(k) + b" " + _serialize(v, renumber) for k, v in obj.items()) + b">>"
+    if isinstance(obj, list):
+        return b"[" + b" ".join(_serialize(v, renumber) for v in obj) + b"]"
+    if isinstance(obj, (bytes, bytearray)):
+        return b"<" + bytes(obj).hex().encode() + b">"
+    if obj is None:
+        return b"null"
+    if isinstance(obj, bool):
+        return b"true" if obj else b"false"
+    if isinstance(obj, int):
+        return b"%d" % obj
+    if isinstance(obj, float):
+        return _number(obj)
+    return str(obj).encode("latin-1")
+
+
+def _references(obj: Any) -> list[PdfRef]:
+    refs = []
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, PdfRef):
+            refs.append(item)
+        elif isinstance(item, dict):
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+    return refs
+
+
+def _rewrite(reader: PdfReader, dst: Path, replaced: dict[int, tuple[dict[str, Any], bytes]]) -> int:
+    """Write the objects reachable from the trailer to ``dst``; return how many were written."""
+    roots = {key: reader.trailer[key] for key in ("Root", "Info") if isinstance(reader.trailer.get(key), PdfRef)}
+    renumber: dict[int, int] = {}
+    pending: deque[int] = deque()
+
+    def reach(obj: Any) -> None:
+        for ref in _references(obj):
+            if ref.num not in renumber and reader.xref.get(ref.num) is not None:
+                renumber[ref.num] = len(renumber) + 1
+                pending.append(ref.num)
+
+    reach(list(roots.values()))
+    bodies: list[tuple[Any, bytes | None]] = []
+    while pending:
+        num = pending.popleft()
+        obj = reader.get_object(num)
+        if isinstance(obj, PdfStream):
+            info, data = replaced.get(num) or (
+                {key: value for key, value in obj.dict.items() if key != "Length"}, reader.stream_data(obj))
+            reach(info)
+            bodies.append((dict(info, Length=len(data)), data))
+        else:
+            reach(obj)
+            bodies.append((obj, None))
+
+    with atomic_writer(dst) as f:
+        offsets = []
+        pos = f.write(b"%%PDF-%s\n%%\xe2\xe3\xcf\xd3\n" % reader.version.encode())
+        for number, (obj, data) in enumerate(bodies, start=1):
+            offsets.append(pos)
+            chunk = b"%d 0 obj\n" % number + _serialize(obj, renumber)
+            if data is not None:
+                chunk += b"\nstream\n" + bytes(data) + b"\nendstream"
+            pos += f.write(chunk + b"\nendobj\n")
+        f.write(b"xref\n0 %d\n0000000000 65535 f\r\n" % (len(bodies) + 1))
+        f.write(b"".join(b"%010d 00000 n\r\n" % offset for offset in offsets))
+        trailer = {PdfName("Size"): len(bodies) + 1, **{PdfName(k): v for k, v in roots.items()}}
+        f.write(b"trailer\n" + _serialize(trailer, renumber) + b"\nstartxref\n%d\n%%%%EOF\n" % pos)
+    return len(bodies)
+
+
+def optimize_pdf(src: str, dst: str, target_dpi: int = 150, jpeg_quality: int = 75) -> OptimizeResult | None:
+    """Write an optimized copy of ``src`` to ``dst``.
+
+    Returns None, leaving nothing at ``dst``, when the copy would not be
+    smaller or ``src`` is encrypted. Raises ``PdfSyntaxError`` for files
+    that cannot be read.
+    """
+    if Image is None:
+        raise RuntimeError("pre-upload optimization requires the 'Pillow' package")
+    src_path, dst_path = Path(src), Path(dst)
+    size = src_path.stat().st_size
+    with open(src_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        try:
+            reader = PdfReader(buf)
+            if reader.encrypted:
+                return None
+            images = _page_images(reader)
+            replaced = {}
+            for num, inches in images.items():
+                stream = reader.get_object(num)
+                try:
+                    result = _downsample(reader, stream, inches, target_dpi, jpeg_quality)
+                except (OSError, ValueError, PdfSyntaxError):
+                    result = None  # an image Pillow cannot read is copied as it is
+                if result is not None:
+                    replaced[num] = result
+            written = _rewrite(reader, dst_path, replaced)
+            dropped = len(reader.xref) - written
+        except (ValueError, KeyError, IndexError, TypeError, zlib.error) as e:
+            dst_path.unlink(missing_ok=True)
+            raise PdfSyntaxError(f"Unable to optimize: {e}") from e
+    output = dst_path.stat().st_size
+    if output >= size or (not replaced and dropped <= 0):
+        # Not worth a second copy of the file
+        dst_path.unlink()
+        return None
+    return OptimizeResult(input_bytes=size, output_bytes=output, images=len(images),
+                          downsampled=len(replaced), objects_dropped=max(0, dropped))
+
+
+_POOL: WorkerPool | None = None
+_POOL_LOCK = threading.Lock()
+singletons.register(__name__, "_POOL", WorkerPool.close)
+
+
+def optimizer_pool() -> WorkerPool | None:
+    """Return the process-wide optimizer pool, or None when disabled or ``[optimize].processes`` is 0."""
+    global _POOL
+    optimize = CFG.get('optimize', {})
+    if not optimize.get('enabled', False) or not optimize.get('processes', 0):
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = WorkerPool(processes=optimize['processes'],
+                               max_jobs=optimize.get('max_jobs_per_worker', 0),
+                               preload=["pdf_ingestion.optimize"])
+        return _POOL
+
+
+def optimize_for_upload(src: Path, sha256: str, run_id: str) -> tuple[Path, OptimizeResult] | None:
+    """Optimize ``src`` per ``[optimize]`` and return the copy to upload, or None to upload ``src``."""
+    optimize = CFG.get('optimize', {})
+    if not optimize.get('enabled', False) or src.stat().st_size < optimize.get('min_size_bytes', 0):
+        return None
+    dst = optimized_path(sha256, run_id, src.name)
+    args = (str(src), str(dst), optimize.get('target_dpi', 150), optimize.get('jpeg_quality', 75))
+    pool = optimizer_pool()
+    result = pool.call(optimize_pdf, *args) if pool is not None else optimize_pdf(*args)
+    return (dst, result) if result is not None else None
@@ -0,0 +1,127 @@
+"""Page-level cache of parsed markdown, keyed by page content hash.
+
+Statements often share pages byte for byte (terms, disclosures, cover
+letters). Each page is hashed from its content streams, its resources
+(fonts, images and form XObjects, followed recursively) and its geometry,
+together with the parse fingerprint, so the same page rendered by the same
+parser settings maps to the same key in every document. Parsed markdown is
+stored per key under ``[state].dir/pages/`` and only pages missing from the
+cache are sent to the parser.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import threading
+import zlib
+from pathlib import Path
+from typing import Any
+
+from pdf_ingestion import singletons
+from pdf_ingestion.errors import PdfSyntaxError
+from pdf_ingestion.fingerprint import PARSE, current_fingerprints
+from pdf_ingestion.ledger import state_dir
+from pdf_ingestion.pdfobjects import PdfName, PdfReader, PdfRef, PdfStream
+from pdf_ingestion.writers import atomic_write_text
+
+_PAGES_DIR_NAME = "pages"
+
+# Page entries that affect how a page renders; /Parent, /Annots etc. do not
+_PAGE_KEYS = ("Contents", "Resources", "MediaBox", "CropBox", "Rotate", "UserUnit")
+# Back-references that would pull the rest of the document into the hash
+_SKIP_KEYS = frozenset({"Parent", "P"})
+
+
+def _feed(reader: PdfReader, obj: Any, h: Any, seen: dict[int, int]) -> None:
+    """Feed a canonical encoding of ``obj`` into hash ``h``.
+
+    References are followed rather than hashed by object number, so two
+    files that number their objects differently still agree. An object seen
+    earlier on the same page is encoded by its visit order instead.
+    """
+    if isinstance(obj, PdfRef):
+        if obj.num in seen:
+            h.update(b"@%d;" % seen[obj.num])
+            return
+        seen[obj.num] = len(seen)
+        obj = reader.get_object(obj.num)
+    if isinstance(obj, PdfStream):
+        h.update(b"S")
+        _feed(reader, obj.dict, h, seen)
+        data = reader.stream_data(obj)
+        h.update(b"%d:" % len(data))
+        h.update(data)
+    elif isinstance(obj, dict):
+        h.update(b"<")
+        for key in sorted(obj):
+            if key in _SKIP_KEYS:
+                continue
+            h.update(b"/%s " % key.encode())
+            _feed(reader, obj[key], h, seen)
+        h.update(b">")
+    elif isinstance(obj, list):
+        h.update(b"[")
+        for item in obj:
+            _feed(reader, item, h, seen)
+        h.update(b"]")
+    elif isinstance(obj, PdfName):
+        h.update(b"/%s;" % obj.encode())
+    elif isinstance(obj, bytes):
+        h.update(b"(%d:" % len(obj))
+        h.update(obj)
+    else:
+        h.update(b"%r;" % repr(obj).encode())
+
+
+def page_hashes(path: Path) -> list[str]:
+    """Return one content hash per page of ``path``, in document order.
+
+    Raises ``PdfSyntaxError`` if the page tree cannot be read.
+    """
+    salt = current_fingerprints()[PARSE].encode()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        try:
+            reader = PdfReader(buf)
+            hashes = []
+            for page in reader.iter_pages():
+                h = hashlib.sha256(salt)
+                node = dict(page.dict, Resources=page.resources)
+                _feed(reader, {key: node[key] for key in _PAGE_KEYS if key in node}, h, {})
+                hashes.append(h.hexdigest())
+            return hashes
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError, RecursionError, zlib.error) as e:
+            raise PdfSyntaxError(f"Unreadable page tree: {e}") from e
+
+
+class PageCache:
+    """Directory of parsed page markdown, one file per page hash."""
+
+    def __init__(self, root: Path):
+        self._root = root
+
+    def _path(self, page_hash: str) -> Path:
+        return self._root / page_hash[:2] / f"{page_hash}.md"
+
+    def get(self, page_hash: str) -> str | None:
+        try:
+            return self._path(page_hash).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def put(self, page_hash: str, markdown: str) -> None:
+        atomic_write_text(self._path(page_hash), markdown)
+
+
+_CACHE: PageCache | None = None
+_CACHE_LOCK = threading.Lock()
+singletons.register(__name__, "_CACHE")
+
+
+def page_cache() -> PageCache:
+    """Return the process-wide page cache under ``[state].dir``."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = PageCache(state_dir() / _PAGES_DIR_NAME)
+        return _CACHE
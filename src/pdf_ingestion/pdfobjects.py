@@ -0,0 +1,638 @@
+"""Minimal PDF object reader used by the prescan stage.
+
+Reads the header, trailer, cross-reference data and individual objects
+directly from a memory-mapped buffer. Only the objects that are asked for
+are parsed and page content streams are only decoded on request
+(``page_content``, ``iter_operations``), so reading the page tree of a
+large PDF touches a small fraction of its bytes.
+"""
+
+from __future__ import annotations
+
+import base64
+import re
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+from pdf_ingestion.errors import PdfSyntaxError
+
+# Number of bytes at the end of the file searched for startxref/%%EOF
+_TAIL_WINDOW = 4096
+_HEADER_WINDOW = 1024
+
+_TOKEN_RE = re.compile(
+    rb"""
+    (?P<ws>(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)+)
+    | (?P<dict_open><<)
+    | (?P<dict_close>>>)
+    | (?P<array_open>\[)
+    | (?P<array_close>\])
+    | (?P<name>/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*)
+    | (?P<hex><[0-9A-Fa-f\x00\t\n\x0c\r ]*>)
+    | (?P<string>\()
+    | (?P<number>[+-]?(?:\d+\.?\d*|\.\d+))
+    | (?P<keyword>[A-Za-z'"]+|[{}])
+    """,
+    re.VERBOSE,
+)
+_NAME_ESCAPE_RE = re.compile(rb"#([0-9A-Fa-f]{2})")
+_HEADER_RE = re.compile(rb"%PDF-(\d+\.\d+)")
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+_XREF_KEYWORD_RE = re.compile(rb"\s*xref")
+_TRAILER_KEYWORD_RE = re.compile(rb"\s*trailer")
+_XREF_SUBSECTION_RE = re.compile(rb"\s*(\d+)\s+(\d+)")
+_XREF_ENTRY_RE = re.compile(rb"\s*(\d{10})\s(\d{5})\s([nf])")
+_OBJ_HEADER_RE = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+# Inline image data runs from ID to whitespace followed by EI
+_INLINE_IMAGE_END_RE = re.compile(rb"[\x00\t\n\x0c\r ]EI(?![^\x00\t\n\x0c\r ])")
+_LITERALS = (b"true", b"false", b"null")
+_STRING_ESCAPES = {
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+}
+
+
+class PdfRef(NamedTuple):
+    """An indirect object reference, e.g. ``12 0 R``."""
+
+    num: int
+    gen: int
+
+
+class PdfName(str):
+    """A PDF name object such as ``/Type``, stored without the slash."""
+
+
+@dataclass
+class PdfStream:
+    """A stream object: its dictionary and the location of its raw bytes."""
+
+    dict: dict[str, Any]
+    start: int
+    length: int
+
+
+@dataclass
+class PdfPage:
+    """A leaf of the page tree with its inherited resources resolved."""
+
+    ref: PdfRef | None
+    dict: dict[str, Any]
+    resources: dict[str, Any]
+
+
+class _Keyword(str):
+    """A bare keyword token (``obj``, ``stream``, ``R``...)."""
+
+
+class _Parser:
+    """Recursive-descent parser for PDF objects over a bytes-like buffer."""
+
+    def __init__(self, buf: Any):
+        self.buf = buf
+        self.size = len(buf)
+
+    def _token(self, pos: int) -> tuple[str, Any, int, int]:
+        """Return ``(kind, match, start, end)`` of the next token after ``pos``."""
+        while True:
+            m = _TOKEN_RE.match(self.buf, pos)
+            if m is None:
+                if pos >= self.size:
+                    raise PdfSyntaxError("Unexpected end of data")
+                raise PdfSyntaxError(f"Invalid token at offset {pos}")
+            kind = m.lastgroup or ""
+            if kind != "ws":
+                return kind, m, m.start(), m.end()
+            pos = m.end()
+
+    def parse(self, pos: int) -> tuple[Any, int]:
+        """Parse one object at ``pos`` and return it with the end offset."""
+        kind, m, start, end = self._token(pos)
+        if kind == "number":
+            text = m.group()
+            if b"." in text:
+                return float(text), end
+            value = int(text)
+            return self._maybe_ref(value, end)
+        if kind == "name":
+            raw = _NAME_ESCAPE_RE.sub(lambda e: bytes([int(e.group(1), 16)]), m.group()[1:])
+            return PdfName(raw.decode("latin-1")), end
+        if kind == "dict_open":
+            return self._parse_dict(end)
+        if kind == "array_open":
+            return self._parse_array(end)
+        if kind == "hex":
+            digits = re.sub(rb"[^0-9A-Fa-f]", b"", m.group()[1:-1])
+            if len(digits) % 2:
+                digits += b"0"
+            return bytes.fromhex(digits.decode("ascii")), end
+        if kind == "string":
+            return self._parse_string(end)
+        if kind == "keyword":
+            word = m.group().decode("latin-1")
+            if word == "true":
+                return True, end
+            if word == "false":
+                return False, end
+            if word == "null":
+                return None, end
+            return _Keyword(word), end
+        raise PdfSyntaxError(f"Unexpected {kind} token at offset {start}")
+
+    def _maybe_ref(self, value: int, end: int) -> tuple[Any, int]:
+        # "12 0 R" is a reference, anything else after an integer is not
+        try:
+            kind, m, _, gen_end = self._token(end)
+            if kind != "number" or not m.group().isdigit():
+                return value, end
+            gen = int(m.group())
+            kind, m, _, ref_end = self._token(gen_end)
+            if kind == "keyword" and m.group() == b"R":
+                return PdfRef(value, gen), ref_end
+        except PdfSyntaxError:
+            pass
+        return value, end
+
+    def _parse_dict(self, pos: int) -> tuple[dict[str, Any], int]:
+        result: dict[str, Any] = {}
+        while True:
+            kind, m, start, end = self._token(pos)
+            if kind == "dict_close":
+                return result, end
+            if kind != "name":
+                raise PdfSyntaxError(f"Expected dictionary key at offset {start}")
+            key, pos = self.parse(start)
+            result[key], pos = self.parse(pos)
+
+    def _parse_array(self, pos: int) -> tuple[list[Any], int]:
+        result: list[Any] = []
+        while True:
+            kind, _, start, end = self._token(pos)
+            if kind == "array_close":
+                return result, end
+            value, pos = self.parse(start)
+            result.append(value)
+
+    def _parse_string(self, pos: int) -> tuple[bytes, int]:
+        out = bytearray()
+        depth = 1
+        buf = self.buf
+        while pos < self.size:
+            ch = buf[pos]
+            pos += 1
+            if ch == 0x5C:  # backslash
+                if pos >= self.size:
+                    break
+                esc = buf[pos]
+                pos += 1
+                if esc in _STRING_ESCAPES:
+                    out += _STRING_ESCAPES[esc]
+                elif 0x30 <= esc <= 0x37:
+                    digits = bytes([esc])
+                    while len(digits) < 3 and pos < self.size and 0x30 <= buf[pos] <= 0x37:
+                        digits += bytes([buf[pos]])
+                        pos += 1
+                    out.append(int(digits, 8) & 0xFF)
+                elif esc in (0x0A, 0x0D):
+                    if esc == 0x0D and pos < self.size and buf[pos] == 0x0A:
+                        pos += 1
+                else:
+                    out.append(esc)
+                continue
+            if ch == 0x28:
+                depth += 1
+            elif ch == 0x29:
+                depth -= 1
+                if depth == 0:
+                    return bytes(out), pos
+            out.append(ch)
+        raise PdfSyntaxError("Unterminated string")
+
+
+class PdfReader:
+    """Random-access reader over the cross-reference data of a PDF buffer.
+
+    Construction reads only the header, the tail of the file and the xref
+    sections it points to; objects are parsed on demand by ``get_object``.
+    Truncated files (no ``%%EOF``/``startxref`` in the tail) raise
+    ``PdfSyntaxError``. A ``startxref`` that does not point at xref data is
+    repaired by scanning for object headers, and ``repaired`` is set.
+    """
+
+    def __init__(self, buf: Any):
+        self.buf = buf
+        self.size = len(buf)
+        self._parser = _Parser(buf)
+        self.version = self._read_header()
+        self.repaired = False
+        # num -> (1, offset, gen) for plain objects, (2, objstm, index) for compressed
+        self.xref: dict[int, tuple[int, int, int]] = {}
+        self.trailer: dict[str, Any] = {}
+        self._objects: dict[int, Any] = {}
+        self._object_streams: dict[int, tuple[_Parser, dict[int, int]]] = {}
+
+        startxref = self._read_startxref()
+        try:
+            self._read_xref_chain(startxref)
+        except PdfSyntaxError:
+            self._rebuild_xref()
+
+    # ------------------------------------------------------------------ header
+    def _read_header(self) -> str:
+        m = _HEADER_RE.search(self.buf[:_HEADER_WINDOW])
+        if m is None:
+            raise PdfSyntaxError("Missing %PDF- header")
+        return m.group(1).decode("ascii")
+
+    def _read_startxref(self) -> int:
+        tail = self.buf[max(0, self.size - _TAIL_WINDOW) :]
+        if b"%%EOF" not in tail:
+            raise PdfSyntaxError("Missing %%EOF marker, file is truncated")
+        matches = list(_STARTXREF_RE.finditer(tail))
+        if not matches:
+            raise PdfSyntaxError("Missing startxref, file is truncated")
+        offset = int(matches[-1].group(1))
+        if offset >= self.size:
+            raise PdfSyntaxError("startxref points past the end of the file")
+        return offset
+
+    # -------------------------------------------------------------------- xref
+    def _read_xref_chain(self, offset: int | None) -> None:
+        seen: set[int] = set()
+        while offset is not None:
+            if offset in seen or offset >= self.size:
+                raise PdfSyntaxError(f"Invalid xref offset {offset}")
+            seen.add(offset)
+            m = _XREF_KEYWORD_RE.match(self.buf, offset)
+            if m is not None:
+                section_trailer = self._read_xref_table(m.end())
+            else:
+                section_trailer = self._read_xref_stream(offset)
+            for key, value in section_trailer.items():
+                self.trailer.setdefault(key, value)
+            prev = section_trailer.get("Prev")
+            offset = prev if isinstance(prev, int) else None
+        if "Root" not in self.trailer:
+            raise PdfSyntaxError("Trailer has no /Root entry")
+
+    def _read_xref_table(self, pos: int) -> dict[str, Any]:
+        buf = self.buf
+        while True:
+            m = _TRAILER_KEYWORD_RE.match(buf, pos)
+            if m is not None:
+                pos = m.end()
+                break
+            m = _XREF_SUBSECTION_RE.match(buf, pos)
+            if m is None:
+                raise PdfSyntaxError(f"Malformed xref subsection at offset {pos}")
+            first, count = int(m.group(1)), int(m.group(2))
+            pos = m.end()
+            for i in range(count):
+                e = _XREF_ENTRY_RE.match(buf, pos)
+                if e is None:
+                    raise PdfSyntaxError(f"Malformed xref entry at offset {pos}")
+                pos = e.end()
+                if e.group(3) == b"n":
+                    self.xref.setdefault(first + i, (1, int(e.group(1)), int(e.group(2))))
+        trailer, _ = self._parser.parse(pos)
+        if not isinstance(trailer, dict):
+            raise PdfSyntaxError("Trailer is not a dictionary")
+        # Hybrid files keep compressed objects in an extra xref stream
+        xref_stm = trailer.get("XRefStm")
+        if isinstance(xref_stm, int):
+            self._read_xref_stream(xref_stm)
+        return trailer
+
+    def _read_xref_stream(self, offset: int) -> dict[str, Any]:
+        stream = self._parse_indirect(offset)
+        if not isinstance(stream, PdfStream) or stream.dict.get("Type") != "XRef":
+            raise PdfSyntaxError(f"No xref data at offset {offset}")
+        widths = [int(w) for w in stream.dict["W"]]
+        size = int(stream.dict["Size"])
+        index = stream.dict.get("Index", [0, size])
+        data = self.decode_stream(stream)
+        row_len = sum(widths)
+        pos = 0
+        for first, count in zip(index[0::2], index[1::2], strict=False):
+            for i in range(count):
+                row = data[pos : pos + row_len]
+                if len(row) < row_len:
+                    raise PdfSyntaxError("Xref stream is shorter than its /Index")
+                pos += row_len
+                fields = []
+                col = 0
+                for width in widths:
+                    fields.append(int.from_bytes(row[col : col + width], "big"))
+                    col += width
+                kind = fields[0] if widths[0] else 1
+                if kind in (1, 2):
+                    self.xref.setdefault(first + i, (kind, fields[1], fields[2]))
+        return stream.dict
+
+    def _rebuild_xref(self) -> None:
+        self.repaired = True
+        self.xref.clear()
+        for m in _OBJ_HEADER_RE.finditer(self.buf):
+            self.xref[int(m.group(1))] = (1, m.start(), int(m.group(2)))
+        trailer_at = self.buf.rfind(b"trailer")
+        if trailer_at != -1:
+            try:
+                trailer, _ = self._parser.parse(trailer_at + len(b"trailer"))
+                if isinstance(trailer, dict):
+                    self.trailer = trailer
+            except PdfSyntaxError:
+                pass
+        if "Root" not in self.trailer:
+            for num in sorted(self.xref):
+                try:
+                    obj = self.get_object(num)
+                except PdfSyntaxError:
+                    continue
+                if isinstance(obj, dict) and obj.get("Type") == "Catalog":
+                    self.trailer["Root"] = PdfRef(num, self.xref[num][2])
+                    break
+        if "Root" not in self.trailer:
+            raise PdfSyntaxError("Unable to locate document catalog")
+
+    # ----------------------------------------------------------------- objects
+    def _parse_indirect(self, offset: int) -> Any:
+        parser = self._parser
+        num, pos = parser.parse(offset)
+        _, pos = parser.parse(pos)
+        keyword, pos = parser.parse(pos)
+        if not isinstance(num, int) or keyword != "obj":
+            raise PdfSyntaxError(f"No object header at offset {offset}")
+        value, pos = parser.parse(pos)
+        if not isinstance(value, dict):
+            return value
+        try:
+            kind, m, _, end = parser._token(pos)
+        except PdfSyntaxError:
+            return value
+        if kind != "keyword" or m.group() != b"stream":
+            return value
+        if self.buf[end : end + 2] == b"\r\n":
+            end += 2
+        elif self.buf[end : end + 1] in (b"\n", b"\r"):
+            end += 1
+        length = self.resolve(value.get("Length"))
+        if not isinstance(length, int) or self.buf[end + length : end + length + 32].find(b"endstream") == -1:
+            found = self.buf.find(b"endstream", end)
+            if found == -1:
+                raise PdfSyntaxError(f"Unterminated stream at offset {offset}")
+            length = found - end
+            # Strip the EOL that precedes endstream
+            while length > 0 and self.buf[end + length - 1 : end + length] in (b"\n", b"\r"):
+                length -= 1
+        return PdfStream(dict=value, start=end, length=length)
+
+    def get_object(self, num: int) -> Any:
+        """Return object ``num``, parsing it on first access (missing → None)."""
+        if num in self._objects:
+            return self._objects[num]
+        entry = self.xref.get(num)
+        if entry is None:
+            return None
+        kind, a, b = entry
+        if kind == 1:
+            value = self._parse_indirect(a)
+        else:
+            parser, offsets = self._object_stream(a)
+            if num not in offsets:
+                raise PdfSyntaxError(f"Object {num} missing from object stream {a}")
+            value, _ = parser.parse(offsets[num])
+        self._objects[num] = value
+        return value
+
+    def _object_stream(self, num: int) -> tuple[_Parser, dict[int, int]]:
+        cached = self._object_streams.get(num)
+        if cached is not None:
+            return cached
+        stream = self.get_object(num)
+        if not isinstance(stream, PdfStream):
+            raise PdfSyntaxError(f"Object {num} is not an object stream")
+        data = self.decode_stream(stream)
+        first = int(stream.dict["First"])
+        parser = _Parser(data)
+        offsets: dict[int, int] = {}
+        pos = 0
+        for _ in range(int(stream.dict["N"])):
+            obj_num, pos = parser.parse(pos)
+            obj_off, pos = parser.parse(pos)
+            offsets[int(obj_num)] = first + int(obj_off)
+        self._object_streams[num] = (parser, offsets)
+        return parser, offsets
+
+    def resolve(self, obj: Any) -> Any:
+        """Follow references until a direct object is reached."""
+        seen: set[int] = set()
+        while isinstance(obj, PdfRef):
+            if obj.num in seen:
+                raise PdfSyntaxError(f"Reference cycle at object {obj.num}")
+            seen.add(obj.num)
+            obj = self.get_object(obj.num)
+        return obj
+
+    def stream_data(self, stream: PdfStream) -> bytes:
+        """Return the raw (still encoded) bytes of a stream."""
+        return self.buf[stream.start : stream.start + stream.length]
+
+    def decode_stream(self, stream: PdfStream) -> bytes:
+        """Decode a stream that uses no filter, FlateDecode (with predictors) or ASCII85/ASCIIHex."""
+        data = self.stream_data(stream)
+        filters = self.resolve(stream.dict.get("Filter"))
+        parms = self.resolve(stream.dict.get("DecodeParms"))
+        if filters is None:
+            return data
+        if not isinstance(filters, list):
+            filters, parms = [filters], [parms]
+        elif not isinstance(parms, list):
+            parms = [parms] * len(filters)
+        for name, parm in zip(filters, parms, strict=False):
+            if name in _ASCII_FILTERS:
+                data = _ASCII_FILTERS[name](data)
+                continue
+            if name != "FlateDecode":
+                raise PdfSyntaxError(f"Unsupported stream filter /{name}")
+            try:
+                data = zlib.decompressobj().decompress(data)
+            except zlib.error as e:
+                raise PdfSyntaxError(f"Corrupt Flate stream: {e}") from e
+            parm = self.resolve(parm)
+            if isinstance(parm, dict) and int(parm.get("Predictor", 1)) >= 10:
+                data = _undo_png_predictor(data, parm)
+        return data
+
+    # -------------------------------------------------------------- page tree
+    @property
+    def encrypted(self) -> bool:
+        return "Encrypt" in self.trailer
+
+    @property
+    def catalog(self) -> dict[str, Any]:
+        root = self.resolve(self.trailer.get("Root"))
+        if not isinstance(root, dict):
+            raise PdfSyntaxError("Document catalog is not a dictionary")
+        return root
+
+    @property
+    def page_count(self) -> int:
+        pages = self.resolve(self.catalog.get("Pages"))
+        if not isinstance(pages, dict):
+            raise PdfSyntaxError("Page tree root is missing")
+        count = self.resolve(pages.get("Count"))
+        if not isinstance(count, int) or count < 0:
+            raise PdfSyntaxError("Page tree has no valid /Count")
+        return count
+
+    def iter_pages(self) -> Iterator[PdfPage]:
+        """Walk the page tree depth-first, yielding leaves in document order."""
+        root_ref = self.catalog.get("Pages")
+        stack: list[tuple[Any, dict[str, Any]]] = [(root_ref, {})]
+        visited: set[int] = set()
+        while stack:
+            ref, inherited = stack.pop()
+            if isinstance(ref, PdfRef):
+                if ref.num in visited:
+                    raise PdfSyntaxError(f"Page tree cycle at object {ref.num}")
+                visited.add(ref.num)
+            node = self.resolve(ref)
+            if not isinstance(node, dict):
+                raise PdfSyntaxError("Page tree node is not a dictionary")
+            resources = node.get("Resources", inherited.get("Resources"))
+            kids = self.resolve(node.get("Kids"))
+            if kids is not None and not isinstance(kids, list):
+                raise PdfSyntaxError("Page tree /Kids is not an array")
+            if node.get("Type") == "Pages" or (kids is not None and node.get("Type") != "Page"):
+                for kid in reversed(kids or []):
+                    stack.append((kid, {"Resources": resources}))
+                continue
+            resources = self.resolve(resources)
+            yield PdfPage(
+                ref=ref if isinstance(ref, PdfRef) else None,
+                dict=node,
+                resources=resources if isinstance(resources, dict) else {},
+            )
+
+    def page_content(self, page: PdfPage) -> bytes:
+        """Decoded content streams of ``page``, concatenated in order."""
+        contents = self.resolve(page.dict.get("Contents"))
+        streams = contents if isinstance(contents, list) else [contents]
+        return b"\n".join(self.decode_stream(stream) for stream in map(self.resolve, streams)
+                          if isinstance(stream, PdfStream))
+
+    def page_has_fonts(self, page: PdfPage) -> bool:
+        """True if the page, or a form XObject it draws, declares fonts."""
+        if self.resolve(page.resources.get("Font")):
+            return True
+        xobjects = self.resolve(page.resources.get("XObject"))
+        if not isinstance(xobjects, dict):
+            return False
+        for ref in xobjects.values():
+            xobject = self.resolve(ref)
+            if isinstance(xobject, PdfStream) and xobject.dict.get("Subtype") == "Form":
+                form_resources = self.resolve(xobject.dict.get("Resources"))
+                if isinstance(form_resources, dict) and self.resolve(form_resources.get("Font")):
+                    return True
+        return False
+
+
+def _ascii85(data: bytes) -> bytes:
+    data = re.sub(rb"[\x00\t\n\x0c\r ]", b"", bytes(data))
+    if data.endswith(b"~>"):
+        data = data[:-2]
+    try:
+        return base64.a85decode(data)
+    except ValueError as e:
+        raise PdfSyntaxError(f"Corrupt ASCII85 stream: {e}") from e
+
+
+def _ascii_hex(data: bytes) -> bytes:
+    digits = re.sub(rb"[^0-9A-Fa-f]", b"", bytes(data).split(b">", 1)[0])
+    return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii"))
+
+
+_ASCII_FILTERS = {"ASCII85Decode": _ascii85, "ASCIIHexDecode": _ascii_hex}
+
+
+def iter_operations(data: bytes) -> Iterator[tuple[str, list[Any]]]:
+    """Yield ``(operator, operands)`` for each operator of a decoded content stream.
+
+    Inline image data is skipped, and bytes that do not parse are stepped
+    over, so a damaged stream yields the operations that can be read.
+    """
+    parser = _Parser(data)
+    size = len(data)
+    operands: list[Any] = []
+    pos = 0
+    while pos < size:
+        m = _TOKEN_RE.match(data, pos)
+        if m is None:
+            pos += 1
+            continue
+        kind = m.lastgroup
+        if kind == "ws":
+            pos = m.end()
+            continue
+        if kind == "keyword" and m.group() not in _LITERALS:
+            end = m.end()
+            while data[end : end + 1] == b"*":  # T*, f*, B*, W*
+                end += 1
+            operator = data[m.start() : end].decode("latin-1")
+            pos = end
+            if operator == "ID":
+                found = _INLINE_IMAGE_END_RE.search(data, pos)
+                pos = found.end() if found else size
+            else:
+                yield operator, operands
+            operands = []
+            continue
+        try:
+            value, pos = parser.parse(m.start())
+        except PdfSyntaxError:
+            pos = m.end()
+            operands = []
+            continue
+        operands.append(value)
+
+
+def _undo_png_predictor(data: bytes, parms: dict[str, Any]) -> bytes:
+    columns = int(parms.get("Columns", 1))
+    colors = int(parms.get("Colors", 1))
+    bits = int(parms.get("BitsPerComponent", 8))
+    bpp = max(1, colors * bits // 8)
+    row_len = (columns * colors * bits + 7) // 8
+    out = bytearray()
+    prev = bytearray(row_len)
+    for pos in range(0, len(data), row_len + 1):
+        filter_type = data[pos]
+        row = bytearray(data[pos + 1 : pos + 1 + row_len])
+        row.extend(b"\x00" * (row_len - len(row)))
+        for i in range(row_len):
+            left = row[i - bpp] if i >= bpp else 0
+            up = prev[i]
+            if filter_type == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif filter_type == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif filter_type == 3:
+                row[i] = (row[i] + ((left + up) >> 1)) & 0xFF
+            elif filter_type == 4:
+                up_left = prev[i - bpp] if i >= bpp else 0
+                p = left + up - up_left
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - up_left)
+                if pa <= pb and pa <= pc:
+                    pred = left
+                elif pb <= pc:
+                    pred = up
+                else:
+                    pred = up_left
+                row[i] = (row[i] + pred) & 0xFF
+        out += row
+        prev = row
+    return bytes(out)
@@ -0,0 +1,216 @@
+"""Stage-graph executor: each stage has its own bounded queue and workers.
+
+Items flow through a DAG of stages. A stage runs for an item once every
+stage it depends on (``after``) has finished for that item, so independent
+stages run in parallel, and different items occupy different stages at the
+same time. Bounded queues give backpressure: ``submit`` and hand-offs
+between stages block while the next queue is full, so steady-state
+throughput approaches that of the slowest stage (given enough workers on
+it) and work never piles up unboundedly in front of it.
+
+A stage function may return ``PENDING`` when its work completes elsewhere
+(e.g. a remote job); the item moves on when ``resolve`` is called.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+PENDING = object()
+_STOP = object()
+
+
+@dataclass
+class Stage:
+    """One node of the stage graph."""
+
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 8
+    after: tuple[str, ...] = ()
+
+
+@dataclass
+class _ItemState:
+    waiting: dict[str, int]
+    sinks_left: int
+
+
+@dataclass
+class _StageStats:
+    busy: int = 0
+    done: int = 0
+    failed: int = 0
+    workers: list[threading.Thread] = field(default_factory=list)
+
+
+class StagePipeline:
+    """Runs items through a graph of stages with per-stage queues and workers.
+
+    ``on_done(item)`` is called after the last stage finishes for an item;
+    ``on_error(item, error)`` is called once for the first stage that raises,
+    and the item's remaining stages are skipped.
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[Stage],
+        on_done: Callable[[Any], None] | None = None,
+        on_error: Callable[[Any, BaseException], None] | None = None,
+    ):
+        self._stages: dict[str, Stage] = {}
+        downstream: dict[str, list[str]] = {}
+        for stage in stages:
+            if stage.name in self._stages:
+                raise ValueError(f"Duplicate stage {stage.name!r}")
+            for dependency in stage.after:
+                # Dependencies must be declared first, which also rules out cycles
+                if dependency not in self._stages:
+                    raise ValueError(f"Stage {stage.name!r} depends on undeclared stage {dependency!r}")
+                downstream[dependency].append(stage.name)
+            self._stages[stage.name] = stage
+            downstream[stage.name] = []
+        self._downstream = downstream
+        self._entries = [name for name, stage in self._stages.items() if not stage.after]
+        self._sinks = {name for name, targets in downstream.items() if not targets}
+        self._on_done = on_done
+        self._on_error = on_error
+
+        self._lock = threading.Condition()
+        self._items: dict[int, _ItemState] = {}
+        # Items submitted whose on_done/on_error has not returned yet
+        self._in_flight = 0
+        self._queues = {name: queue.Queue(maxsize=max(1, stage.queue_size)) for name, stage in self._stages.items()}
+        self._stats = {name: _StageStats() for name in self._stages}
+        for name, stage in self._stages.items():
+            for number in range(max(1, stage.workers)):
+                thread = threading.Thread(target=self._work, args=(name,), name=f"stage-{name}-{number}", daemon=True)
+                thread.start()
+                self._stats[name].workers.append(thread)
+
+    # ----------------------------------------------------------------- input
+    def submit(self, item: Any) -> None:
+        """Start ``item`` at the entry stages; blocks while their queues are full."""
+        with self._lock:
+            self._items[id(item)] = _ItemState(
+                waiting={name: len(stage.after) for name, stage in self._stages.items()},
+                sinks_left=len(self._sinks),
+            )
+            self._in_flight += 1
+        for name in self._entries:
+            self._queues[name].put(item)
+
+    def resolve(self, item: Any, stage: str, error: BaseException | None = None) -> None:
+        """Finish a stage that returned ``PENDING`` for ``item``."""
+        if error is not None:
+            self._fail(item, stage, error)
+        else:
+            self._advance(item, stage)
+
+    # ------------------------------------------------------------ inspection
+    def depths(self) -> dict[str, int]:
+        """Items waiting in each stage's queue."""
+        return {name: q.qsize() for name, q in self._queues.items()}
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Per stage: queued and in-progress items, completions and failures."""
+        with self._lock:
+            return {
+                name: {
+                    "queued": self._queues[name].qsize(),
+                    "busy": stats.busy,
+                    "workers": len(stats.workers),
+                    "done": stats.done,
+                    "failed": stats.failed,
+                }
+                for name, stats in self._stats.items()
+            }
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return self._in_flight
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every submitted item is done or failed; False on timeout."""
+        with self._lock:
+            return self._lock.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def close(self) -> None:
+        """Stop the workers once the queues drain."""
+        for name, stats in self._stats.items():
+            for _ in stats.workers:
+                self._queues[name].put(_STOP)
+        for stats in self._stats.values():
+            for thread in stats.workers:
+                thread.join()
+
+    # --------------------------------------------------------------- workers
+    def _work(self, name: str) -> None:
+        stage = self._stages[name]
+        q = self._queues[name]
+        while True:
+            item = q.get()
+            if item is _STOP:
+                return
+            with self._lock:
+                if id(item) not in self._items:
+                    continue  # failed in a parallel branch
+                self._stats[name].busy += 1
+            try:
+                result = stage.fn(item)
+            except BaseException as e:
+                self._fail(item, name, e)
+                continue
+            finally:
+                with self._lock:
+                    self._stats[name].busy -= 1
+            if result is not PENDING:
+                self._advance(item, name)
+
+    def _advance(self, item: Any, name: str) -> None:
+        ready = []
+        finished = False
+        with self._lock:
+            self._stats[name].done += 1
+            state = self._items.get(id(item))
+            if state is None:
+                return
+            for target in self._downstream[name]:
+                state.waiting[target] -= 1
+                if state.waiting[target] == 0:
+                    ready.append(target)
+            if name in self._sinks:
+                state.sinks_left -= 1
+                if state.sinks_left == 0:
+                    del self._items[id(item)]
+                    finished = True
+        for target in ready:
+            self._queues[target].put(item)
+        if finished:
+            try:
+                if self._on_done is not None:
+                    self._on_done(item)
+            finally:
+                self._settle()
+
+    def _fail(self, item: Any, name: str, error: BaseException) -> None:
+        with self._lock:
+            self._stats[name].failed += 1
+            if self._items.pop(id(item), None) is None:
+                return
+        try:
+            if self._on_error is not None:
+                self._on_error(item, error)
+        finally:
+            self._settle()
+
+    def _settle(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._lock.notify_all()
@@ -0,0 +1,181 @@
+"""Result collection for parse jobs submitted to LlamaParse's job API.
+
+Workers only upload (``ingest.start``) and hand the job id to a single
+``ParsePoller``. Its thread runs one event loop that, every
+``poll_interval_s``, checks the status of all outstanding jobs concurrently
+over one pooled HTTP client and fetches results as jobs succeed. Each
+finished job's callback runs on a hand-off thread, so a callback blocked on
+dispatcher admission never stalls polling. The number of outstanding remote
+jobs is bounded by ``max_outstanding_jobs``, independent of the worker count.
+Every status and result request is also a health check of the parser: its
+outcome is fed to the parser circuit breaker, so an outage seen only while
+polling (5xx, 429, transport errors) opens the circuit too.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from pdf_ingestion.breaker import CircuitBreaker, is_outage, parser_breaker
+from pdf_ingestion.errors import ParserUnavailable, PdfIngestionError
+
+JOB_STATUS_ROUTE = "/api/parsing/job/{job_id}"
+JOB_RESULT_ROUTE = "/api/parsing/job/{job_id}/result/json"
+
+_PENDING = "PENDING"
+_SUCCESS = "SUCCESS"
+
+OnDone = Callable[[dict[str, Any] | None, BaseException | None], None]
+
+
+@dataclass
+class _Tracked:
+    job_id: str
+    on_done: OnDone
+    submitted_at: float
+
+
+class ParsePoller:
+    """Polls every outstanding parse job from one thread and reports results."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        poll_interval_s: float = 2.0,
+        job_timeout_s: float = 1800.0,
+        max_outstanding: int = 200,
+        concurrency: int = 16,
+        transport: httpx.AsyncBaseTransport | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self._base_url = base_url
+        self._api_key = api_key
+        self._poll_interval_s = poll_interval_s
+        self._job_timeout_s = job_timeout_s
+        self._concurrency = max(1, concurrency)
+        self._transport = transport
+        self._breaker = breaker if breaker is not None else parser_breaker()
+        self._slots = threading.BoundedSemaphore(max(1, max_outstanding))
+        self._cond = threading.Condition()
+        self._jobs: dict[str, _Tracked] = {}
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._handoff = ThreadPoolExecutor(max_workers=1, thread_name_prefix="parse-handoff")
+
+    @property
+    def outstanding(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    def reserve(self) -> None:
+        """Block until another remote job may be outstanding.
+
+        Call before submitting; the slot is freed when the tracked job
+        finishes, or by ``release`` if no job ends up being tracked.
+        """
+        self._slots.acquire()
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def track(self, job_id: str, on_done: OnDone) -> None:
+        """Collect ``job_id``; ``on_done(result, error)`` is called once when it ends."""
+        with self._cond:
+            self._jobs[job_id] = _Tracked(job_id, on_done, time.monotonic())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="parse-poller", daemon=True)
+                self._thread.start()
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Wait until no jobs are outstanding; False if ``timeout`` expired first."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._jobs, timeout)
+
+    def stop(self) -> None:
+        """Stop polling. Outstanding jobs are abandoned, not reported."""
+        self._stopping.set()
+        with self._cond:
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._handoff.shutdown(wait=True)
+
+    def _run(self) -> None:
+        asyncio.run(self._loop())
+
+    async def _loop(self) -> None:
+        headers = {"Authorization": f"Bearer {self._api_key}"}
+        async with httpx.AsyncClient(base_url=self._base_url, headers=headers, transport=self._transport) as client:
+            while not self._stopping.is_set():
+                with self._cond:
+                    jobs = list(self._jobs.values())
+                if jobs:
+                    await self._poll(client, jobs)
+                await asyncio.sleep(self._poll_interval_s)
+
+    async def _poll(self, client: httpx.AsyncClient, jobs: list[_Tracked]) -> None:
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def check(job: _Tracked) -> None:
+            async with semaphore:
+                await self._check(client, job)
+
+        await asyncio.gather(*(check(job) for job in jobs))
+
+    async def _check(self, client: httpx.AsyncClient, job: _Tracked) -> None:
+        try:
+            response = await client.get(JOB_STATUS_ROUTE.format(job_id=job.job_id))
+            response.raise_for_status()
+            self._breaker.record_success()
+            status = response.json()
+            if status["status"] == _SUCCESS:
+                result = await client.get(JOB_RESULT_ROUTE.format(job_id=job.job_id))
+                result.raise_for_status()
+                self._done(job, result.json(), None)
+                return
+            if status["status"] != _PENDING:
+                message = status.get("error_message") or status["status"]
+                self._done(job, None, PdfIngestionError(f"Parse job {job.job_id} failed: {message}"))
+                return
+        except httpx.HTTPStatusError as e:
+            self._record(e)
+            if e.response.status_code == 404:
+                # The job expired or was never recorded; it has to be submitted again
+                self._done(job, None, ParserUnavailable(f"Parse job {job.job_id} not found"))
+                return
+        except httpx.TransportError as e:
+            self._record(e)  # transient; checked again next round
+        except (ValueError, KeyError):
+            pass  # transient; checked again next round
+        except Exception as e:
+            # Anything else fails this job alone; escaping would end the poller thread
+            self._done(job, None, e)
+            return
+        if time.monotonic() - job.submitted_at > self._job_timeout_s:
+            error = ParserUnavailable(f"Timeout while parsing the file: {job.job_id}")
+            self._record(error)
+            self._done(job, None, error)
+
+    def _record(self, error: BaseException) -> None:
+        # A reply that is not an outage still shows the parser is reachable
+        if is_outage(error):
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+
+    def _done(self, job: _Tracked, result: dict[str, Any] | None, error: BaseException | None) -> None:
+        with self._cond:
+            if self._jobs.pop(job.job_id, None) is None:
+                return
+            self._cond.notify_all()
+        self._slots.release()
+        self._handoff.submit(job.on_done, result, error)
@@ -0,0 +1,175 @@
+"""Fast PDF prescan: page count, text layer, encryption and validity.
+
+The prescan memory-maps the file and reads only its trailer, xref data and
+page tree (see ``pdfobjects.PdfReader``), so it costs a small fraction of a
+full parse. Results are cached by content hash in an append-only JSONL file
+under ``[state].dir`` and are reused by scheduling and the ingest stage.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.hashing import sha256_file
+from pdf_ingestion.pdfobjects import PdfReader
+
+CFG = settings()
+
+_CACHE_FILE_NAME = "prescan.jsonl"
+# File hashes remembered by path, size and mtime
+_DEFAULT_MAX_HASHES = 10_000
+
+
+@dataclass
+class PdfPrescan:
+    """Cheap facts about a PDF, gathered without parsing its content."""
+
+    sha256: str
+    size_bytes: int
+    valid: bool
+    encrypted: bool = False
+    page_count: int | None = None
+    has_text_layer: bool | None = None
+    version: str | None = None
+    repaired: bool = False
+    error: str | None = None
+
+
+def prescan_pdf(path: Path, sha256: str | None = None) -> PdfPrescan:
+    """Prescan a single PDF file.
+
+    Structural problems never raise; they are reported through ``valid`` and
+    ``error``. Only I/O errors opening the file propagate.
+    """
+    sha256 = sha256 or sha256_file(path)
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size == 0:
+            return PdfPrescan(sha256=sha256, size_bytes=0, valid=False, error="Empty file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return _scan_buffer(buf, sha256, size)
+
+
+def _scan_buffer(buf: mmap.mmap, sha256: str, size: int) -> PdfPrescan:
+    # The bytes are untrusted: anything the reader raises means the file
+    # cannot be read, and is reported as invalid rather than raised
+    try:
+        reader = PdfReader(buf)
+    except Exception as e:
+        return PdfPrescan(sha256=sha256, size_bytes=size, valid=False, error=str(e))
+
+    result = PdfPrescan(
+        sha256=sha256,
+        size_bytes=size,
+        valid=True,
+        encrypted=reader.encrypted,
+        version=reader.version,
+        repaired=reader.repaired,
+    )
+    try:
+        result.page_count = reader.page_count
+        result.has_text_layer = any(reader.page_has_fonts(page) for page in reader.iter_pages())
+    except Exception as e:
+        # Encrypted files may keep their page tree in encrypted object streams
+        if not result.encrypted:
+            result.valid = False
+            result.error = f"Unreadable page tree: {e}"
+    return result
+
+
+class PrescanCache:
+    """Append-only JSONL cache of prescan results keyed by content hash."""
+
+    def __init__(self, path: Path, max_hashes: int = _DEFAULT_MAX_HASHES):
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, PdfPrescan] = {}
+        # (path, size, mtime_ns) -> sha256, so a file seen twice is hashed
+        # once; least recently used first, and bounded, as every file the
+        # watcher ever sees passes through here
+        self._hashes: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self._max_hashes = max(1, max_hashes)
+        self._load()
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        with open(self._path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = PdfPrescan(**json.loads(line))
+                except (ValueError, TypeError):
+                    # A crash mid-append can leave a partial last line
+                    continue
+                self._entries[entry.sha256] = entry
+
+    def get(self, sha256: str) -> PdfPrescan | None:
+        with self._lock:
+            return self._entries.get(sha256)
+
+    def put(self, result: PdfPrescan) -> None:
+        with self._lock:
+            if result.sha256 in self._entries:
+                return
+            self._entries[result.sha256] = result
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(result)) + "\n")
+
+    def hash(self, path: Path) -> str:
+        """Return the SHA256 of ``path``, reusing it while size/mtime are unchanged."""
+        st = path.stat()
+        key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            sha256 = self._hashes.get(key)
+            if sha256 is not None:
+                self._hashes.move_to_end(key)
+        if sha256 is None:
+            sha256 = sha256_file(path)
+            with self._lock:
+                self._hashes[key] = sha256
+                while len(self._hashes) > self._max_hashes:
+                    self._hashes.popitem(last=False)
+        return sha256
+
+    def scan(self, path: Path) -> PdfPrescan:
+        """Return the cached prescan for ``path``'s content, scanning on a miss."""
+        sha256 = self.hash(path)
+        cached = self.get(sha256)
+        if cached is not None:
+            return cached
+        result = prescan_pdf(path, sha256=sha256)
+        self.put(result)
+        return result
+
+
+_CACHE: PrescanCache | None = None
+_CACHE_LOCK = threading.Lock()
+singletons.register(__name__, "_CACHE")
+
+
+def prescan_cache() -> PrescanCache:
+    """Return the process-wide prescan cache stored under ``[state].dir``."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = PrescanCache(Path(CFG["state"]["dir"]) / _CACHE_FILE_NAME,
+                                  max_hashes=CFG.get("prescan", {}).get("hash_cache_size", _DEFAULT_MAX_HASHES))
+        return _CACHE
+
+
+def rejection_reason(result: PdfPrescan) -> str | None:
+    """Return why ``result`` should be rejected before parsing, if at all."""
+    prescan_cfg = CFG.get("prescan", {})
+    if not result.valid and prescan_cfg.get("reject_invalid", True):
+        return f"Corrupt or truncated PDF: {result.error}"
+    if result.encrypted and prescan_cfg.get("reject_encrypted", True):
+        return "Encrypted PDF"
+    return None
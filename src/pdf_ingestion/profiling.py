@@ -0,0 +1,173 @@
+"""Opt-in profiling of ingest cycles and jobs.
+
+With ``[profiling].mode`` (or ``--profile``) set, each ingest cycle and a
+``sample_rate`` fraction of jobs (chosen by run id, so every stage of a
+sampled job is captured) are captured and the artifacts written under
+``[runs].dir/profiles/<run_id>/``:
+
+* ``cpu``: a cProfile dump per capture (``<label>.prof``, loadable with
+  ``pstats`` or snakeviz) plus the top functions by cumulative time
+  (``<label>.txt``). cProfile follows one thread, so a cycle capture covers
+  dispatch and a job capture covers the worker running that job or stage.
+* ``mem``: the top allocation sites that grew during the capture and the
+  traced peak (``<label>.mem.txt``). tracemalloc is process-wide, so jobs
+  running at the same time show up in each other's diffs.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hashlib
+import io
+import pstats
+import threading
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import settings
+from pdf_ingestion import singletons
+
+CFG = settings()
+
+CPU = "cpu"
+MEM = "mem"
+MODES = (CPU, MEM)
+
+_PROFILES_DIR_NAME = "profiles"
+
+
+class RunProfiler:
+    """Captures CPU or memory profiles around labelled units of work."""
+
+    def __init__(
+        self,
+        mode: str | None,
+        root: Path,
+        sample_rate: float = 1.0,
+        top_n: int = 25,
+        tracemalloc_frames: int = 1,
+    ):
+        if mode and mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.mode = mode or None
+        self._root = root
+        self._sample_rate = sample_rate
+        self._top_n = top_n
+        self._frames = max(1, tracemalloc_frames)
+        self._lock = threading.Lock()
+        self._tracing = 0
+        self._owns_tracing = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None
+
+    def sampled(self, run_id: str) -> bool:
+        if self._sample_rate >= 1:
+            return True
+        bucket = int.from_bytes(hashlib.sha256(run_id.encode()).digest()[:4], "big") / 2**32
+        return bucket < self._sample_rate
+
+    def path_for(self, run_id: str, label: str, suffix: str) -> Path:
+        return self._root / run_id / f"{label}{suffix}"
+
+    @contextmanager
+    def capture(self, run_id: str, label: str, sampled: bool = True) -> Iterator[None]:
+        """Profile the block if enabled; artifacts are tagged with ``run_id``.
+
+        With ``sampled`` the block is only captured for sampled run ids.
+        """
+        if self.mode is None or (sampled and not self.sampled(run_id)):
+            yield
+            return
+        with self._cpu(run_id, label) if self.mode == CPU else self._memory(run_id, label):
+            yield
+
+    def wrap(self, fn: Callable, label: str) -> Callable:
+        """Wrap a stage function ``fn(job)`` to capture each call under the job's run id."""
+        if self.mode is None:
+            return fn
+
+        def profiled(job):
+            with self.capture(job.RUN_ID, label):
+                return fn(job)
+
+        return profiled
+
+    @contextmanager
+    def _cpu(self, run_id: str, label: str) -> Iterator[None]:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active on this thread; run unprofiled
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            target = self.path_for(run_id, label, ".prof")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(target)
+            report = io.StringIO()
+            pstats.Stats(profile, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self._top_n)
+            target.with_suffix(".txt").write_text(report.getvalue(), encoding="utf-8")
+
+    @contextmanager
+    def _memory(self, run_id: str, label: str) -> Iterator[None]:
+        with self._lock:
+            if self._tracing == 0:
+                # Leave tracing alone if someone else (e.g. -X tracemalloc) started it
+                self._owns_tracing = not tracemalloc.is_tracing()
+                if self._owns_tracing:
+                    tracemalloc.start(self._frames)
+                tracemalloc.reset_peak()
+            self._tracing += 1
+            before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                self._tracing -= 1
+                if self._tracing == 0 and self._owns_tracing:
+                    tracemalloc.stop()
+            key = "traceback" if self._frames > 1 else "lineno"
+            lines = [f"run_id: {run_id}", f"label: {label}",
+                     f"traced_current_bytes: {current}", f"traced_peak_bytes: {peak}",
+                     f"top {self._top_n} allocation sites by growth:"]
+            for stat in after.compare_to(before, key)[: self._top_n]:
+                lines.append(str(stat))
+                if self._frames > 1:
+                    lines.extend(f"    {line}" for line in stat.traceback.format())
+            target = self.path_for(run_id, label, ".mem.txt")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+_PROFILER: RunProfiler | None = None
+_PROFILER_LOCK = threading.Lock()
+singletons.register(__name__, "_PROFILER")
+
+
+def run_profiler(mode: str | None = None) -> RunProfiler:
+    """Return the process-wide profiler configured by ``[profiling]``.
+
+    ``mode`` (the ``--profile`` flag) overrides ``[profiling].mode`` when
+    the profiler is first created.
+    """
+    global _PROFILER
+    with _PROFILER_LOCK:
+        if _PROFILER is None:
+            profiling = CFG.get('profiling', {})
+            _PROFILER = RunProfiler(
+                mode=mode or profiling.get('mode') or None,
+                root=Path(CFG['runs']['dir']) / _PROFILES_DIR_NAME,
+                sample_rate=profiling.get('sample_rate', 1.0),
+                top_n=profiling.get('top_n', 25),
+                tracemalloc_frames=profiling.get('tracemalloc_frames', 1))
+        return _PROFILER
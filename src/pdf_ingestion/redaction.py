@@ -0,0 +1,62 @@
+"""Redaction stage: mask account numbers to their last four digits."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+
+from config import settings
+
+# Rule name (a boolean key in [redaction]) -> patterns it masks
+RULES: dict[str, tuple[re.Pattern[str], ...]] = {
+    "account_numbers": (
+        # Card-style groups: 1234 5678 9012 3456 / 1234-5678-9012-3456
+        re.compile(r"(?<![\w-])\d{4}(?:[ -]\d{4}){2,3}(?![\w-])"),
+        # Contiguous account numbers of 8 to 19 digits
+        re.compile(r"(?<![\w-])\d{8,19}(?![\w-])"),
+    ),
+}
+
+_KEEP_DIGITS = 4
+
+
+def _mask(match: re.Match[str]) -> str:
+    text = match.group()
+    digits = sum(ch.isdigit() for ch in text)
+    to_mask = digits - _KEEP_DIGITS
+    out = []
+    for ch in text:
+        if ch.isdigit() and to_mask > 0:
+            out.append("*")
+            to_mask -= 1
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def enabled_rules() -> list[str]:
+    """Names of the redaction rules switched on in ``[redaction]``."""
+    cfg = settings().get("redaction", {})
+    return [name for name in RULES if cfg.get(name, False)]
+
+
+def rules_hash() -> str:
+    """Stable hash of the enabled rules and their patterns.
+
+    Stored with every output so a rule change can be detected later and
+    only the affected outputs re-rendered.
+    """
+    digest = hashlib.sha256()
+    for name in enabled_rules():
+        digest.update(name.encode())
+        for pattern in RULES[name]:
+            digest.update(b"\0" + pattern.pattern.encode())
+    return digest.hexdigest()
+
+
+def redact(text: str, rules: list[str] | None = None) -> str:
+    """Apply the enabled (or the given) redaction rules to ``text``."""
+    for name in enabled_rules() if rules is None else rules:
+        for pattern in RULES[name]:
+            text = pattern.sub(_mask, text)
+    return text
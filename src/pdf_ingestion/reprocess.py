@@ -0,0 +1,48 @@
+"""Selective reprocessing of ledger entries whose fingerprints are stale."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pdf_ingestion.fingerprint import PARSE, current_fingerprints, stale_stages
+from pdf_ingestion.ledger import Ledger
+from pdf_ingestion.tiers import is_degraded
+
+
+@dataclass
+class ReprocessItem:
+    """One ledger entry and the stages it needs to re-run."""
+
+    entry: dict[str, Any]
+    stages: set[str]
+
+    @property
+    def reparse(self) -> bool:
+        return PARSE in self.stages
+
+    @property
+    def size_bytes(self) -> int:
+        try:
+            return Path(self.entry["processed_file"]).stat().st_size
+        except (KeyError, OSError):
+            return 0
+
+
+def plan_reprocess(ledger: Ledger, force: bool = False, degraded: bool = False) -> list[ReprocessItem]:
+    """Return the ledger entries whose recorded fingerprints are out of date.
+
+    With ``force`` every entry is re-parsed regardless of fingerprints.
+    With ``degraded`` only entries ingested below the base tier are
+    considered.
+    """
+    current = current_fingerprints()
+    plan = []
+    for entry in ledger.iter_entries():
+        if degraded and not is_degraded(entry.get("tier")):
+            continue
+        stages = set(current) if force else stale_stages(entry.get("fingerprints"), current)
+        if stages:
+            plan.append(ReprocessItem(entry=entry, stages=stages))
+    return plan
@@ -0,0 +1,192 @@
+"""Delayed retry of quarantined files that failed with a retryable error.
+
+A file quarantined after a transient failure (a sink or network error, an
+I/O error) is scheduled to go back to the inbox it came from after a
+backoff of ``base_delay_s * 2 ** (attempts - 1)``, capped at
+``max_delay_s``. The attempt count is kept by content hash in
+``[state].dir/retries.json``, so the backoff keeps growing across restarts
+and re-drops, and a file stays in quarantine once it has been retried
+``max_retries`` times. Every decision is appended to ``[job].job_file``
+with the attempt count in its ``retries`` column.
+
+Due entries are found with a heap ordered by due time; entries that were
+rescheduled or cleared since they were pushed are skipped when popped.
+"""
+
+from __future__ import annotations
+
+import csv
+import heapq
+import json
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.breaker import is_outage
+from pdf_ingestion.sinks import SinkError
+from pdf_ingestion.writers import atomic_write_text
+
+CFG = settings()
+
+_RETRIES_FILE_NAME = "retries.json"
+
+SCHEDULED = "retry_scheduled"
+RELEASED = "retry_released"
+EXHAUSTED = "quarantined"
+
+JOB_FILE_COLUMNS = ["job_id", "job_name", "status", "retries", "input_file", "processed_file",
+                    "quarantine_file", "output_json", "output_markdown"]
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for failures that may succeed unchanged on a later attempt."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return is_outage(error)  # a 4xx is an answer, not an outage
+    return isinstance(error, (SinkError, OSError, TimeoutError, httpx.TransportError)) or is_outage(error)
+
+
+def append_job_row(path: Path, **fields: Any) -> None:
+    """Append one row to the job file, writing its header first if it is new or empty."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new = not path.exists() or path.stat().st_size == 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=JOB_FILE_COLUMNS)
+        if new:
+            writer.writeheader()
+        writer.writerow({column: fields.get(column, "") for column in JOB_FILE_COLUMNS})
+
+
+@dataclass
+class RetryEntry:
+    """Retry state of one quarantined file."""
+
+    key: str
+    file_name: str
+    inbox: str
+    attempts: int = 0
+    due_at: float | None = None
+    error: str = ""
+
+
+class RetrySchedule:
+    """Thread-safe, persisted schedule of quarantined files waiting to go back."""
+
+    def __init__(
+        self,
+        path: Path,
+        base_delay_s: float = 60.0,
+        max_delay_s: float = 6 * 3600.0,
+        max_retries: int = 5,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._path = path
+        self._base_delay_s = base_delay_s
+        self._max_delay_s = max_delay_s
+        self.max_retries = max_retries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[str, RetryEntry] = {}
+        self._heap: list[tuple[float, str]] = []
+        if path.exists():
+            for raw in json.loads(path.read_text(encoding="utf-8") or "[]"):
+                entry = RetryEntry(**raw)
+                self._entries[entry.key] = entry
+                if entry.due_at is not None:
+                    self._heap.append((entry.due_at, entry.key))
+            heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        """Entries waiting for their due time."""
+        with self._lock:
+            return sum(entry.due_at is not None for entry in self._entries.values())
+
+    def get(self, key: str) -> RetryEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            return RetryEntry(**asdict(entry)) if entry is not None else None
+
+    def delay(self, attempts: int) -> float:
+        return min(self._max_delay_s, self._base_delay_s * 2 ** max(0, attempts - 1))
+
+    def schedule(self, key: str, file_name: str, inbox: str, error: str) -> RetryEntry:
+        """Count another failed attempt and schedule the next one.
+
+        Once ``max_retries`` attempts have been used the entry is kept
+        unscheduled (``due_at`` None) and the file stays in quarantine.
+        """
+        with self._lock:
+            entry = self._entries.setdefault(key, RetryEntry(key, file_name, inbox))
+            entry.file_name, entry.inbox, entry.error = file_name, inbox, error
+            if entry.attempts < self.max_retries:
+                entry.attempts += 1
+                entry.due_at = self._clock() + self.delay(entry.attempts)
+                heapq.heappush(self._heap, (entry.due_at, key))
+            else:
+                entry.due_at = None
+            self._save()
+            return RetryEntry(**asdict(entry))
+
+    def pop_due(self) -> list[RetryEntry]:
+        """Remove and return the entries whose due time has passed, oldest first.
+
+        Their attempt counts are kept for the next ``schedule``.
+        """
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, key = heapq.heappop(self._heap)
+                entry = self._entries.get(key)
+                if entry is None or entry.due_at != due_at:
+                    continue  # cleared or rescheduled since
+                entry.due_at = None
+                due.append(RetryEntry(**asdict(entry)))
+            if due:
+                self._save()
+        return due
+
+    def defer(self, key: str, seconds: float) -> None:
+        """Push a popped entry back by ``seconds`` without counting an attempt."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.due_at = self._clock() + seconds
+            heapq.heappush(self._heap, (entry.due_at, key))
+            self._save()
+
+    def clear(self, key: str) -> None:
+        """Forget a file, e.g. once it has been ingested."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        entries = [asdict(entry) for entry in self._entries.values()]
+        atomic_write_text(self._path, json.dumps(entries, indent=2, sort_keys=True))
+
+
+_RETRIES: RetrySchedule | None = None
+_RETRIES_LOCK = threading.Lock()
+singletons.register(__name__, "_RETRIES")
+
+
+def retry_schedule() -> RetrySchedule:
+    """Return the process-wide retry schedule configured by ``[retry_queue]``."""
+    global _RETRIES
+    with _RETRIES_LOCK:
+        if _RETRIES is None:
+            retry_queue = CFG.get('retry_queue', {})
+            _RETRIES = RetrySchedule(
+                Path(CFG['state']['dir']) / _RETRIES_FILE_NAME,
+                base_delay_s=retry_queue.get('base_delay_s', 60.0),
+                max_delay_s=retry_queue.get('max_delay_s', 6 * 3600.0),
+                max_retries=retry_queue.get('max_retries', 5))
+        return _RETRIES
@@ -0,0 +1,170 @@
+"""Incremental full-text search index over produced markdown.
+
+Pages are indexed in a local SQLite database with an FTS5 table. A plain
+``pages`` table keys each row by (content hash, page number) and supplies
+the FTS rowid, so replacing a document on reprocess deletes its old rows by
+rowid instead of scanning the full-text table.
+
+Updating the full-text table is batched: ``add`` only journals the
+document in a ``pending`` table (one small insert, durable once the job
+commits), and pending documents are moved into the full-text table in
+batched transactions. ``flush`` forces them out, and the CLI flushes at
+the end of every cycle. Documents left pending by a crash are indexed
+when the index is next opened.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from config import settings
+from pdf_ingestion import singletons
+
+_DEFAULT_BATCH_SIZE = 500
+_INDEX_FILE_NAME = "search.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    UNIQUE (sha256, page)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(body, tokenize = 'unicode61');
+CREATE TABLE IF NOT EXISTS pending (
+    sha256 TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    pages TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class SearchHit:
+    """One matching page."""
+
+    sha256: str
+    page: int
+    source: str
+    snippet: str
+    score: float
+
+
+class SearchIndex:
+    """Thread-safe FTS5 page index with batched writes."""
+
+    def __init__(self, path: Path, batch_size: int = _DEFAULT_BATCH_SIZE):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._path = path
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        # Pages journaled since the last flush; a re-added document counts twice
+        self._pending_pages = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        with self._lock:
+            self._flush_locked()
+
+    def add(self, sha256: str, source: str, pages: list[str]) -> None:
+        """Journal ``pages`` to replace any indexed pages for ``sha256``."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pending (sha256, source, pages) VALUES (?, ?, ?) "
+                "ON CONFLICT (sha256) DO UPDATE SET source = excluded.source, pages = excluded.pages",
+                (sha256, source, json.dumps(pages)),
+            )
+            self._pending_pages += len(pages)
+            if self._pending_pages >= self._batch_size:
+                self._flush_locked()
+
+    def remove(self, sha256s: list[str]) -> None:
+        """Delete every indexed page of the given documents."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM pending WHERE sha256 = ?", [(sha256,) for sha256 in sha256s])
+                self._delete_locked(sha256s)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _delete_locked(self, sha256s: list[str]) -> None:
+        params = [(sha256,) for sha256 in sha256s]
+        self._conn.executemany(
+            "DELETE FROM pages_fts WHERE rowid IN (SELECT id FROM pages WHERE sha256 = ?)", params
+        )
+        self._conn.executemany("DELETE FROM pages WHERE sha256 = ?", params)
+
+    def _flush_locked(self) -> None:
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = {sha256: (source, json.loads(pages))
+                       for sha256, source, pages in conn.execute("SELECT sha256, source, pages FROM pending")}
+            self._delete_locked(list(pending))
+            for sha256, (source, pages) in pending.items():
+                conn.executemany(
+                    "INSERT INTO pages (sha256, page, source) VALUES (?, ?, ?)",
+                    [(sha256, number, source) for number in range(1, len(pages) + 1)],
+                )
+                ids = dict(conn.execute("SELECT page, id FROM pages WHERE sha256 = ?", (sha256,)))
+                conn.executemany(
+                    "INSERT INTO pages_fts (rowid, body) VALUES (?, ?)",
+                    [(ids[number], body) for number, body in enumerate(pages, start=1)],
+                )
+            conn.execute("DELETE FROM pending")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._pending_pages = 0
+
+    def search(self, query: str, limit: int = 20) -> list[SearchHit]:
+        """Return the best-ranked pages matching an FTS5 ``query``."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT p.sha256, p.page, p.source,
+                       snippet(pages_fts, 0, '[', ']', '...', 12), bm25(pages_fts)
+                FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid
+                WHERE pages_fts MATCH ?
+                ORDER BY bm25(pages_fts)
+                LIMIT ?
+                """,
+                (query, limit),
+            ).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+
+_INDEX: SearchIndex | None = None
+_INDEX_LOCK = threading.Lock()
+singletons.register(__name__, "_INDEX", SearchIndex.close)
+
+
+def search_index() -> SearchIndex:
+    """Return the process-wide search index configured by ``[search]``."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            cfg = settings()
+            index_file = cfg.get("search", {}).get("index_file") or str(Path(cfg["state"]["dir"]) / _INDEX_FILE_NAME)
+            batch_size = cfg.get("search", {}).get("batch_size", _DEFAULT_BATCH_SIZE)
+            _INDEX = SearchIndex(Path(index_file), batch_size=batch_size)
+        return _INDEX
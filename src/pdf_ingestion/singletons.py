@@ -0,0 +1,50 @@
+"""Registry of the process-wide lazy singletons, so they can be reset together.
+
+Modules keep their shared instance (the ledger, the output sink, the
+worker pools ...) in a module global built on first use from the settings.
+Each module registers that global here with the call that releases it;
+``reset_singletons`` drops them all, closing the open ones, so the next use
+builds them afresh from the current settings. Tests reset around every
+test instead of patching each global by name.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from collections.abc import Callable
+from typing import Any
+
+# (module name, global name, release call); in registration order
+_REGISTRY: list[tuple[str, str, Callable[[Any], None] | None]] = []
+_REGISTRY_LOCK = threading.Lock()
+
+
+def register(module: str, name: str, close: Callable[[Any], None] | None = None) -> None:
+    """Register the singleton held in global ``name`` of ``module``; ``close`` releases it."""
+    with _REGISTRY_LOCK:
+        if all((module, name) != (known, known_name) for known, known_name, _ in _REGISTRY):
+            _REGISTRY.append((module, name, close))
+
+
+def reset_singletons() -> None:
+    """Set every registered singleton back to None, closing the ones that exist.
+
+    They are closed newest-registered first, so an instance goes before the
+    ones its module depends on. Every one is reset even if a close fails;
+    the first failure is raised afterwards.
+    """
+    with _REGISTRY_LOCK:
+        entries = list(reversed(_REGISTRY))
+    error: BaseException | None = None
+    for module, name, close in entries:
+        instance = getattr(sys.modules[module], name)
+        setattr(sys.modules[module], name, None)
+        if instance is None or close is None:
+            continue
+        try:
+            close(instance)
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
@@ -0,0 +1,348 @@
+"""Output sinks: where the JSON and Markdown outputs are written.
+
+``LocalSink`` (the default) writes the ``[output]`` paths atomically on the
+local filesystem. ``S3Sink`` streams the same outputs to an S3-compatible
+bucket (AWS S3, MinIO, ...) instead, so no separate sync job has to ship
+them: writes are buffered into parts that upload concurrently while the
+writer keeps producing, over one pooled HTTP client, with the bytes of
+parts in flight bounded across all writers. Objects smaller than one part
+are sent with a single PUT.
+
+Requests are signed with AWS Signature Version 4 and use path-style
+addressing, which every S3-compatible server accepts.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import hmac
+import os
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO
+from urllib.parse import quote
+
+import httpx
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.dispatcher import ByteBudget
+from pdf_ingestion.errors import PdfIngestionError
+from pdf_ingestion.writers import atomic_writer
+
+CFG = settings()
+
+LOCAL = "local"
+S3 = "s3"
+
+# S3 rejects multipart parts (except the last) below 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+_ALGORITHM = "AWS4-HMAC-SHA256"
+
+
+class SinkError(PdfIngestionError):
+    """An output could not be written to the sink."""
+
+
+class LocalSink:
+    """Writes outputs to local paths with atomic replace."""
+
+    def open(self, path: Path):
+        return atomic_writer(path)
+
+    def location(self, path: Path) -> str:
+        return str(path)
+
+    def close(self) -> None:
+        pass
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _find(root: ET.Element, name: str) -> str | None:
+    # Responses are namespaced; match on the local tag name
+    for element in root.iter():
+        if element.tag.rsplit("}", 1)[-1] == name:
+            return element.text
+    return None
+
+
+class _Signer:
+    """AWS Signature Version 4 for S3 requests."""
+
+    def __init__(self, access_key: str, secret_key: str, region: str, clock=None):
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._region = region
+        self._clock = clock or (lambda: datetime.datetime.now(datetime.UTC))
+
+    def sign(self, request: httpx.Request, payload_hash: str) -> None:
+        now = self._clock()
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = now.strftime("%Y%m%d")
+        request.headers["x-amz-date"] = amz_date
+        request.headers["x-amz-content-sha256"] = payload_hash
+
+        signed = sorted(name for name in ("host", "x-amz-date", "x-amz-content-sha256", "content-type")
+                        if name in request.headers)
+        canonical_headers = "".join(f"{name}:{request.headers[name].strip()}\n" for name in signed)
+        query = "&".join(
+            f"{quote(key, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for key, value in sorted(request.url.params.multi_items())
+        )
+        canonical_request = "\n".join([
+            request.method,
+            request.url.raw_path.split(b"?", 1)[0].decode("ascii"),
+            query,
+            canonical_headers,
+            ";".join(signed),
+            payload_hash,
+        ])
+        scope = f"{date}/{self._region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            _ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        key = _hmac(("AWS4" + self._secret_key).encode("utf-8"), date)
+        for part in (self._region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        request.headers["authorization"] = (
+            f"{_ALGORITHM} Credential={self._access_key}/{scope}, "
+            f"SignedHeaders={';'.join(signed)}, Signature={signature}"
+        )
+
+
+class S3Sink:
+    """Streams outputs to an S3-compatible bucket with concurrent multipart uploads.
+
+    Local output paths map to object keys relative to ``root`` under
+    ``prefix``. ``max_inflight_bytes`` bounds the part data buffered for
+    upload across every open writer; a writer blocks while it is spent.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        prefix: str = "",
+        root: Path | str = ".",
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 8,
+        max_inflight_bytes: int = 64 * 1024 * 1024,
+        max_attempts: int = 3,
+        initial_backoff_ms: int = 500,
+        max_backoff_ms: int = 5000,
+        jitter: bool = True,
+        timeout_s: float = 120.0,
+        transport: httpx.BaseTransport | None = None,
+        min_part_size: int = MIN_PART_SIZE,
+    ):
+        if part_size < min_part_size:
+            raise ValueError(f"part_size must be at least {min_part_size} bytes, got {part_size}")
+        self.bucket = bucket
+        self.part_size = part_size
+        self._prefix = prefix.strip("/")
+        self._root = Path(root).resolve()
+        self._signer = _Signer(access_key, secret_key, region)
+        self._max_attempts = max(1, max_attempts)
+        self._initial_backoff_s = initial_backoff_ms / 1000
+        self._max_backoff_s = max_backoff_ms / 1000
+        self._jitter = jitter
+        self.budget = ByteBudget(max_inflight_bytes)
+        limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        self._client = httpx.Client(base_url=endpoint_url.rstrip("/"), limits=limits, transport=transport,
+                                    timeout=timeout_s)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="s3-part")
+
+    # ------------------------------------------------------------ interface
+    def key_for(self, path: Path) -> str:
+        relative = PurePosixPath(Path(os.path.relpath(Path(path).resolve(), self._root)).as_posix())
+        if ".." in relative.parts:
+            raise ValueError(f"Output path {path} is outside the sink root {self._root}")
+        return f"{self._prefix}/{relative}" if self._prefix else str(relative)
+
+    def location(self, path: Path) -> str:
+        return f"s3://{self.bucket}/{self.key_for(path)}"
+
+    @contextmanager
+    def open(self, path: Path) -> Iterator[BinaryIO]:
+        """Yield a writer whose object appears only if the block exits cleanly."""
+        writer = _MultipartWriter(self, self.key_for(path))
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._client.close()
+
+    # ------------------------------------------------------------- requests
+    def _url(self, key: str) -> str:
+        return f"/{quote(self.bucket, safe='')}/{quote(key, safe='/-_.~')}"
+
+    def _request(self, method: str, key: str, params: dict[str, Any] | None = None,
+                 content: bytes = b"", headers: dict[str, str] | None = None) -> httpx.Response:
+        payload_hash = hashlib.sha256(content).hexdigest()
+        delay = self._initial_backoff_s
+        for attempt in range(1, self._max_attempts + 1):
+            request = self._client.build_request(method, self._url(key), params=params, content=content,
+                                                 headers=headers)
+            self._signer.sign(request, payload_hash)
+            try:
+                response = self._client.send(request)
+                if response.status_code < 500 and response.status_code != 429:
+                    break
+            except httpx.TransportError as e:
+                if attempt == self._max_attempts:
+                    raise SinkError(f"{method} s3://{self.bucket}/{key} failed: {e}") from e
+                response = None
+            if attempt < self._max_attempts:
+                time.sleep(delay * (random.uniform(0.5, 1.0) if self._jitter else 1.0))
+                delay = min(delay * 2, self._max_backoff_s)
+        if response.is_error:
+            raise SinkError(f"{method} s3://{self.bucket}/{key} failed: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def _put_object(self, key: str, data: bytes) -> None:
+        self._request("PUT", key, content=data)
+
+    def _create_upload(self, key: str) -> str:
+        response = self._request("POST", key, params={"uploads": ""})
+        upload_id = _find(ET.fromstring(response.content), "UploadId")
+        if not upload_id:
+            raise SinkError(f"No UploadId for s3://{self.bucket}/{key}")
+        return upload_id
+
+    def _upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        try:
+            response = self._request("PUT", key, params={"partNumber": str(number), "uploadId": upload_id},
+                                     content=data)
+        finally:
+            self.budget.release(len(data))
+        return response.headers["etag"]
+
+    def _complete_upload(self, key: str, upload_id: str, etags: list[str]) -> None:
+        body = "".join(f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                       for number, etag in enumerate(etags, start=1))
+        response = self._request("POST", key, params={"uploadId": upload_id},
+                                 content=f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode(),
+                                 headers={"content-type": "application/xml"})
+        # S3 may answer 200 and still report an error in the body
+        root = ET.fromstring(response.content) if response.content else None
+        if root is not None and root.tag.rsplit("}", 1)[-1] == "Error":
+            raise SinkError(f"Completing s3://{self.bucket}/{key} failed: {_find(root, 'Message')}")
+
+    def _abort_upload(self, key: str, upload_id: str) -> None:
+        self._request("DELETE", key, params={"uploadId": upload_id})
+
+
+class _MultipartWriter:
+    """File-like writer that uploads full parts in the background."""
+
+    def __init__(self, sink: S3Sink, key: str):
+        self._sink = sink
+        self._key = key
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: list[tuple[Future[str], int]] = []
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._sink.part_size:
+            part = bytes(self._buffer[: self._sink.part_size])
+            del self._buffer[: self._sink.part_size]
+            self._submit(part)
+        return len(data)
+
+    def _submit(self, part: bytes) -> None:
+        if self._upload_id is None:
+            self._upload_id = self._sink._create_upload(self._key)
+        self._sink.budget.acquire(len(part))
+        try:
+            future = self._sink._executor.submit(
+                self._sink._upload_part, self._key, self._upload_id, len(self._parts) + 1, part)
+        except BaseException:
+            self._sink.budget.release(len(part))
+            raise
+        self._parts.append((future, len(part)))
+
+    def commit(self) -> None:
+        if self._upload_id is None:
+            self._sink._put_object(self._key, bytes(self._buffer))
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            etags = [future.result() for future, _ in self._parts]
+            self._sink._complete_upload(self._key, self._upload_id, etags)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        for future, size in self._parts:
+            if future.cancel():
+                self._sink.budget.release(size)
+            else:
+                future.exception()  # wait; failures are superseded by the abort
+        self._parts = []
+        if self._upload_id is not None:
+            try:
+                self._sink._abort_upload(self._key, self._upload_id)
+            except SinkError:
+                pass  # the bucket's lifecycle rules clean up abandoned uploads
+            self._upload_id = None
+
+
+_SINK: LocalSink | S3Sink | None = None
+_SINK_LOCK = threading.Lock()
+singletons.register(__name__, "_SINK", lambda sink: sink.close())
+
+
+def output_sink() -> LocalSink | S3Sink:
+    """Return the process-wide sink configured by ``[sink]``."""
+    global _SINK
+    with _SINK_LOCK:
+        if _SINK is None:
+            sink = CFG.get('sink', {})
+            kind = sink.get('type', LOCAL)
+            if kind == LOCAL:
+                _SINK = LocalSink()
+            elif kind == S3:
+                s3 = sink.get('s3', {})
+                retry = CFG.get('retry', {})
+                _SINK = S3Sink(
+                    endpoint_url=s3['endpoint_url'],
+                    bucket=s3['bucket'],
+                    access_key=s3.get('access_key') or os.environ.get('AWS_ACCESS_KEY_ID', ''),
+                    secret_key=s3.get('secret_key') or os.environ.get('AWS_SECRET_ACCESS_KEY', ''),
+                    region=s3.get('region', 'us-east-1'),
+                    prefix=s3.get('prefix', ''),
+                    root=s3.get('root', '.'),
+                    part_size=s3.get('part_size', 8 * 1024 * 1024),
+                    max_concurrency=s3.get('max_concurrency', 8),
+                    max_inflight_bytes=s3.get('max_inflight_bytes', 64 * 1024 * 1024),
+                    max_attempts=retry.get('max_attempts', 3),
+                    initial_backoff_ms=retry.get('initial_backoff_ms', 500),
+                    max_backoff_ms=retry.get('max_backoff_ms', 5000),
+                    jitter=retry.get('jitter', True),
+                    timeout_s=s3.get('timeout_s', 120))
+            else:
+                raise ValueError(f"Unknown output sink type: {kind}")
+        return _SINK
@@ -0,0 +1,278 @@
+"""Watched inbox sources and weighted fair-share dispatch across them.
+
+Each business unit drops files into its own inbox. ``[[input.sources]]``
+entries give every inbox its own directory, pattern, output templates and
+weight; without them the single ``[input].dir`` is the only source.
+Files are dispatched in weighted deficit-round-robin order over one FIFO
+per source, with a file's cost being its prescanned page count, so a bulk
+drop in one inbox shares the workers with the others in proportion to the
+weights instead of running to completion ahead of them.
+
+Between the watcher and the dispatcher, each source's files are queued in a
+``DiskQueue``: a newly found file is appended to the queue and moved into
+the source's ``.queued`` spool directory, so the backlog survives a crash
+and is not held in memory.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from config import settings
+
+CFG = settings()
+
+# Latencies kept per source for percentiles
+_LATENCY_WINDOW = 1024
+# Files queued for dispatch wait here, out of the scanned inbox
+SPOOL_DIR_NAME = ".queued"
+
+
+@dataclass
+class InboxSource:
+    """One watched inbox."""
+
+    name: str
+    dir: Path
+    pattern: str = "*.pdf"
+    weight: float = 1.0
+    output: dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # File keys become request paths, which must not depend on the cwd
+        self.dir = Path(self.dir).resolve()
+
+    @property
+    def spool_dir(self) -> Path:
+        return self.dir / SPOOL_DIR_NAME
+
+    def list_files(self) -> list[InboxFile]:
+        """Files currently matching ``pattern``.
+
+        Their ``arrived_at`` is left unset: a copied or synced file keeps
+        its original mtime, so the arrival time is taken when it is queued.
+        """
+        files = []
+        try:
+            entries = list(os.scandir(self.dir))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            if not fnmatch.fnmatch(entry.name, self.pattern):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # moved away by a finishing job
+            if entry.is_file():
+                files.append(InboxFile(self, entry.name, size_bytes=stat.st_size))
+        return files
+
+
+@dataclass
+class InboxFile:
+    """A file found in a source's inbox."""
+
+    source: InboxSource
+    name: str
+    size_bytes: int = 0
+    arrived_at: float = 0.0
+    pages: int | None = None
+    dispatched_at: float | None = None
+    # Degradation tier chosen at dispatch (None for the base tier)
+    tier: str | None = None
+    # Seconds its parse took, for the job trace
+    parse_s: float | None = None
+    # Seconds it held a worker and spent waiting on a remote parse, when
+    # submitted and polled for (None when it held a worker throughout)
+    held_s: float | None = None
+    poll_s: float | None = None
+    # Epoch time before which a deferred file is not dispatched again
+    not_before: float = 0.0
+    # Set once the file is in the source's work queue and spool directory
+    receipt: Any = None
+
+    @classmethod
+    def from_record(cls, source: InboxSource, record: Mapping[str, Any], receipt: Any) -> InboxFile:
+        return cls(source, record["name"], size_bytes=record["size_bytes"], arrived_at=record["arrived_at"],
+                   pages=record["pages"], not_before=record.get("not_before", 0.0), receipt=receipt)
+
+    def record(self) -> dict[str, Any]:
+        """The work queue entry for this file."""
+        return {"name": self.name, "size_bytes": self.size_bytes, "arrived_at": self.arrived_at, "pages": self.pages,
+                "not_before": self.not_before}
+
+    @property
+    def path(self) -> Path:
+        return (self.source.spool_dir if self.receipt is not None else self.source.dir) / self.name
+
+    @property
+    def key(self) -> str:
+        return str(self.path)
+
+    @property
+    def cost(self) -> float:
+        return float(max(1, self.pages or 1))
+
+
+def inbox_sources(cfg: Mapping[str, Any] | None = None) -> list[InboxSource]:
+    """Build the configured sources; falls back to ``[input].dir`` alone.
+
+    Source entries inherit ``pattern`` and the output file formats from
+    ``[input]`` and ``[output]`` when they do not set their own.
+    """
+    cfg = cfg if cfg is not None else CFG
+    defaults = cfg['input']
+    output = {key: cfg['output'][key] for key in ('jsonl_file_format', 'markdown_file_format')}
+    entries = defaults.get('sources') or [{"name": "default", "dir": defaults['dir']}]
+    sources = []
+    for entry in entries:
+        name = entry.get('name') or Path(entry['dir']).name
+        if any(source.name == name for source in sources):
+            raise ValueError(f"Duplicate inbox source name {name!r}")
+        weight = float(entry.get('weight', 1.0))
+        if weight <= 0:
+            raise ValueError(f"Inbox source {name!r} needs a positive weight, got {weight}")
+        sources.append(InboxSource(
+            name=name,
+            dir=Path(entry['dir']),
+            pattern=entry.get('pattern', defaults.get('pattern', '*.pdf')),
+            weight=weight,
+            output={key: entry.get(key, value) for key, value in output.items()},
+        ))
+    return sources
+
+
+class DeficitRoundRobin:
+    """Weighted deficit round robin over one FIFO queue per source.
+
+    Each time a source comes round it is credited ``weight * quantum`` and
+    dispatches queued items while their cost fits in its credit. A source
+    whose queue empties forfeits what is left, so an idle inbox cannot bank
+    credit for a later burst.
+    """
+
+    def __init__(self, weights: Mapping[str, float], quantum: float = 10.0):
+        if quantum <= 0:
+            raise ValueError(f"quantum must be positive, got {quantum}")
+        self._weights = dict(weights)
+        self._quantum = quantum
+        self._queues: dict[str, deque[tuple[float, Any]]] = {name: deque() for name in self._weights}
+        self._deficit = dict.fromkeys(self._weights, 0.0)
+        self._active: deque[str] = deque()
+        self._credited = False
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def pending(self, source: str) -> int:
+        return len(self._queues[source])
+
+    def push(self, source: str, item: Any, cost: float = 1.0) -> None:
+        q = self._queues[source]
+        if not q:
+            self._active.append(source)
+        q.append((cost, item))
+
+    def pop(self) -> tuple[str, Any] | None:
+        """Return the next ``(source, item)``, or None when every queue is empty."""
+        while self._active:
+            name = self._active[0]
+            q = self._queues[name]
+            if not self._credited:
+                self._deficit[name] += self._weights[name] * self._quantum
+                self._credited = True
+            cost, item = q[0]
+            if cost <= self._deficit[name]:
+                q.popleft()
+                self._deficit[name] -= cost
+                if not q:
+                    self._deficit[name] = 0.0
+                    self._active.popleft()
+                    self._credited = False
+                return name, item
+            self._active.rotate(-1)
+            self._credited = False
+        return None
+
+
+@dataclass
+class _SourceStats:
+    dispatched: int = 0
+    done: int = 0
+    failed: int = 0
+    deferred: int = 0
+    pages: int = 0
+    first_dispatch: float | None = None
+    waits: deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    """The ``fraction`` percentile of ``values`` (nearest rank), rounded to ms; None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+class SourceMetrics:
+    """Per-source throughput and latency.
+
+    Arrival is when the watcher queues the file (its mtime is not used: a
+    copied or synced file keeps its original one). Wait is arrival to
+    dispatch; latency is arrival to the job finishing. Percentiles cover the
+    most recent completions per source.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats: dict[str, _SourceStats] = {}
+
+    def dispatched(self, file: InboxFile) -> None:
+        now = self._clock()
+        file.dispatched_at = now
+        with self._lock:
+            stats = self._stats.setdefault(file.source.name, _SourceStats())
+            stats.dispatched += 1
+            if stats.first_dispatch is None:
+                stats.first_dispatch = now
+            stats.waits.append(max(0.0, now - file.arrived_at))
+
+    def finished(self, file: InboxFile, outcome: str) -> None:
+        """Record ``outcome`` (``done``, ``failed`` or ``deferred``) for ``file``."""
+        now = self._clock()
+        with self._lock:
+            stats = self._stats.setdefault(file.source.name, _SourceStats())
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+            if outcome == "done":
+                stats.pages += file.pages or 0
+                stats.latencies.append(max(0.0, now - file.arrived_at))
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        now = self._clock()
+        with self._lock:
+            report = {}
+            for name, stats in self._stats.items():
+                elapsed = now - stats.first_dispatch if stats.first_dispatch is not None else 0.0
+                report[name] = {
+                    "dispatched": stats.dispatched,
+                    "done": stats.done,
+                    "failed": stats.failed,
+                    "deferred": stats.deferred,
+                    "docs_per_min": round(stats.done * 60 / elapsed, 2) if elapsed > 0 else 0.0,
+                    "pages_per_min": round(stats.pages * 60 / elapsed, 2) if elapsed > 0 else 0.0,
+                    "wait_p50_s": percentile(list(stats.waits), 0.5),
+                    "latency_p50_s": percentile(list(stats.latencies), 0.5),
+                    "latency_p95_s": percentile(list(stats.latencies), 0.95),
+                }
+            return report
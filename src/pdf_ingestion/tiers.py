@@ -0,0 +1,94 @@
+"""Backlog-driven degradation tiers for load shedding.
+
+``premium`` parses with the parser's premium mode, ``standard`` without it
+and ``local`` with the local text extractor (``localtext``), which spends
+no parse quota at all. The base tier is ``premium`` when
+``[llamaparse].premium_mode`` is set and ``standard`` otherwise.
+
+With ``[degradation].enabled`` the watcher picks the tier of each file as
+it dispatches it, from the number of files queued and how long that file
+has waited. A tier is entered as soon as either of its thresholds is
+reached and left once both are back under ``recover_ratio`` of them, so
+the tier does not flap around a threshold. Jobs run below the base tier
+are tagged with their tier in the ledger and in their outputs, and record
+the parse fingerprint of the tier they actually used, so ``reprocess
+--degraded`` re-parses exactly those once the backlog has cleared.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from config import settings
+
+CFG = settings()
+
+PREMIUM = "premium"
+STANDARD = "standard"
+LOCAL = "local"
+
+# Best first
+TIERS = (PREMIUM, STANDARD, LOCAL)
+
+
+def base_tier() -> str:
+    """The tier jobs run at when nothing is shed."""
+    return PREMIUM if CFG['llamaparse'].get('premium_mode', False) else STANDARD
+
+
+def is_degraded(tier: str | None) -> bool:
+    """True if ``tier`` is below the base tier."""
+    return tier is not None and TIERS.index(tier) > TIERS.index(base_tier())
+
+
+@dataclass
+class TierThreshold:
+    """Backlog at which jobs drop to ``tier``; a threshold of 0 is not used."""
+
+    tier: str
+    depth: int = 0
+    age_s: float = 0.0
+
+    def reached(self, depth: int, age_s: float, scale: float = 1.0) -> bool:
+        return bool((self.depth and depth >= self.depth * scale) or (self.age_s and age_s >= self.age_s * scale))
+
+
+class TierPolicy:
+    """Current degradation tier, moved by the backlog seen at each dispatch."""
+
+    def __init__(self, base: str, thresholds: Sequence[TierThreshold], recover_ratio: float = 0.5):
+        self._base = base
+        # Only tiers below the base, in order of degradation
+        self._thresholds = sorted((t for t in thresholds if TIERS.index(t.tier) > TIERS.index(base)),
+                                  key=lambda t: TIERS.index(t.tier))
+        self._recover_ratio = recover_ratio
+        self._level = 0
+
+    @property
+    def tier(self) -> str:
+        return self._thresholds[self._level - 1].tier if self._level else self._base
+
+    def select(self, depth: int, age_s: float) -> str:
+        """Return the tier for a job dispatched with ``depth`` files queued after waiting ``age_s``."""
+        target = 0
+        for level, threshold in enumerate(self._thresholds, start=1):
+            if threshold.reached(depth, age_s):
+                target = level
+        if target > self._level:
+            self._level = target
+        while self._level > target and not self._thresholds[self._level - 1].reached(
+                depth, age_s, self._recover_ratio):
+            self._level -= 1
+        return self.tier
+
+
+def tier_policy() -> TierPolicy | None:
+    """Return a policy configured by ``[degradation]``, or None when it is disabled."""
+    degradation = CFG.get('degradation', {})
+    if not degradation.get('enabled', False):
+        return None
+    thresholds = [TierThreshold(tier, depth=degradation.get(f'{tier}_depth', 0),
+                                age_s=degradation.get(f'{tier}_age_s', 0.0))
+                  for tier in (STANDARD, LOCAL)]
+    return TierPolicy(base_tier(), thresholds, recover_ratio=degradation.get('recover_ratio', 0.5))
@@ -0,0 +1,205 @@
+"""Job traces for capacity planning, and offline replay of them.
+
+With ``[trace].enabled`` the watcher appends one JSON line per finished
+inbox job to ``[trace].dir/trace-YYYYMMDD.jsonl``: when the file arrived,
+when it was dispatched and finished, its size and page count, how long its
+parse took and the outcome. A job submitted to the parser and polled for
+also records how long it held a worker (``held_s``) apart from the time
+spent waiting on the remote parse (``poll_s``), when it held none.
+
+``replay`` feeds recorded traces through a ``Dispatcher`` configured with
+the worker count and byte budget under test. Files arrive with their
+recorded spacing, divided by ``speed`` to compress the time, and each job
+holds its worker only for its recorded worker time: dispatch to finish
+with the parse part spent in a stand-in parser, or for a polled job its
+``held_s``, after which it finishes ``poll_s`` later without a worker.
+Waits and the makespan are reported in recorded time, so a day of
+arrivals replayed at ``speed=60`` takes 24 minutes and answers how many
+workers keep waits down.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, fields
+from datetime import UTC, datetime
+from pathlib import Path
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.dispatcher import Dispatcher
+from pdf_ingestion.sources import percentile
+
+CFG = settings()
+
+_TRACE_FILE_FORMAT = "trace-{date}.jsonl"
+
+
+@dataclass
+class TraceRecord:
+    """One finished job. Times are epoch seconds."""
+
+    name: str
+    source: str
+    arrived_at: float
+    dispatched_at: float
+    finished_at: float
+    size_bytes: int = 0
+    pages: int | None = None
+    parse_s: float | None = None
+    outcome: str = "done"
+    tier: str | None = None
+    held_s: float | None = None
+    poll_s: float | None = None
+
+    @property
+    def wait_s(self) -> float:
+        return max(0.0, self.dispatched_at - self.arrived_at)
+
+    @property
+    def service_s(self) -> float:
+        return max(0.0, self.finished_at - self.dispatched_at)
+
+    @property
+    def worker_s(self) -> float:
+        """Seconds the job held a worker: its service time less any poll wait."""
+        if self.held_s is not None:
+            return self.held_s
+        return max(0.0, self.service_s - (self.poll_s or 0.0))
+
+
+class TraceRecorder:
+    """Appends trace records to one JSONL file per UTC day under ``root``."""
+
+    def __init__(self, root: Path):
+        self._root = root
+        self._lock = threading.Lock()
+
+    def path(self, when: float) -> Path:
+        date = datetime.fromtimestamp(when, UTC).strftime("%Y%m%d")
+        return self._root / _TRACE_FILE_FORMAT.format(date=date)
+
+    def record(self, record: TraceRecord) -> None:
+        line = json.dumps(asdict(record), separators=(",", ":")) + "\n"
+        path = self.path(record.finished_at)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+def read_traces(paths: Iterable[Path]) -> list[TraceRecord]:
+    """Load trace records from JSONL files, in arrival order; unreadable lines are skipped."""
+    known = {f.name for f in fields(TraceRecord)}
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    raw = json.loads(line)
+                    records.append(TraceRecord(**{k: v for k, v in raw.items() if k in known}))
+                except (ValueError, TypeError):
+                    continue  # a line torn by a crash
+    return sorted(records, key=lambda record: record.arrived_at)
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of replaying a trace, in recorded (uncompressed) seconds."""
+
+    jobs: int
+    workers: int
+    makespan_s: float
+    wait_p50_s: float | None
+    wait_p95_s: float | None
+    wait_max_s: float | None
+    utilization: float
+
+    @property
+    def jobs_per_hour(self) -> float:
+        return self.jobs * 3600 / self.makespan_s if self.makespan_s else 0.0
+
+
+class StandInParser:
+    """Reproduces a recorded parse latency instead of calling the parser."""
+
+    def __init__(self, speed: float = 1.0):
+        self._speed = speed
+
+    def parse(self, record: TraceRecord) -> None:
+        time.sleep((record.parse_s or 0.0) / self._speed)
+
+
+def replay(
+    records: list[TraceRecord],
+    max_workers: int,
+    speed: float = 1.0,
+    max_inflight_bytes: int = 0,
+    memory_multiplier: float = 1.0,
+) -> ReplayResult:
+    """Replay ``records`` (in arrival order) through a dispatcher with ``max_workers``."""
+    if not records:
+        return ReplayResult(0, max_workers, 0.0, None, None, None, 0.0)
+    dispatcher = Dispatcher(max_workers=max_workers, max_inflight_bytes=max_inflight_bytes,
+                            memory_multiplier=memory_multiplier)
+    parser = StandInParser(speed)
+    first = records[0].arrived_at
+    waits: list[float] = []
+    lock = threading.Lock()
+
+    def job(record: TraceRecord, arrival: float) -> float:
+        started = time.monotonic()
+        with lock:
+            waits.append((started - arrival) * speed)
+        if record.poll_s is None:
+            parser.parse(record)
+            time.sleep(max(0.0, record.worker_s - (record.parse_s or 0.0)) / speed)
+            return time.monotonic()
+        # Parsed remotely: the worker is held for the submit and finish work
+        # only, and the job completes once the poll wait has passed as well
+        time.sleep(record.worker_s / speed)
+        return time.monotonic() + record.poll_s / speed
+
+    start = time.monotonic()
+    futures = []
+    for record in records:
+        arrival = start + (record.arrived_at - first) / speed
+        delay = arrival - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        # Blocks while every worker is busy, as the watcher's dispatch does
+        futures.append(dispatcher.submit(job, record.size_bytes, record, arrival))
+    finished = max(future.result() for future in futures)
+    dispatcher.shutdown(wait=True)
+
+    makespan = (finished - start) * speed
+    busy = sum(record.worker_s for record in records)
+    return ReplayResult(
+        jobs=len(records),
+        workers=max_workers,
+        makespan_s=round(makespan, 3),
+        wait_p50_s=percentile(waits, 0.5),
+        wait_p95_s=percentile(waits, 0.95),
+        wait_max_s=round(max(waits), 3),
+        utilization=round(busy / (max_workers * makespan), 3) if makespan else 0.0,
+    )
+
+
+_RECORDER: TraceRecorder | None = None
+_RECORDER_LOCK = threading.Lock()
+singletons.register(__name__, "_RECORDER")
+
+
+def trace_recorder() -> TraceRecorder | None:
+    """Return the process-wide trace recorder, or None unless ``[trace].enabled``."""
+    global _RECORDER
+    trace = CFG.get('trace', {})
+    if not trace.get('enabled', False):
+        return None
+    with _RECORDER_LOCK:
+        if _RECORDER is None:
+            _RECORDER = TraceRecorder(Path(trace.get('dir', Path(CFG['state']['dir']) / "traces")))
+        return _RECORDER
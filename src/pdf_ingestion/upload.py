@@ -0,0 +1,109 @@
+"""Bounded-memory file objects for streaming uploads to the parser."""
+
+from __future__ import annotations
+
+import io
+import mmap
+from pathlib import Path
+
+# Default upper bound on bytes returned by a single read()
+DEFAULT_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class MappedUploadStream(io.BufferedIOBase):
+    """Read-only, memory-mapped view of a file for multipart uploads.
+
+    Each ``read(n)`` returns at most ``chunk_size`` bytes, and pages that have
+    already been read are released from the process with ``MADV_DONTNEED``,
+    so resident memory stays around one chunk per upload no matter how large
+    the file is. httpx's multipart encoder reads file objects in fixed-size
+    chunks and rewinds with ``seek(0)`` on retry, both of which are supported.
+    ``read()`` with no size still returns the whole remainder, as the
+    ``io`` contract requires, and is the only unbounded call.
+    """
+
+    def __init__(self, path: Path, chunk_size: int = DEFAULT_UPLOAD_CHUNK_SIZE):
+        super().__init__()
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.name = str(path)
+        self._chunk_size = chunk_size
+        self._file = open(path, "rb")
+        self._size = self._file.seek(0, io.SEEK_END)
+        self._map: mmap.mmap | None = None
+        if self._size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                self._map.madvise(mmap.MADV_SEQUENTIAL)
+        self._pos = 0
+        self._released = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def tell(self) -> int:
+        self._check_open()
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._check_open()
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("Negative seek position")
+        self._pos = pos
+        # Rewinding (e.g. an upload retry) re-faults pages in on demand
+        self._released = min(self._released, pos - pos % mmap.PAGESIZE)
+        return pos
+
+    def read(self, size: int | None = -1) -> bytes:
+        self._check_open()
+        if self._map is None or self._pos >= self._size:
+            return b""
+        end = self._size if size is None or size < 0 else min(self._pos + min(size, self._chunk_size), self._size)
+        data = self._map[self._pos : end]
+        self._pos = end
+        self._release_consumed()
+        return data
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size if size >= 0 else self._chunk_size)
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:  # type: ignore[override]
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def _release_consumed(self) -> None:
+        if self._map is None or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        boundary = self._pos - self._pos % mmap.PAGESIZE
+        if boundary > self._released:
+            self._map.madvise(mmap.MADV_DONTNEED, self._released, boundary - self._released)
+            self._released = boundary
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+    def close(self) -> None:
+        if not self.closed:
+            if self._map is not None:
+                self._map.close()
+            self._file.close()
+        super().close()
@@ -0,0 +1,293 @@
+"""Recycled worker processes for parser calls.
+
+The third-party parsing client leaks memory over a long run, and the watch
+daemon never exits. With ``[workers].processes`` set, parser calls run in a
+pool of worker processes instead of the calling thread. Workers are forked
+from a forkserver that has already imported the pipeline and loaded the
+config (``preload``), so a new worker is ready in milliseconds and is not
+forked from the multithreaded daemon itself.
+
+A worker is replaced after ``max_jobs`` calls or once its resident memory
+passes ``max_rss_bytes`` at the end of a call. Replacement happens between
+calls: the worker finishes the call it is running, its replacement is
+started before it exits, and the caller never sees the swap. A worker that
+dies during a call raises ``WorkerLost`` in the caller and is replaced.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import pickle
+import resource
+import sys
+import threading
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from multiprocessing import forkserver
+from pathlib import Path
+from typing import Any
+
+from llama_index.core.async_utils import asyncio_run
+from llama_parse import LlamaParse
+
+from config import settings
+from pdf_ingestion import singletons
+from pdf_ingestion.breaker import is_outage, is_parser_reply
+from pdf_ingestion.errors import ParserRejected, ParserUnavailable, PdfIngestionError, WorkerLost
+from pdf_ingestion.upload import MappedUploadStream
+
+CFG = settings()
+
+PARSE = "parse"
+SUBMIT = "submit"
+
+# Seconds a retired worker gets to exit before it is killed
+_EXIT_TIMEOUT_S = 5.0
+
+
+def rss_bytes() -> int:
+    """Resident memory of this process (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _start_forkserver() -> None:
+    # The forkserver is started with a bare sys.path on some Python versions,
+    # and a preload it cannot import is skipped silently; hand it our path
+    previous = os.environ.get("PYTHONPATH")
+    os.environ["PYTHONPATH"] = os.pathsep.join(entry for entry in sys.path if entry)
+    try:
+        forkserver.ensure_running()
+    finally:
+        if previous is None:
+            del os.environ["PYTHONPATH"]
+        else:
+            os.environ["PYTHONPATH"] = previous
+
+
+def _portable(error: BaseException) -> BaseException:
+    # Exceptions cross back to the parent pickled; httpx errors that need
+    # their request/response to be rebuilt do not survive that
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return PdfIngestionError(f"{type(error).__name__}: {error}")
+
+
+def _serve(conn, initializer: Callable[..., None] | None, initargs: tuple) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, _portable(e))
+        conn.send((*reply, rss_bytes()))
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Any
+    jobs: int = 0
+
+
+class WorkerPool:
+    """Fixed number of worker processes running ``call``s one at a time each."""
+
+    def __init__(
+        self,
+        processes: int,
+        max_jobs: int = 0,
+        max_rss_bytes: int = 0,
+        initializer: Callable[..., None] | None = None,
+        initargs: tuple = (),
+        preload: Sequence[str] = (),
+        start_method: str = "forkserver",
+    ):
+        if processes <= 0:
+            raise ValueError(f"processes must be positive, got {processes}")
+        self._ctx = multiprocessing.get_context(start_method)
+        if preload and start_method == "forkserver":
+            self._ctx.set_forkserver_preload(list(preload))
+            _start_forkserver()
+        self._max_jobs = max_jobs
+        self._max_rss_bytes = max_rss_bytes
+        self._initializer = initializer
+        self._initargs = initargs
+        self._cond = threading.Condition()
+        self._closed = False
+        self.recycled = 0
+        # Prewarm every worker so the first jobs do not wait for a start
+        self._idle = [self._spawn() for _ in range(processes)]
+
+    def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` in a worker and return its result or raise its exception.
+
+        ``fn`` and ``args`` must be picklable; ``fn`` is imported by name in
+        the worker. Blocks while every worker is busy.
+        """
+        worker = self._acquire()
+        try:
+            worker.conn.send((fn, args))
+            ok, value, rss = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            self._replace(worker)
+            raise WorkerLost(f"Worker process {worker.process.pid} exited during {fn.__name__}") from e
+        except BaseException:
+            # Interrupted mid-call; the worker's reply can no longer be matched up
+            self._replace(worker)
+            raise
+        worker.jobs += 1
+        if (self._max_jobs and worker.jobs >= self._max_jobs) or (self._max_rss_bytes and rss > self._max_rss_bytes):
+            self._replace(worker)
+            with self._cond:
+                self.recycled += 1
+        else:
+            self._release(worker)
+        if not ok:
+            raise value
+        return value
+
+    @property
+    def pids(self) -> list[int]:
+        """Process ids of the idle workers."""
+        with self._cond:
+            return [worker.process.pid for worker in self._idle]
+
+    def close(self) -> None:
+        """Stop idle workers now and busy ones when their call returns."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for worker in idle:
+            self._retire(worker)
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_serve, args=(child_conn, self._initializer, self._initargs),
+                                    name="parse-worker", daemon=True)
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            self._cond.wait_for(lambda: self._idle or self._closed)
+            if self._closed:
+                raise RuntimeError("Worker pool is closed")
+            return self._idle.pop()
+
+    def _release(self, worker: _Worker) -> None:
+        with self._cond:
+            if not self._closed:
+                self._idle.append(worker)
+                self._cond.notify()
+                return
+        self._retire(worker)
+
+    def _replace(self, worker: _Worker) -> None:
+        # The replacement starts before the old worker goes, so capacity never drops
+        with self._cond:
+            closed = self._closed
+        replacement = None if closed else self._spawn()
+        if replacement is not None:
+            with self._cond:
+                if not self._closed:
+                    self._idle.append(replacement)
+                    self._cond.notify()
+                    replacement = None
+        self._retire(worker)
+        if replacement is not None:
+            self._retire(replacement)
+
+    @staticmethod
+    def _retire(worker: _Worker) -> None:
+        try:
+            worker.conn.send(None)
+        except OSError:
+            pass
+        worker.conn.close()
+        worker.process.join(_EXIT_TIMEOUT_S)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+
+
+def run_parser(parser: LlamaParse, method: str, stream: MappedUploadStream, file_name: str) -> Any:
+    """Parse ``stream`` (``PARSE``) or only upload it and return the job id (``SUBMIT``)."""
+    if method == SUBMIT:
+        return asyncio_run(parser._create_job(stream, extra_info={"file_name": file_name}))
+    return parser.get_json_result(stream, extra_info={"file_name": file_name})
+
+
+_WORKER_PARSER: LlamaParse | None = None
+
+
+def _init_parse_worker(options: dict[str, Any]) -> None:
+    global _WORKER_PARSER
+    _WORKER_PARSER = LlamaParse(**options)
+
+
+def parse_in_worker(method: str, pdf_path: str, target_pages: list[int] | None, chunk_size: int,
+                    premium_mode: bool | None = None) -> Any:
+    """``run_parser`` with the worker's own parser; outages come back as ``ParserUnavailable``.
+
+    ``premium_mode`` overrides the configured mode for this call (degraded jobs).
+    """
+    configured = _WORKER_PARSER.premium_mode
+    _WORKER_PARSER.target_pages = ",".join(map(str, target_pages)) if target_pages else None
+    if premium_mode is not None:
+        _WORKER_PARSER.premium_mode = premium_mode
+    try:
+        with MappedUploadStream(Path(pdf_path), chunk_size=chunk_size) as stream:
+            return run_parser(_WORKER_PARSER, method, stream, Path(pdf_path).name)
+    except Exception as e:
+        if is_outage(e):
+            raise ParserUnavailable(str(e)) from None
+        if is_parser_reply(e):
+            # The parser's own exception may not survive the trip back
+            raise ParserRejected(str(e)) from None
+        raise
+    finally:
+        _WORKER_PARSER.target_pages = None
+        _WORKER_PARSER.premium_mode = configured
+
+
+_POOL: WorkerPool | None = None
+_POOL_LOCK = threading.Lock()
+singletons.register(__name__, "_POOL", WorkerPool.close)
+
+
+def parser_pool() -> WorkerPool | None:
+    """Return the process-wide parser worker pool, or None when ``[workers].processes`` is 0."""
+    global _POOL
+    workers = CFG.get('workers', {})
+    if not workers.get('processes', 0):
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            llamaparse = CFG['llamaparse']
+            _POOL = WorkerPool(
+                processes=workers['processes'],
+                max_jobs=workers.get('max_jobs_per_worker', 0),
+                max_rss_bytes=workers.get('max_rss_bytes', 0),
+                initializer=_init_parse_worker,
+                initargs=({"verbose": llamaparse['verbose'], "premium_mode": llamaparse['premium_mode'],
+                           "ignore_errors": False},),
+                preload=["pdf_ingestion.ingest"])
+        return _POOL
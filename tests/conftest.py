@@ -2,7 +2,7 @@
 
 import logging
 import tempfile
-from collections.abc import Generator
+from collections.abc import Callable, Generator
 from pathlib import Path
 
 import pytest
@@ -48,6 +48,29 @@ def sample_pdf(temp_dir: Path) -> Path:
     return pdf_path
 
 
+@pytest.fixture
+def raw_pdf() -> Callable[[Path, list[bytes]], Path]:
+    """Return a writer of hand-built PDFs, for structures reportlab never produces."""
+
+    def write(path: Path, objects: list[bytes]) -> Path:
+        """Write ``objects`` as numbered objects 1..n with a classic xref table."""
+        out = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for num, data in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n" % num + data + b"\nendobj\n"
+        xref_at = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for offset in offsets:
+            out += b"%010d 00000 n \n" % offset
+        out += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+        out += b"startxref\n%d\n%%%%EOF\n" % xref_at
+        path.write_bytes(bytes(out))
+        return path
+
+    return write
+
+
 @pytest.fixture
 def sample_pdf_with_metadata(temp_dir: Path) -> Path:
     """Create a sample PDF with metadata."""
@@ -86,3 +109,41 @@ def pdf_directory(temp_dir: Path) -> Path:
         c.save()
 
     return pdf_dir
+
+
+@pytest.fixture
+def pipeline_config(temp_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[dict, None, None]:
+    """Point every pipeline directory in the live settings at a temp tree."""
+    import sys
+
+    from config import settings
+    from pdf_ingestion.singletons import reset_singletons
+
+    cfg = settings()
+    for section, key, relative in [
+        ("input", "dir", "inbox"),
+        ("output", "jsonl_dir", "outputs/jsonl"),
+        ("output", "markdown_dir", "outputs/markdown"),
+        ("output", "jsonl_file_format", "outputs/jsonl/{stem}-{cuid}.jsonl"),
+        ("output", "markdown_file_format", "outputs/markdown/{stem}-{cuid}.md"),
+        ("processed", "dir", "processed"),
+        ("quarantine", "dir", "quarantine"),
+        ("state", "dir", "state"),
+        ("runs", "dir", "runs"),
+        ("logging", "dir", "logs"),
+        ("job", "job_file", "job.csv"),
+    ]:
+        monkeypatch.setitem(cfg[section], key, str(temp_dir / relative))
+    monkeypatch.setitem(cfg["logging"], "console", False)
+
+    # Modules capture settings() at import time; make them all see this dict
+    for name in list(sys.modules):
+        module = sys.modules[name]
+        if name.startswith(("pdf_ingestion", "cli")) and isinstance(getattr(module, "CFG", None), dict):
+            monkeypatch.setattr(module, "CFG", cfg)
+    # Shared instances built from the previous test's settings go first
+    reset_singletons()
+    (temp_dir / "inbox").mkdir()
+    yield cfg
+    # Close the ledger, index, feed, sink and pools this test opened
+    reset_singletons()
@@ -0,0 +1,45 @@
+"""Tests for the stage microbenchmarks."""
+
+import logging
+
+import pytest
+
+from pdf_ingestion.bench import CASES, compare, load_baseline, run_benchmarks, save_baseline, synthetic_pages
+
+
+class TestSyntheticCorpus:
+    """Test cases for synthetic_pages."""
+
+    def test_corpus_is_fixed(self):
+        """Test the same seed always yields the same pages, with the shapes the stages handle."""
+        pages = synthetic_pages(20)
+        assert pages == synthetic_pages(20) and pages != synthetic_pages(20, seed=1)
+        text = "\n".join(pages)
+        assert "\n## " in text and "\n| --- |" in text and "\n- " in text
+
+
+class TestRunBenchmarks:
+    """Test cases for run_benchmarks."""
+
+    def test_every_case_runs(self):
+        """Test each case is timed and the bench logger is torn down afterwards."""
+        results = run_benchmarks(repeat=1, min_time=0)
+        assert list(results) == list(CASES) and all(seconds > 0 for seconds in results.values())
+        assert not logging.getLogger("pdf_ingestion.bench").handlers
+
+    def test_unknown_case(self):
+        """Test an unknown case name is rejected before anything runs."""
+        with pytest.raises(ValueError, match="nope"):
+            run_benchmarks(["nope"])
+
+
+class TestCompare:
+    """Test cases for baselines and compare."""
+
+    def test_regression_beyond_tolerance(self, temp_dir):
+        """Test only cases slower than the baseline by more than the tolerance are reported."""
+        path = temp_dir / "baseline.json"
+        save_baseline(path, {"a": 1.0, "b": 1.0, "c": 1.0})
+        baseline = load_baseline(path)
+        (regression,) = compare({"a": 1.2, "b": 1.3, "c": 0.5, "new": 9.0}, baseline, tolerance=0.25)
+        assert regression.name == "b" and regression.ratio == pytest.approx(1.3)
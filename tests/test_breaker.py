@@ -0,0 +1,104 @@
+"""Tests for the parser circuit breaker."""
+
+import httpx
+
+from pdf_ingestion.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, is_outage, is_parser_reply
+from pdf_ingestion.errors import ParserRejected
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Test cases for CircuitBreaker."""
+
+    def test_opens_after_threshold_and_probes_after_timeout(self):
+        """Test the closed -> open -> half-open -> closed cycle."""
+        clock = _Clock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=30, clock=clock)
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.retry_after() == 30
+
+        clock.now = 30
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()  # one probe at a time
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        """Test an outage during half-open re-opens the circuit for a full timeout."""
+        clock = _Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.now = 19
+        assert not breaker.allow()
+
+    def test_released_probe_lets_another_through(self):
+        """Test a probe released without an outcome frees its half-open slot."""
+        clock = _Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow() and not breaker.allow()
+        breaker.release_probe()
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+
+    def test_success_resets_failure_count(self):
+        """Test only consecutive failures open the circuit."""
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_is_outage(self):
+        """Test transport errors, 5xx and 429 are outages but rejections are not."""
+        request = httpx.Request("POST", "https://parser.test/upload")
+
+        def status_error(code):
+            return httpx.HTTPStatusError("", request=request, response=httpx.Response(code, request=request))
+
+        assert is_outage(httpx.ConnectError("refused"))
+        assert is_outage(status_error(503))
+        assert is_outage(status_error(429))
+        assert not is_outage(status_error(400))
+        try:
+            try:
+                raise httpx.ReadTimeout("slow")
+            except httpx.ReadTimeout as e:
+                raise Exception("Failed to parse the file") from e
+        except Exception as wrapped:
+            assert is_outage(wrapped)
+        assert not is_outage(ValueError("bad document"))
+
+    def test_is_parser_reply(self):
+        """Test any error response from the parser counts as a reply but local errors do not."""
+        request = httpx.Request("POST", "https://parser.test/upload")
+        rejected = httpx.HTTPStatusError("", request=request, response=httpx.Response(400, request=request))
+        assert is_parser_reply(rejected)
+        assert is_parser_reply(ParserRejected("bad document"))
+        try:
+            try:
+                raise rejected
+            except httpx.HTTPStatusError as e:
+                raise Exception("Failed to parse the file") from e
+        except Exception as wrapped:
+            assert is_parser_reply(wrapped)
+        assert not is_parser_reply(OSError("cannot map file"))
+        assert not is_parser_reply(httpx.ConnectError("refused"))
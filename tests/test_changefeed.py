@@ -0,0 +1,91 @@
+"""Tests for the change feed of committed jobs."""
+
+import shutil
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from pdf_ingestion.changefeed import ChangeFeed, FeedOffset, change_feed, feed_dir, read_feed
+from pdf_ingestion.ingest import ingest
+from pdf_ingestion.models import PdfIngestionRequest
+
+
+class TestChangeFeed:
+    """Test cases for ChangeFeed and read_feed."""
+
+    def test_tail_from_offset(self, temp_dir):
+        """Test a reader resumes after its offset and sees only the newer records."""
+        feed = ChangeFeed(temp_dir)
+        for n in range(3):
+            feed.append({"job_id": f"job{n}"})
+        records, offset = read_feed(temp_dir)
+        assert [r["seq"] for r in records] == [1, 2, 3]
+
+        feed.append({"job_id": "job3"})
+        records, offset = read_feed(temp_dir, FeedOffset.parse(str(offset)))
+        assert [r["job_id"] for r in records] == ["job3"]
+        assert read_feed(temp_dir, offset) == ([], offset)
+
+    def test_rotation_and_limit(self, temp_dir):
+        """Test records continue across segments in order, a page at a time."""
+        feed = ChangeFeed(temp_dir, segment_bytes=64)
+        for n in range(10):
+            feed.append({"job_id": f"job{n}"})
+        assert len(list(temp_dir.glob("*.jsonl"))) > 1
+        seen, offset = [], None
+        while True:
+            records, offset = read_feed(temp_dir, offset, limit=3)
+            if not records:
+                break
+            seen += [r["seq"] for r in records]
+        assert seen == list(range(1, 11))
+
+    def test_kept_segments_leave_a_visible_gap(self, temp_dir):
+        """Test a reader behind the retained segments resumes at the oldest one left."""
+        feed = ChangeFeed(temp_dir, segment_bytes=64, keep_segments=2)
+        feed.append({"job_id": "first"})
+        _, offset = read_feed(temp_dir)
+        for n in range(10):
+            feed.append({"job_id": f"job{n}"})
+        records, _ = read_feed(temp_dir, offset)
+        assert len(list(temp_dir.glob("*.jsonl"))) == 2
+        assert records[0]["seq"] > 2 and records[-1]["seq"] == 11
+
+    def test_reopen_continues_sequence_and_cuts_torn_line(self, temp_dir):
+        """Test a torn last line is dropped on reopen and numbering carries on."""
+        feed = ChangeFeed(temp_dir)
+        feed.append({"job_id": "a"})
+        feed.append({"job_id": "b"})
+        feed.close()
+        (segment,) = temp_dir.glob("*.jsonl")
+        with open(segment, "ab") as f:
+            f.write(b'{"seq":3,"job_')
+        assert [r["seq"] for r in read_feed(temp_dir)[0]] == [1, 2]
+
+        feed = ChangeFeed(temp_dir)
+        assert feed.append({"job_id": "c"}) == 3
+        assert [r["job_id"] for r in read_feed(temp_dir)[0]] == ["a", "b", "c"]
+
+
+class TestIngestCommit:
+    """Test cases for the feed record written by ingest."""
+
+    def test_committed_job_is_appended(self, pipeline_config, sample_pdf):
+        """Test a finished job appends its id, hash and output sizes after the outputs exist."""
+        shutil.copy(sample_pdf, Path(pipeline_config["input"]["dir"]) / "a.pdf")
+        req = PdfIngestionRequest(
+            PdfInput="a.pdf",
+            JsonOutput=pipeline_config["output"]["jsonl_file_format"].format(stem="a.pdf", cuid="run1"),
+            MarkdownOutput=pipeline_config["output"]["markdown_file_format"].format(stem="a.pdf", cuid="run1"),
+        )
+        parser = Mock()
+        parser.get_json_result.return_value = [{"job_id": "j", "pages": [{"md": "One"}, {"md": "Two"}]}]
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser), \
+                patch("pdf_ingestion.ingest.parser_pool", return_value=None):
+            ingest("run1").run(req)
+
+        (record,), _ = read_feed(feed_dir())
+        assert record["seq"] == 1 and record["job_id"] == "run1" and record["file_name"] == "a.pdf"
+        assert len(record["sha256"]) == 64
+        assert record["outputs"]["json"] == {"path": req.JsonOutput, "bytes": Path(req.JsonOutput).stat().st_size}
+        assert record["outputs"]["markdown"]["bytes"] == Path(req.MarkdownOutput).stat().st_size
+        assert change_feed().seq == 1
@@ -0,0 +1,121 @@
+"""Tests for the segmented on-disk work queue."""
+
+import threading
+
+from pdf_ingestion.diskqueue import DiskQueue
+
+
+def _drain(queue):
+    entries = []
+    while (entry := queue.get()) is not None:
+        entries.append(entry)
+    return entries
+
+
+class TestDiskQueue:
+    """Test cases for DiskQueue."""
+
+    def test_fifo_put_get_ack(self, temp_dir):
+        """Test items come back in order and are acknowledged once done."""
+        queue = DiskQueue(temp_dir / "q")
+        for n in range(5):
+            queue.put({"n": n})
+        assert len(queue) == 5
+        entries = _drain(queue)
+        assert [item["n"] for _, item in entries] == [0, 1, 2, 3, 4]
+        assert len(queue) == 0 and queue.unacked == 5
+        for receipt, _ in entries:
+            queue.ack(receipt)
+        assert queue.unacked == 0
+        assert queue.get() is None
+        queue.close()
+
+    def test_unacked_items_are_redelivered_after_restart(self, temp_dir):
+        """Test a restart resumes at the first unacknowledged item."""
+        queue = DiskQueue(temp_dir / "q")
+        for n in range(4):
+            queue.put(n)
+        entries = _drain(queue)
+        queue.ack(entries[0][0])
+        queue.ack(entries[2][0])
+        queue.close()
+
+        reopened = DiskQueue(temp_dir / "q")
+        assert len(reopened) == 3
+        assert [item for _, item in _drain(reopened)] == [1, 2, 3]
+        reopened.close()
+
+    def test_cursor_advances_past_out_of_order_acks(self, temp_dir):
+        """Test the ack cursor moves over contiguous acknowledged items only."""
+        queue = DiskQueue(temp_dir / "q")
+        for n in range(3):
+            queue.put(n)
+        entries = _drain(queue)
+        queue.ack(entries[2][0])
+        queue.ack(entries[1][0])
+        assert queue.unacked == 3
+        queue.ack(entries[0][0])
+        assert queue.unacked == 0
+        queue.close()
+        reopened = DiskQueue(temp_dir / "q")
+        assert len(reopened) == 0
+        reopened.close()
+
+    def test_segments_roll_over_and_are_reclaimed(self, temp_dir):
+        """Test full segments are deleted once the cursor passes them."""
+        root = temp_dir / "q"
+        queue = DiskQueue(root, segment_bytes=64)
+        for n in range(20):
+            queue.put({"name": f"file-{n:03d}.pdf"})
+        assert len(list(root.glob("*.seg"))) > 3
+        entries = _drain(queue)
+        assert [item["name"] for _, item in entries] == [f"file-{n:03d}.pdf" for n in range(20)]
+        for receipt, _ in entries:
+            queue.ack(receipt)
+        assert len(list(root.glob("*.seg"))) == 1
+        queue.put({"name": "late.pdf"})
+        assert queue.get()[1] == {"name": "late.pdf"}
+        queue.close()
+
+    def test_torn_tail_record_is_dropped(self, temp_dir):
+        """Test a record cut short by a crash is truncated away on open."""
+        root = temp_dir / "q"
+        queue = DiskQueue(root)
+        queue.put("a")
+        queue.put("b")
+        queue.close()
+        (segment,) = root.glob("*.seg")
+        segment.write_bytes(segment.read_bytes()[:-2])
+
+        reopened = DiskQueue(root)
+        assert len(reopened) == 1
+        reopened.put("c")
+        assert [item for _, item in _drain(reopened)] == ["a", "c"]
+        reopened.close()
+
+    def test_concurrent_producers_and_consumers(self, temp_dir):
+        """Test items put from several threads are each delivered exactly once."""
+        queue = DiskQueue(temp_dir / "q", segment_bytes=256)
+        seen = []
+        seen_lock = threading.Lock()
+
+        def produce(base):
+            for n in range(200):
+                queue.put(base + n)
+
+        def consume():
+            while (entry := queue.get(timeout=1)) is not None:
+                receipt, item = entry
+                with seen_lock:
+                    seen.append(item)
+                queue.ack(receipt)
+
+        threads = [threading.Thread(target=produce, args=(base,)) for base in (0, 1000, 2000)]
+        threads += [threading.Thread(target=consume) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(seen) == sorted(base + n for base in (0, 1000, 2000) for n in range(200))
+        assert queue.unacked == 0
+        queue.close()
@@ -0,0 +1,91 @@
+"""Tests for the job dispatcher and byte budget."""
+
+import threading
+import time
+
+from pdf_ingestion.dispatcher import ByteBudget, Dispatcher
+
+
+class TestByteBudget:
+    """Test cases for ByteBudget."""
+
+    def test_blocks_when_budget_exhausted(self):
+        """Test acquire times out while the budget is full and succeeds after release."""
+        budget = ByteBudget(100)
+        assert budget.acquire(60)
+        assert not budget.acquire(60, timeout=0.05)
+        budget.release(60)
+        assert budget.acquire(60, timeout=0.05)
+        assert budget.in_flight_bytes == 60
+
+    def test_oversized_job_runs_alone(self):
+        """Test a job larger than the budget is admitted when nothing is in flight."""
+        budget = ByteBudget(100)
+        assert budget.acquire(500)
+        assert not budget.acquire(1, timeout=0.05)
+        budget.release(500)
+        assert budget.in_flight_bytes == 0
+
+    def test_zero_limit_is_unbounded(self):
+        """Test a zero limit never blocks."""
+        budget = ByteBudget(0)
+        assert budget.acquire(10**12)
+        assert budget.acquire(10**12, timeout=0)
+
+
+class TestDispatcher:
+    """Test cases for Dispatcher."""
+
+    def test_in_flight_bytes_never_exceed_budget(self):
+        """Test concurrent jobs stay within the byte budget."""
+        dispatcher = Dispatcher(max_workers=10, max_inflight_bytes=300, memory_multiplier=3.0)
+        peak = 0
+        lock = threading.Lock()
+
+        def job():
+            nonlocal peak
+            with lock:
+                peak = max(peak, dispatcher.budget.in_flight_bytes)
+            time.sleep(0.01)
+
+        futures = [dispatcher.submit(job, 50) for _ in range(20)]
+        for future in futures:
+            future.result()
+        dispatcher.shutdown()
+        assert 0 < peak <= 300
+        assert dispatcher.budget.in_flight_bytes == 0
+
+    def test_worker_slots_bound_concurrency(self):
+        """Test no more than max_workers jobs run at once."""
+        dispatcher = Dispatcher(max_workers=2)
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def job():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+        futures = [dispatcher.submit(job, 0) for _ in range(8)]
+        for future in futures:
+            future.result()
+        dispatcher.shutdown()
+        assert peak == 2
+
+    def test_failed_job_releases_budget(self):
+        """Test a job that raises still releases its reservation."""
+        dispatcher = Dispatcher(max_workers=1, max_inflight_bytes=10)
+
+        def boom():
+            raise RuntimeError("boom")
+
+        future = dispatcher.submit(boom, 10)
+        assert isinstance(future.exception(), RuntimeError)
+        dispatcher.submit(lambda: None, 10).result()
+        dispatcher.shutdown()
+        assert dispatcher.budget.in_flight_bytes == 0
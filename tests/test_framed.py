@@ -0,0 +1,70 @@
+"""Tests for the compressed, seekable framed output format."""
+
+import gzip
+
+import pytest
+
+from pdf_ingestion.framed import framed_path, index_path, read_index, read_page, write_framed
+
+
+def _pages(count):
+    return [f'{{"page": {n}, "markdown": "text of page {n}"}}\n'.encode() for n in range(1, count + 1)]
+
+
+class TestFramedOutput:
+    """Test cases for write_framed and read_page."""
+
+    def test_gzip_roundtrip_and_random_access(self, temp_dir):
+        """Test any page can be read back alone and the file is plain gzip."""
+        pages = _pages(37)
+        path, size = write_framed(temp_dir / "doc.jsonl.gz", pages, pages_per_frame=8)
+
+        index = read_index(path)
+        assert index["pages"] == 37
+        assert len(index["frames"]) == 5
+        for number in (1, 8, 9, 37):
+            assert read_page(path, number, index) == pages[number - 1]
+        assert gzip.decompress(path.read_bytes()) == b"".join(pages)
+
+    def test_separator_between_pages_and_frames(self, temp_dir):
+        """Test the separator joins pages across frames and is not part of any page read back."""
+        pages = [f"Page {n}".encode() for n in range(1, 8)]
+        path, size = write_framed(temp_dir / "doc.md.gz", pages, pages_per_frame=3, separator=b"\n\n")
+        assert gzip.decompress(path.read_bytes()) == b"\n\n".join(pages)
+        index = read_index(path)
+        for number in range(1, 8):
+            assert read_page(path, number, index) == pages[number - 1]
+
+    def test_frame_offsets_are_contiguous(self, temp_dir):
+        """Test frames tile the data file exactly."""
+        path, size = write_framed(temp_dir / "doc.md.gz", _pages(20), pages_per_frame=6)
+        frames = read_index(path)["frames"]
+        assert frames[0]["offset"] == 0
+        for prev, frame in zip(frames, frames[1:], strict=False):
+            assert frame["offset"] == prev["offset"] + prev["length"]
+        assert sum(f["length"] for f in frames) == path.stat().st_size == size
+
+    def test_out_of_range_page(self, temp_dir):
+        """Test reading a missing page raises IndexError."""
+        path, size = write_framed(temp_dir / "doc.jsonl.gz", _pages(3))
+        with pytest.raises(IndexError):
+            read_page(path, 4)
+
+    def test_empty_document(self, temp_dir):
+        """Test a document with no pages writes an empty file and index."""
+        path, size = write_framed(temp_dir / "empty.jsonl.gz", [])
+        assert path.read_bytes() == b""
+        assert read_index(path)["frames"] == []
+
+    def test_zstd_roundtrip(self, temp_dir):
+        """Test zstd frames when the optional dependency is installed."""
+        pytest.importorskip("zstandard")
+        pages = _pages(10)
+        path, size = write_framed(temp_dir / "doc.jsonl.zst", pages, codec="zstd", pages_per_frame=4)
+        assert read_page(path, 6) == pages[5]
+
+    def test_paths(self, temp_dir):
+        """Test framed and index path naming."""
+        base = temp_dir / "doc.jsonl"
+        assert framed_path(base, "gzip").name == "doc.jsonl.gz"
+        assert index_path(framed_path(base, "zstd")).name == "doc.jsonl.zst.idx.json"
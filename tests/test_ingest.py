@@ -0,0 +1,443 @@
+"""Tests for the ingest workflow and selective reprocessing."""
+
+import gzip
+import json
+import shutil
+import threading
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from pdf_ingestion.breaker import CLOSED, HALF_OPEN, OPEN, parser_breaker
+from pdf_ingestion.errors import (
+    JobInterrupted,
+    ParserUnavailable,
+    PdfIngestionError,
+    PdfRejectedError,
+    PdfSyntaxError,
+)
+from pdf_ingestion.fingerprint import PARSE, RENDER, stale_stages
+from pdf_ingestion.framed import read_page
+from pdf_ingestion.ingest import ingest, stage_graph
+from pdf_ingestion.journal import INGEST, STORE_PROCESSED, journal
+from pdf_ingestion.ledger import ledger
+from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.pipeline import StagePipeline
+from pdf_ingestion.pagecache import page_hashes
+from pdf_ingestion.reprocess import plan_reprocess
+from pdf_ingestion.sources import InboxFile, inbox_sources
+
+
+def _parser(pages):
+    parser = Mock()
+    parser.get_json_result.return_value = [
+        {"job_id": "job-1", "pages": [{"page": i + 1, "md": md} for i, md in enumerate(pages)]}
+    ]
+    return parser
+
+
+def _request(cfg, name):
+    return PdfIngestionRequest(
+        PdfInput=name,
+        JsonOutput=cfg["output"]["jsonl_file_format"].format(stem=name, cuid="run1"),
+        MarkdownOutput=cfg["output"]["markdown_file_format"].format(stem=name, cuid="run1"),
+    )
+
+
+def _pdf(path, texts):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    for text in texts:
+        c.drawString(100, 750, text)
+        c.showPage()
+    c.save()
+    return path
+
+
+@pytest.fixture
+def inbox_pdf(pipeline_config, sample_pdf):
+    target = Path(pipeline_config["input"]["dir"]) / "statement.pdf"
+    shutil.copy(sample_pdf, target)
+    return target
+
+
+class TestIngestRun:
+    """Test cases for ingest.run."""
+
+    def test_happy_path(self, pipeline_config, inbox_pdf):
+        """Test outputs are written redacted, the input moved and the ledger updated."""
+        parser = _parser(["Account 1234567890123 balance", "Page two"])
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingestor = ingest("run1")
+            ingestor.run(_request(pipeline_config, inbox_pdf.name))
+
+        req = ingestor.req
+        records = [json.loads(line) for line in Path(req.JsonOutput).read_text().splitlines()]
+        assert [r["page"] for r in records] == [1, 2]
+        assert "*********0123" in records[0]["markdown"]
+        assert "1234567890123" not in Path(req.MarkdownOutput).read_text()
+        assert not inbox_pdf.exists()
+        assert (Path(pipeline_config["processed"]["dir"]) / inbox_pdf.name).exists()
+
+        entry = ledger().get(ingestor.sha256)
+        assert entry["json_output"] == req.JsonOutput
+        assert set(entry["fingerprints"]) == {PARSE, RENDER}
+
+    def test_failure_is_quarantined_with_reason(self, pipeline_config, inbox_pdf):
+        """Test a rejected file is moved to quarantine with a reason file."""
+        inbox_pdf.write_bytes(b"not a pdf")
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=_parser([])):
+            with pytest.raises(PdfRejectedError):
+                ingest("run1").run(_request(pipeline_config, inbox_pdf.name))
+        quarantined = Path(pipeline_config["quarantine"]["dir"]) / inbox_pdf.name
+        assert quarantined.exists()
+        reason = quarantined.with_name(f"{quarantined.name}.reason.txt").read_text()
+        assert "PdfRejectedError" in reason
+
+    def test_spooled_file_in_relative_inbox(self, pipeline_config, temp_dir, sample_pdf, monkeypatch):
+        """Test a file queued from a relative inbox dir is found by its absolute key."""
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setitem(pipeline_config["input"], "dir", "data/inbox")
+        source = inbox_sources()[0]
+        source.spool_dir.mkdir(parents=True)
+        shutil.copy(sample_pdf, source.spool_dir / "statement.pdf")
+        file = InboxFile(source=source, name="statement.pdf", size_bytes=0, receipt=1)
+        assert Path(file.key).is_absolute()
+
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=_parser(["One", "Two"])):
+            ingestor = ingest("run1")
+            ingestor.run(PdfIngestionRequest(PdfInput=file.key, JsonOutput="out.jsonl", MarkdownOutput="out.md"))
+
+        assert ingestor.pages == ["One", "Two"]
+        assert not file.path.exists()
+        assert (Path(pipeline_config["processed"]["dir"]) / "statement.pdf").exists()
+
+    def test_compressed_output(self, pipeline_config, inbox_pdf, monkeypatch):
+        """Test compressed mode writes framed outputs with an offset index."""
+        monkeypatch.setitem(pipeline_config["output"], "compression", "gzip")
+        monkeypatch.setitem(pipeline_config["output"], "pages_per_frame", 1)
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=_parser(["One", "Two"])):
+            ingestor = ingest("run1")
+            ingestor.run(_request(pipeline_config, inbox_pdf.name))
+
+        markdown = Path(ingestor.output_files["markdown"])
+        assert markdown.name.endswith(".md.gz")
+        assert read_page(markdown, 2) == b"Two"
+        assert gzip.decompress(markdown.read_bytes()) == b"One\n\nTwo"
+        assert json.loads(read_page(Path(ingestor.output_files["json"]), 1))["page"] == 1
+
+
+class TestReprocess:
+    """Test cases for fingerprint-driven reprocessing."""
+
+    def test_stale_stages(self):
+        """Test a stale parse implies a stale render but not the reverse."""
+        current = {PARSE: "p2", RENDER: "r1"}
+        assert stale_stages({PARSE: "p1", RENDER: "r1"}, current) == {PARSE, RENDER}
+        assert stale_stages({PARSE: "p2", RENDER: "r0"}, current) == {RENDER}
+        assert stale_stages(current, current) == set()
+        assert stale_stages(None, current) == {PARSE, RENDER}
+
+    def test_render_only_change_skips_parse(self, pipeline_config, inbox_pdf, monkeypatch):
+        """Test an app version bump re-renders from the stored parse."""
+        parser = _parser(["Account 1234567890123"])
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingest("run1").run(_request(pipeline_config, inbox_pdf.name))
+            assert plan_reprocess(ledger()) == []
+
+            monkeypatch.setitem(pipeline_config["version"], "app_version", "9.9.9")
+            plan = plan_reprocess(ledger())
+            assert [item.stages for item in plan] == [{RENDER}]
+            ingest("run2").reprocess(plan[0].entry, reparse=plan[0].reparse)
+
+        assert parser.get_json_result.call_count == 1
+        assert plan_reprocess(ledger()) == []
+
+    def test_parser_option_change_reparses(self, pipeline_config, inbox_pdf, monkeypatch):
+        """Test a premium_mode change re-parses from the processed file."""
+        parser = _parser(["Page one"])
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingest("run1").run(_request(pipeline_config, inbox_pdf.name))
+
+            monkeypatch.setitem(pipeline_config["llamaparse"], "premium_mode", False)
+            plan = plan_reprocess(ledger())
+            assert plan[0].reparse
+            ingest("run2").reprocess(plan[0].entry, reparse=plan[0].reparse)
+
+        assert parser.get_json_result.call_count == 2
+        assert plan_reprocess(ledger()) == []
+
+
+class TestPageCache:
+    """Test cases for the page-level parse cache."""
+
+    def test_page_hashes_follow_content(self, temp_dir):
+        """Test identical pages hash alike across and within documents."""
+        first = page_hashes(_pdf(temp_dir / "a.pdf", ["Terms and conditions", "January"]))
+        second = page_hashes(_pdf(temp_dir / "b.pdf", ["Terms and conditions", "February", "February"]))
+        assert first[0] == second[0]
+        assert first[1] != second[1]
+        assert second[1] == second[2]
+
+    def test_only_uncached_pages_are_parsed(self, pipeline_config):
+        """Test a shared page is reused and only new pages are sent to the parser."""
+        inbox = Path(pipeline_config["input"]["dir"])
+        targets = []
+
+        def parse(stream, extra_info):
+            targets.append(parser.target_pages)
+            return parser.results.pop(0)
+
+        parser = Mock()
+        parser.get_json_result.side_effect = parse
+        parser.results = [
+            [{"job_id": "job-1", "pages": [{"page": 1, "md": "Terms"}, {"page": 2, "md": "January"}]}],
+            [{"job_id": "job-2", "pages": [{"page": 2, "md": "February"}]}],
+        ]
+        _pdf(inbox / "jan.pdf", ["Terms and conditions", "January"])
+        _pdf(inbox / "feb.pdf", ["Terms and conditions", "February", "Terms and conditions"])
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingest("run1").run(_request(pipeline_config, "jan.pdf"))
+            ingestor = ingest("run2")
+            ingestor.run(_request(pipeline_config, "feb.pdf"))
+
+        assert targets == [None, "1"]
+        assert ingestor.pages == ["Terms", "February", "Terms"]
+        assert parser.target_pages is None
+
+    def test_malformed_page_tree_parses_whole_document(self, pipeline_config, raw_pdf):
+        """Test a page tree the hasher cannot walk falls back to one parse without the cache."""
+        # A /Contents chain nested far deeper than any real file
+        depth = 2000
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /Resources << /Font << >> >> /Contents 4 0 R >>",
+        ]
+        objects += [b"[%d 0 R]" % (num + 1) for num in range(4, depth + 4)]
+        objects.append(b"[]")
+        path = raw_pdf(Path(pipeline_config["input"]["dir"]) / "deep.pdf", objects)
+        with pytest.raises(PdfSyntaxError):
+            page_hashes(path)
+
+        parser = _parser(["Whole"])
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingestor = ingest("run1")
+            ingestor.run(_request(pipeline_config, path.name))
+
+        assert ingestor.pages == ["Whole"]
+        assert parser.target_pages is None
+        assert not any(Path(pipeline_config["state"]["dir"]).glob("pages/*/*.md"))
+
+
+class TestCheckpointResume:
+    """Test cases for the stage checkpoint journal."""
+
+    def test_interrupted_after_parse_resumes_without_reparse(self, pipeline_config, inbox_pdf):
+        """Test a stop after parsing keeps the checkpoint and the next run skips the parse."""
+        stop = threading.Event()
+        parser = _parser(["One", "Two"])
+        parse = parser.get_json_result.return_value
+        parser.get_json_result.side_effect = lambda *args, **kwargs: stop.set() or parse
+        first = _request(pipeline_config, inbox_pdf.name)
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingestor = ingest("run1")
+            with pytest.raises(JobInterrupted):
+                ingestor.run(first, stop_event=stop)
+            assert inbox_pdf.exists()
+            assert journal().load(ingestor.state_key).completed == [INGEST]
+
+            second = _request(pipeline_config, inbox_pdf.name).model_copy(
+                update={"JsonOutput": "elsewhere.jsonl", "MarkdownOutput": "elsewhere.md"})
+            ingest("run2").run(second)
+
+        assert parser.get_json_result.call_count == 1
+        assert Path(first.MarkdownOutput).read_text() == "One\n\nTwo"
+        assert journal().load(ingestor.state_key) is None
+        assert ledger().get(ingestor.sha256)["run_id"] == "run2"
+
+    def test_identical_files_keep_their_own_state(self, pipeline_config, inbox_pdf):
+        """Test two copies of one file under different names do not share checkpoint or ledger entry."""
+        copy = shutil.copy(inbox_pdf, inbox_pdf.with_name("statement-copy.pdf"))
+        stop = threading.Event()
+        parser = _parser(["One", "Two"])
+        parse = parser.get_json_result.return_value
+        parser.get_json_result.side_effect = lambda *args, **kwargs: stop.set() or parse
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            first = ingest("run1")
+            with pytest.raises(JobInterrupted):
+                first.run(_request(pipeline_config, inbox_pdf.name), stop_event=stop)
+            second = ingest("run2")
+            second.run(_request(pipeline_config, copy.name))
+
+            assert second.sha256 == first.sha256
+            assert second.state_key != first.state_key
+            assert journal().load(first.state_key).completed == [INGEST]
+            ingest("run3").run(_request(pipeline_config, inbox_pdf.name))
+
+        assert journal().pending() == []
+        assert ledger().get_job(first.sha256, first._source)["run_id"] == "run3"
+        assert ledger().get_job(second.sha256, second._source)["file_name"] == "statement-copy.pdf"
+        assert ledger().find_run("run2")["json_output"] != ledger().find_run("run3")["json_output"]
+
+    def test_resume_after_processed_move(self, pipeline_config, inbox_pdf):
+        """Test a job stopped after leaving the inbox is finished by resume."""
+        stop = threading.Event()
+        store_processed = ingest._store_processed
+
+        def move_then_stop(self):
+            store_processed(self)
+            stop.set()
+
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=_parser(["One", "Two"])):
+            with patch.object(ingest, "_store_processed", move_then_stop):
+                with pytest.raises(JobInterrupted):
+                    ingest("run1").run(_request(pipeline_config, inbox_pdf.name), stop_event=stop)
+            [checkpoint] = journal().pending()
+            assert STORE_PROCESSED in checkpoint.completed
+            assert ledger().get(checkpoint.sha256) is None
+
+            ingest("run2").resume(checkpoint)
+
+        assert ledger().get(checkpoint.sha256)["processed_file"] == checkpoint.processed_file
+        assert journal().pending() == []
+
+
+class TestParserOutage:
+    """Test cases for the parser circuit breaker in the ingest stage."""
+
+    def test_outage_holds_file_instead_of_quarantine(self, pipeline_config, inbox_pdf, monkeypatch):
+        """Test outages keep the file in the inbox and an open circuit skips the call."""
+        monkeypatch.setitem(pipeline_config, "circuit_breaker", {"failure_threshold": 1, "reset_timeout_s": 60})
+        parser = _parser([])
+        parser.get_json_result.side_effect = httpx.ConnectError("refused")
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            with pytest.raises(ParserUnavailable):
+                ingest("run1").run(_request(pipeline_config, inbox_pdf.name))
+            assert parser_breaker().state == OPEN
+            with pytest.raises(ParserUnavailable):
+                ingest("run2").run(_request(pipeline_config, inbox_pdf.name))
+
+        assert parser.get_json_result.call_count == 1
+        assert inbox_pdf.exists()
+        assert not any(Path(pipeline_config["quarantine"]["dir"]).glob("*"))
+
+    def test_only_parser_replies_close_a_half_open_circuit(self, pipeline_config, inbox_pdf, sample_pdf,
+                                                          monkeypatch):
+        """Test a local failure frees the probe without closing the circuit and a 4xx closes it."""
+        monkeypatch.setitem(pipeline_config, "circuit_breaker", {"failure_threshold": 1, "reset_timeout_s": 0})
+        parser_breaker().record_failure()
+        assert parser_breaker().state == HALF_OPEN
+        request = httpx.Request("POST", "https://parser.test/upload")
+        parser = _parser([])
+        parser.get_json_result.side_effect = OSError("cannot map file")
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            with pytest.raises(OSError):
+                ingest("run1").run(_request(pipeline_config, inbox_pdf.name))
+            assert parser_breaker().state == HALF_OPEN
+            assert parser_breaker().allow()
+            parser_breaker().release_probe()
+
+            shutil.copy(sample_pdf, inbox_pdf)
+            parser.get_json_result.side_effect = httpx.HTTPStatusError(
+                "", request=request, response=httpx.Response(400, request=request))
+            with pytest.raises(httpx.HTTPStatusError):
+                ingest("run2").run(_request(pipeline_config, inbox_pdf.name))
+        assert parser_breaker().state == CLOSED
+
+
+class TestSubmitAndFinish:
+    """Test cases for the decoupled submit/collect path."""
+
+    def test_start_submits_and_finish_completes(self, pipeline_config, inbox_pdf):
+        """Test start only uploads, a restart reuses the job id and finish runs the rest."""
+        parser = _parser([])
+        parser._create_job = AsyncMock(return_value="job-7")
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            assert ingest("run1").start(_request(pipeline_config, inbox_pdf.name)) == "job-7"
+            assert inbox_pdf.exists()
+
+            ingestor = ingest("run2")
+            assert ingestor.start(_request(pipeline_config, inbox_pdf.name)) == "job-7"
+            ingestor.finish({"pages": [{"page": 1, "md": "One"}, {"page": 2, "md": "Two"}]})
+
+        assert parser._create_job.await_count == 1
+        parser.get_json_result.assert_not_called()
+        assert ingestor.pages == ["One", "Two"]
+        assert not inbox_pdf.exists()
+        assert ledger().get(ingestor.sha256)["run_id"] == "run2"
+        assert journal().load(ingestor.state_key) is None
+
+    def test_failed_job_is_quarantined(self, pipeline_config, inbox_pdf):
+        """Test a job the parser failed is quarantined when collected."""
+        parser = _parser([])
+        parser._create_job = AsyncMock(return_value="job-8")
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingestor = ingest("run1")
+            ingestor.start(_request(pipeline_config, inbox_pdf.name))
+            with pytest.raises(PdfIngestionError):
+                ingestor.finish(None, PdfIngestionError("Parse job job-8 failed"))
+        assert (Path(pipeline_config["quarantine"]["dir"]) / inbox_pdf.name).exists()
+
+
+class _InlinePoller:
+    """ParsePoller stand-in that completes every job on a separate thread."""
+
+    def __init__(self, result):
+        self.result = result
+        self.tracked = []
+
+    def reserve(self):
+        pass
+
+    def release(self):
+        pass
+
+    def track(self, job_id, on_done):
+        self.tracked.append(job_id)
+        threading.Thread(target=on_done, args=(self.result, None)).start()
+
+
+class TestStageGraph:
+    """Test cases for running ingest through a StagePipeline."""
+
+    def test_files_flow_through_pipeline(self, pipeline_config):
+        """Test several files are ingested by the synchronous stage graph."""
+        inbox = Path(pipeline_config["input"]["dir"])
+        done, errors = [], []
+        pipeline = StagePipeline(stage_graph(), on_done=done.append,
+                                 on_error=lambda job, error: errors.append(error))
+        with patch("pdf_ingestion.ingest.LlamaParse", side_effect=lambda **kwargs: _parser(["Only page"])):
+            for name in ("a.pdf", "b.pdf", "c.pdf"):
+                _pdf(inbox / name, [f"Contents of {name}"])
+                ingest(f"run-{name}").enqueue(pipeline, _request(pipeline_config, name))
+            assert pipeline.join(timeout=10)
+        pipeline.close()
+
+        assert errors == []
+        assert sorted(job.req.PdfInput for job in done) == ["a.pdf", "b.pdf", "c.pdf"]
+        assert not any(inbox.iterdir())
+        assert all(set(job.output_files) == {"json", "markdown"} for job in done)
+        assert all(ledger().get(job.sha256) for job in done)
+
+    def test_remote_parse_stage_resolves_from_poller(self, pipeline_config, inbox_pdf):
+        """Test the parse stage parks on a submitted job and resumes on collection."""
+        parser = _parser([])
+        parser._create_job = AsyncMock(return_value="job-9")
+        poller = _InlinePoller({"pages": [{"page": 1, "md": "One"}, {"page": 2, "md": "Two"}]})
+        done = []
+        pipeline = None
+        pipeline = StagePipeline(stage_graph(poller, resolve=lambda *args: pipeline.resolve(*args)),
+                                 on_done=done.append)
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingest("run1").enqueue(pipeline, _request(pipeline_config, inbox_pdf.name))
+            assert pipeline.join(timeout=10)
+        pipeline.close()
+
+        assert poller.tracked == ["job-9"]
+        assert done[0].pages == ["One", "Two"]
+        assert Path(done[0].req.MarkdownOutput).read_text() == "One\n\nTwo"
+        assert done[0].poll_s is not None and done[0].poll_s == done[0].parse_s
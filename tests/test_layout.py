@@ -0,0 +1,111 @@
+"""Tests for sharded output and processed layouts."""
+
+import json
+import shutil
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from pdf_ingestion.ingest import ingest
+from pdf_ingestion.layout import expand, locate, shard
+from pdf_ingestion.ledger import Ledger, ledger
+from pdf_ingestion.models import PdfIngestionRequest
+
+
+class TestLayout:
+    """Test cases for layout placeholders and job lookup."""
+
+    def test_shard_is_stable_and_sized(self):
+        """Test the shard prefix depends only on the job id and the configured size."""
+        assert shard("job-1") == shard("job-1")
+        assert shard("job-1") != shard("job-2")
+        assert [len(part) for part in shard("job-1", levels=3, width=1).split("/")] == [1, 1, 1]
+        assert len(shard("job-1").split("/")) == 2
+
+    def test_expand_placeholders(self):
+        """Test every placeholder is filled in for a job."""
+        now = datetime(2026, 3, 4, 5, 6, 7, tzinfo=UTC)
+        path = expand("out/{date}/{shard}/{stem}-{cuid}-{ts}.jsonl", "a.pdf", "job-1", now)
+        assert path == f"out/2026/03/04/{shard('job-1')}/a.pdf-job-1-20260304T050607Z.jsonl"
+
+    def test_locate_by_shard_without_ledger(self, temp_dir):
+        """Test a sharded file is found from the job id alone."""
+        template = str(temp_dir / "{shard}" / "{stem}-{cuid}.jsonl")
+        target = Path(expand(template, "a.pdf", "job-1"))
+        target.parent.mkdir(parents=True)
+        target.write_text("{}")
+        Path(expand(template, "b.pdf", "job-2")).parent.mkdir(parents=True, exist_ok=True)
+
+        assert locate("job-1", {"jsonl": template}) == {"jsonl": [target]}
+        assert locate("job-3", {"jsonl": template}) == {"jsonl": []}
+
+    def test_date_partitions_need_the_ledger(self, temp_dir):
+        """Test a date-partitioned path resolves through the ledger entry only."""
+        template = str(temp_dir / "{date}" / "{cuid}.md")
+        assert locate("job-1", {"markdown": template}) == {"markdown": []}
+        entry = {"markdown_output": str(temp_dir / "2026/01/02/job-1.md")}
+        assert locate("job-1", {"markdown": template}, entry) == {"markdown": [temp_dir / "2026/01/02/job-1.md"]}
+
+    def test_written_outputs_win_over_requested_paths(self, temp_dir):
+        """Test the recorded output files, framed or in object storage, are what locate returns."""
+        templates = {"jsonl": str(temp_dir / "{cuid}.jsonl"), "markdown": str(temp_dir / "{cuid}.md")}
+        entry = {"json_output": str(temp_dir / "job-1.jsonl"), "markdown_output": str(temp_dir / "job-1.md"),
+                 "output_files": {"json": str(temp_dir / "job-1.jsonl.gz"), "markdown": "s3://bucket/out/job-1.md"}}
+        assert locate("job-1", templates, entry) == {"jsonl": [temp_dir / "job-1.jsonl.gz"],
+                                                     "markdown": ["s3://bucket/out/job-1.md"]}
+
+    def test_framed_outputs_found_without_ledger(self, temp_dir):
+        """Test the directory fallback also finds framed outputs."""
+        template = str(temp_dir / "{shard}" / "{stem}-{cuid}.md")
+        target = Path(expand(template, "a.pdf", "job-1") + ".zst")
+        target.parent.mkdir(parents=True)
+        target.write_bytes(b"")
+        assert locate("job-1", {"markdown": template}) == {"markdown": [target]}
+
+    def test_ledger_finds_runs_by_id(self, temp_dir):
+        """Test the ledger resolves a run id, including after a reload and a rerun."""
+        book = Ledger(temp_dir / "ledger.db")
+        book.record("sha-a", "inbox/a.pdf", run_id="job-1", json_output="a.jsonl")
+        assert book.find_run("job-1")["sha256"] == "sha-a"
+        assert Ledger(temp_dir / "ledger.db").find_run("job-1")["json_output"] == "a.jsonl"
+        book.record("sha-a", "inbox/a.pdf", run_id="job-2")
+        assert book.find_run("job-1") is None
+        assert book.find_run("job-2")["sha256"] == "sha-a"
+
+    def test_legacy_json_ledger_is_imported(self, temp_dir):
+        """Test entries of an old ledger.json are carried into the database once."""
+        legacy = temp_dir / "ledger.json"
+        legacy.write_text(json.dumps({"sha-a": {"sha256": "sha-a", "run_id": "job-1", "json_output": "a.jsonl"}}))
+        book = Ledger(temp_dir / "ledger.db")
+        assert book.find_run("job-1")["json_output"] == "a.jsonl"
+        assert [entry["sha256"] for entry in book.iter_entries()] == ["sha-a"]
+        assert not legacy.exists() and (temp_dir / "ledger.json.imported").exists()
+
+
+class TestShardedIngest:
+    """Test cases for ingest writing into a sharded layout."""
+
+    def test_outputs_and_processed_file_are_sharded(self, pipeline_config, sample_pdf, monkeypatch):
+        """Test outputs and the processed file land in the job's shard and can be located."""
+        root = Path(pipeline_config["state"]["dir"]).parent
+        monkeypatch.setitem(pipeline_config["output"], "jsonl_file_format",
+                            str(root / "outputs/jsonl/{shard}/{stem}-{cuid}.jsonl"))
+        monkeypatch.setitem(pipeline_config["processed"], "subdir_format", "{shard}")
+        shutil.copy(sample_pdf, Path(pipeline_config["input"]["dir"]) / "a.pdf")
+        parser = Mock()
+        parser.get_json_result.return_value = [{"job_id": "j", "pages": [{"page": 1, "md": "One"}]}]
+        req = PdfIngestionRequest(
+            PdfInput="a.pdf",
+            JsonOutput=expand(pipeline_config["output"]["jsonl_file_format"], "a.pdf", "run1"),
+            MarkdownOutput=expand(pipeline_config["output"]["markdown_file_format"], "a.pdf", "run1"),
+        )
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingest("run1").run(req)
+
+        jsonl = root / "outputs/jsonl" / shard("run1") / "a.pdf-run1.jsonl"
+        processed = Path(pipeline_config["processed"]["dir"]) / shard("run1") / "a.pdf"
+        assert jsonl.exists() and processed.exists()
+        templates = {"jsonl": pipeline_config["output"]["jsonl_file_format"],
+                     "processed": str(Path(pipeline_config["processed"]["dir"]) / "{shard}" / "{stem}")}
+        assert locate("run1", templates) == {"jsonl": [jsonl], "processed": [processed]}
+        assert locate("run1", templates, ledger().find_run("run1"))["processed"] == [processed]
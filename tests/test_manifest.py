@@ -0,0 +1,170 @@
+"""Tests for manifest reading, resumable progress and in-place ingest."""
+
+import json
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from pdf_ingestion.ingest import ingest, stage_graph
+from pdf_ingestion.manifest import ManifestProgress, Throughput, iter_manifest
+from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.pipeline import StagePipeline
+
+
+def _pdf(path, text):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    c.drawString(100, 750, text)
+    c.showPage()
+    c.save()
+    return path
+
+
+def _parser(markdown):
+    parser = Mock()
+    parser.get_json_result.return_value = [{"job_id": "job-1", "pages": [{"page": 1, "md": markdown}]}]
+    return parser
+
+
+class TestIterManifest:
+    """Test cases for iter_manifest."""
+
+    def test_jsonl_objects_and_strings(self, temp_dir):
+        """Test JSONL rows may be objects or bare strings, and blank lines are skipped."""
+        manifest = temp_dir / "batch.jsonl"
+        manifest.write_text('{"path": "a.pdf"}\n\n"/abs/b.pdf"\n')
+        entries = list(iter_manifest(manifest))
+        assert [e.number for e in entries] == [1, 2]
+        assert entries[0].path == temp_dir.resolve() / "a.pdf"
+        assert entries[1].path == Path("/abs/b.pdf")
+
+    def test_csv_with_path_header(self, temp_dir):
+        """Test the path column is picked by header name."""
+        manifest = temp_dir / "batch.csv"
+        manifest.write_text("id,path\n1,a.pdf\n2,sub/b.pdf\n")
+        assert [e.path.name for e in iter_manifest(manifest)] == ["a.pdf", "b.pdf"]
+
+    def test_csv_without_header_uses_first_column(self, temp_dir):
+        """Test a headerless CSV reads paths from the first column."""
+        manifest = temp_dir / "batch.csv"
+        manifest.write_text("a.pdf,x\nb.pdf,y\n")
+        assert [e.path.name for e in iter_manifest(manifest)] == ["a.pdf", "b.pdf"]
+
+    def test_row_without_path_raises(self, temp_dir):
+        """Test a JSONL object lacking a path is rejected with its line number."""
+        manifest = temp_dir / "batch.jsonl"
+        manifest.write_text('{"file": "a.pdf"}\n')
+        with pytest.raises(ValueError, match="line 1"):
+            list(iter_manifest(manifest))
+
+
+class TestManifestProgress:
+    """Test cases for ManifestProgress."""
+
+    def test_watermark_advances_over_contiguous_entries(self, temp_dir):
+        """Test out-of-order completions are folded into the watermark."""
+        progress = ManifestProgress(temp_dir / "p.json")
+        progress.mark(2)
+        progress.mark(3, failed=True)
+        assert progress.watermark == 0
+        assert progress.is_done(3) and not progress.is_done(1)
+        progress.mark(1)
+        assert progress.watermark == 3
+        assert progress.failed == 1
+
+    def test_progress_survives_restart(self, temp_dir):
+        """Test a flushed progress file is picked up by the next run."""
+        path = temp_dir / "p.json"
+        progress = ManifestProgress(path)
+        for number in (1, 2, 4):
+            progress.mark(number)
+        progress.flush()
+
+        resumed = ManifestProgress(path)
+        assert resumed.watermark == 2
+        assert [n for n in range(1, 6) if not resumed.is_done(n)] == [3, 5]
+
+    def test_deferred_entry_is_pending_past_the_watermark(self, temp_dir):
+        """Test a deferred entry lets the watermark advance and is retried after a restart."""
+        path = temp_dir / "p.json"
+        progress = ManifestProgress(path)
+        progress.mark(1)
+        progress.defer(2)
+        for number in range(3, 50):
+            progress.mark(number)
+        assert progress.watermark == 49 and progress.pending == 1
+        assert not progress.is_done(2)
+        progress.flush()
+
+        resumed = ManifestProgress(path)
+        assert [n for n in range(1, 51) if not resumed.is_done(n)] == [2, 50]
+        resumed.mark(2)
+        assert resumed.is_done(2) and resumed.pending == 0
+
+    def test_flush_appends_only_new_entries(self, temp_dir):
+        """Test flushes after the first append lines instead of rewriting the state."""
+        path = temp_dir / "p.json"
+        progress = ManifestProgress(path, flush_every=1000)
+        progress.mark(2)
+        progress.flush()
+        snapshot = path.read_text()
+        progress.mark(4, failed=True)
+        progress.mark(1)
+        progress.flush()
+        assert path.read_text().startswith(snapshot)
+        assert len(path.read_text().splitlines()) == 3
+
+        resumed = ManifestProgress(path)
+        assert resumed.watermark == 2 and resumed.failed == 1
+        assert [n for n in range(1, 6) if not resumed.is_done(n)] == [3, 5]
+
+    def test_torn_line_and_old_state_file(self, temp_dir):
+        """Test a torn last line is ignored and a whole-state file from before the log still loads."""
+        path = temp_dir / "p.json"
+        path.write_text(json.dumps({"watermark": 2, "done_above": [4], "failed": 0}))
+        progress = ManifestProgress(path)
+        progress.mark(3)
+        progress.flush()
+        with open(path, "a") as f:
+            f.write('{"n": 9')
+        resumed = ManifestProgress(path)
+        assert resumed.watermark == 4 and not resumed.is_done(9)
+
+    def test_throughput_summary(self):
+        """Test the summary reports counts and rate from the clock."""
+        now = [0.0]
+        meter = Throughput(clock=lambda: now[0])
+        meter.add("done", 8)
+        meter.add("failed", 2)
+        now[0] = 5.0
+        assert meter.rate() == 2.0
+        assert "done 8  failed 2" in meter.summary(in_flight=3)
+        assert "in flight 3" in meter.summary(in_flight=3)
+
+
+class TestInPlaceIngest:
+    """Test cases for ingesting manifest files where they are."""
+
+    def test_source_is_left_in_place(self, pipeline_config, temp_dir):
+        """Test an in-place job writes outputs without moving its source file."""
+        source_dir = temp_dir / "archive"
+        source_dir.mkdir()
+        source = _pdf(source_dir / "old.pdf", "Archived")
+        req = PdfIngestionRequest(
+            PdfInput=str(source),
+            JsonOutput=pipeline_config["output"]["jsonl_file_format"].format(stem=source.name, cuid="run1"),
+            MarkdownOutput=pipeline_config["output"]["markdown_file_format"].format(stem=source.name, cuid="run1"),
+        )
+        done = []
+        pipeline = StagePipeline(stage_graph(), on_done=done.append)
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=_parser("Archived")):
+            ingest("run1").enqueue(pipeline, req, in_place=True)
+            assert pipeline.join(timeout=10)
+        pipeline.close()
+
+        assert len(done) == 1
+        assert source.exists()
+        assert not any(Path(pipeline_config["processed"]["dir"]).glob("*.pdf"))
+        assert json.loads(Path(req.JsonOutput).read_text().splitlines()[0])["markdown"] == "Archived"
@@ -0,0 +1,98 @@
+"""Tests for the structured markdown-to-JSONL converter."""
+
+import json
+
+import pytest
+
+from pdf_ingestion import mdjson
+from pdf_ingestion.errors import OutputSchemaError
+from pdf_ingestion.mdjson import MarkdownConverter, page_records, validate_page
+
+_STATEMENT = """# Monthly Statement
+
+**Account Number:** *********0123
+Statement Date: 2024-01-31
+
+## Transactions
+
+| Date | Description | Amount |
+|------|-------------|-------:|
+| 01/02 | Coffee | 4.50 |
+| 01/03 | Rent | 1200.00 |
+
+Balances are shown in USD and
+include pending items.
+
+- first item
+- second item
+
+```
+raw: block
+```
+"""
+
+
+class TestMarkdownConverter:
+    """Test cases for MarkdownConverter."""
+
+    def test_blocks_are_typed_with_heading_path(self):
+        """Test headings, key-value pairs, tables, paragraphs and code are recognised."""
+        blocks = MarkdownConverter().blocks(_STATEMENT)
+        assert [b["type"] for b in blocks] == [
+            "heading", "kv", "kv", "heading", "table", "paragraph", "paragraph", "code"]
+        assert blocks[1] == {"type": "kv", "path": ["Monthly Statement"],
+                             "key": "Account Number", "value": "*********0123"}
+        assert blocks[2]["key"] == "Statement Date"
+        table = blocks[4]
+        assert table["path"] == ["Monthly Statement", "Transactions"]
+        assert table["header"] == ["Date", "Description", "Amount"]
+        assert table["rows"] == [["01/02", "Coffee", "4.50"], ["01/03", "Rent", "1200.00"]]
+        assert blocks[5]["text"] == "Balances are shown in USD and include pending items."
+        assert blocks[6]["text"] == "- first item\n- second item"
+        assert blocks[7]["text"] == "raw: block"
+
+    def test_heading_path_carries_across_pages(self):
+        """Test a section continuing on the next page keeps its heading path."""
+        converter = MarkdownConverter()
+        converter.blocks("# Report\n\n## Fees\n\nText")
+        (paragraph,) = converter.blocks("More fee text")
+        assert paragraph["path"] == ["Report", "Fees"]
+        heading, _ = converter.blocks("# Appendix\n\nEnd")
+        assert heading["path"] == ["Appendix"]
+
+    def test_urls_and_times_are_not_key_values(self):
+        """Test colons without a following space do not make key-value pairs."""
+        blocks = MarkdownConverter().blocks("See https://example.com/x\nOpen 09:30 to 17:00")
+        assert [b["type"] for b in blocks] == ["paragraph"]
+
+
+class TestPageRecords:
+    """Test cases for page_records and validate_page."""
+
+    def test_one_line_per_page(self):
+        """Test each page is one JSON line with its markdown and blocks."""
+        lines = list(page_records("abc", "a.pdf", ["# One\n\nBody", "Second"]))
+        records = [json.loads(line) for line in lines]
+        assert all(line.endswith(b"\n") and line.count(b"\n") == 1 for line in lines)
+        assert [r["page"] for r in records] == [1, 2]
+        assert records[0]["markdown"] == "# One\n\nBody"
+        assert records[1]["blocks"] == [{"type": "paragraph", "path": ["One"], "text": "Second"}]
+
+    def test_stdlib_encoder_matches(self, monkeypatch):
+        """Test the fallback encoder produces the same records as orjson."""
+        pages = [_STATEMENT, "Ünïcode: ✓"]
+        expected = [json.loads(line) for line in page_records("abc", "a.pdf", pages)]
+        monkeypatch.setattr(mdjson, "dumps_line",
+                            lambda record: (json.dumps(record, ensure_ascii=False) + "\n").encode())
+        assert [json.loads(line) for line in page_records("abc", "a.pdf", pages)] == expected
+
+    def test_validation_rejects_malformed_records(self):
+        """Test wrong field types and unknown block types are reported."""
+        record = {"sha256": "abc", "source": "a.pdf", "page": 1, "markdown": "", "blocks": []}
+        validate_page(record)
+        with pytest.raises(OutputSchemaError, match="page"):
+            validate_page(dict(record, page="1"))
+        with pytest.raises(OutputSchemaError, match="unknown type"):
+            validate_page(dict(record, blocks=[{"type": "image", "path": []}]))
+        with pytest.raises(OutputSchemaError, match="'rows' must be list"):
+            validate_page(dict(record, blocks=[{"type": "table", "path": [], "header": [], "rows": None}]))
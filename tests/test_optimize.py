@@ -0,0 +1,106 @@
+"""Tests for pre-upload PDF optimization."""
+
+import mmap
+import shutil
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from pdf_ingestion.hashing import sha256_file
+from pdf_ingestion.ingest import ingest
+from pdf_ingestion.localtext import extract_pages
+from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.optimize import optimize_for_upload, optimize_pdf, optimizer_pool
+from pdf_ingestion.pdfobjects import PdfReader, PdfStream
+
+
+def _scan(path, pixels=(1200, 1500), inches=(2.0, 2.5), pages=2):
+    """A PDF of noisy grayscale page images at pixels/inches dpi, with a line of text each."""
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 255, pixels[::-1], dtype=np.uint8), "L")
+    c = canvas.Canvas(str(path), pagesize=(inches[0] * 72, inches[1] * 72))
+    for number in range(pages):
+        c.drawImage(ImageReader(image), 0, 0, width=inches[0] * 72, height=inches[1] * 72)
+        c.drawString(10, 10, f"Scanned page {number + 1}")
+        c.showPage()
+    c.save()
+    return path
+
+
+def _image_sizes(path):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        reader = PdfReader(buf)
+        return [(obj.dict["Width"], obj.dict["Height"]) for num in reader.xref
+                if isinstance(obj := reader.get_object(num), PdfStream) and obj.dict.get("Subtype") == "Image"]
+
+
+class TestOptimizePdf:
+    """Test cases for optimize_pdf."""
+
+    def test_downsamples_high_dpi_images(self, temp_dir):
+        """Test a 600 dpi scan is rewritten at the target dpi with its text intact."""
+        src = _scan(temp_dir / "scan.pdf")
+        result = optimize_pdf(str(src), str(temp_dir / "out.pdf"), target_dpi=150, jpeg_quality=60)
+        assert result.downsampled == 1 and result.output_bytes < result.input_bytes / 4
+        assert _image_sizes(temp_dir / "out.pdf") == [(300, 375)]
+        assert extract_pages(temp_dir / "out.pdf") == ["Scanned page 1", "Scanned page 2"]
+
+    def test_low_dpi_file_is_left_alone(self, temp_dir):
+        """Test nothing is written when the images are already at or below the target."""
+        src = _scan(temp_dir / "scan.pdf", pixels=(300, 375))
+        assert optimize_pdf(str(src), str(temp_dir / "out.pdf"), target_dpi=150) is None
+        assert not (temp_dir / "out.pdf").exists()
+
+
+class TestOptimizeBeforeUpload:
+    """Test cases for ingest uploading the optimized copy."""
+
+    @pytest.fixture
+    def optimize_config(self, pipeline_config, monkeypatch):
+        monkeypatch.setitem(pipeline_config, "optimize", {"enabled": True, "min_size_bytes": 0, "processes": 0,
+                                                          "target_dpi": 150, "jpeg_quality": 60})
+        return pipeline_config
+
+    def test_upload_uses_copy_and_processed_keeps_original(self, optimize_config, temp_dir):
+        """Test the parser gets the smaller copy while processed keeps the original bytes."""
+        src = _scan(temp_dir / "scan.pdf")
+        original = sha256_file(src)
+        shutil.copy(src, Path(optimize_config["input"]["dir"]) / "a.pdf")
+        uploaded = []
+
+        def parse(fn, method, path, *args):
+            uploaded.append((Path(path).name, Path(path).stat().st_size))
+            return [{"job_id": "j", "pages": [{"md": "One"}, {"md": "Two"}]}]
+
+        pool = Mock()
+        pool.call.side_effect = parse
+        req = PdfIngestionRequest(
+            PdfInput="a.pdf",
+            JsonOutput=optimize_config["output"]["jsonl_file_format"].format(stem="a.pdf", cuid="run1"),
+            MarkdownOutput=optimize_config["output"]["markdown_file_format"].format(stem="a.pdf", cuid="run1"),
+        )
+        with patch("pdf_ingestion.ingest.parser_pool", return_value=pool), \
+                patch("pdf_ingestion.ingest.LlamaParse", return_value=Mock()):
+            ingest("run1").run(req)
+
+        ((name, size),) = uploaded
+        assert name == "a.pdf" and size < src.stat().st_size / 4
+        assert sha256_file(Path(optimize_config["processed"]["dir"]) / "a.pdf") == original
+        assert not any((Path(optimize_config["state"]["dir"]) / "optimized").rglob("*.pdf"))
+
+    def test_runs_in_worker_pool(self, optimize_config, temp_dir, monkeypatch):
+        """Test the rewrite is done by the optimizer pool when processes are configured."""
+        monkeypatch.setitem(optimize_config["optimize"], "processes", 1)
+        src = _scan(temp_dir / "scan.pdf")
+        try:
+            path, result = optimize_for_upload(src, "abc", "run1")
+            assert optimizer_pool() is not None
+        finally:
+            optimizer_pool().close()
+        assert path.name == "scan.pdf" and path.stat().st_size == result.output_bytes
+        assert path.parent.name == "run1" and path.parent.parent.name == "abc"
@@ -0,0 +1,106 @@
+"""Tests for the stage-graph executor."""
+
+import threading
+
+import pytest
+
+from pdf_ingestion.pipeline import PENDING, Stage, StagePipeline
+
+
+def _diamond(log, **overrides):
+    def record(name):
+        def fn(item):
+            log.append((name, item))
+        return fn
+
+    stages = {
+        "read": Stage("read", record("read")),
+        "left": Stage("left", record("left"), after=("read",)),
+        "right": Stage("right", record("right"), after=("read",)),
+        "join": Stage("join", record("join"), after=("left", "right")),
+    }
+    stages.update(overrides)
+    return list(stages.values())
+
+
+class TestStagePipeline:
+    """Test cases for StagePipeline."""
+
+    def test_items_flow_through_dependencies(self):
+        """Test every stage runs once per item and only after its dependencies."""
+        log, done = [], []
+        pipeline = StagePipeline(_diamond(log), on_done=done.append)
+        for item in range(5):
+            pipeline.submit(item)
+        assert pipeline.join(timeout=5)
+        pipeline.close()
+
+        assert sorted(done) == list(range(5))
+        for item in range(5):
+            order = [name for name, i in log if i == item]
+            assert sorted(order) == ["join", "left", "read", "right"]
+            assert order[0] == "read" and order[-1] == "join"
+
+    def test_independent_stages_run_in_parallel(self):
+        """Test both branches of a fork are busy at the same time."""
+        barrier = threading.Barrier(2, timeout=5)
+        pipeline = StagePipeline(_diamond(
+            [],
+            left=Stage("left", lambda item: barrier.wait(), after=("read",)),
+            right=Stage("right", lambda item: barrier.wait(), after=("read",)),
+        ))
+        pipeline.submit("doc")
+        assert pipeline.join(timeout=5)
+        pipeline.close()
+
+    def test_failure_skips_downstream_stages(self):
+        """Test the first error is reported once and the item never reaches join."""
+        log, errors = [], []
+
+        def boom(item):
+            raise ValueError(item)
+
+        pipeline = StagePipeline(
+            _diamond(log, left=Stage("left", boom, after=("read",))),
+            on_error=lambda item, error: errors.append((item, error)),
+        )
+        pipeline.submit("bad")
+        assert pipeline.join(timeout=5)
+        pipeline.close()
+
+        assert [item for item, _ in errors] == ["bad"]
+        assert ("join", "bad") not in log
+        assert pipeline.stats()["left"]["failed"] == 1
+
+    def test_pending_stage_resumes_on_resolve(self):
+        """Test an item waits at a PENDING stage until resolve is called."""
+        log, parked = [], []
+        pipeline = StagePipeline(_diamond(
+            log, read=Stage("read", lambda item: parked.append(item) or PENDING),
+        ))
+        pipeline.submit("doc")
+        assert not pipeline.join(timeout=0.1)
+        assert pipeline.in_flight == 1
+        pipeline.resolve(parked[0], "read")
+        assert pipeline.join(timeout=5)
+        pipeline.close()
+        assert ("join", "doc") in log
+
+    def test_queue_depths(self):
+        """Test items waiting behind a busy stage show up in its queue depth."""
+        release = threading.Event()
+        pipeline = StagePipeline([Stage("slow", lambda item: release.wait(5), queue_size=4)])
+        for item in range(3):
+            pipeline.submit(item)
+        deadline = threading.Event()
+        while pipeline.stats()["slow"]["busy"] != 1:
+            deadline.wait(0.01)
+        assert pipeline.depths() == {"slow": 2}
+        release.set()
+        assert pipeline.join(timeout=5)
+        pipeline.close()
+
+    def test_rejects_undeclared_dependency(self):
+        """Test stages must be declared after the stages they depend on."""
+        with pytest.raises(ValueError):
+            StagePipeline([Stage("b", print, after=("a",)), Stage("a", print)])
@@ -0,0 +1,128 @@
+"""Tests for the parse job poller."""
+
+import threading
+
+import httpx
+
+from pdf_ingestion.breaker import CLOSED, OPEN, CircuitBreaker
+from pdf_ingestion.errors import ParserUnavailable, PdfIngestionError
+from pdf_ingestion.poller import ParsePoller
+
+
+def _transport(statuses):
+    """Serve job statuses from ``statuses`` (job id -> list, last one repeats)."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        job_id = request.url.path.split("/")[4]
+        if job_id not in statuses:
+            return httpx.Response(404, json={"detail": "not found"})
+        if request.url.path.endswith("/result/json"):
+            return httpx.Response(200, json={"pages": [{"page": 1, "md": f"md-{job_id}"}]})
+        sequence = statuses[job_id]
+        status = sequence.pop(0) if len(sequence) > 1 else sequence[0]
+        return httpx.Response(200, json={"id": job_id, "status": status, "error_message": "bad scan"})
+
+    return httpx.MockTransport(handler), calls
+
+
+class TestParsePoller:
+    """Test cases for ParsePoller."""
+
+    def test_collects_all_outstanding_jobs(self):
+        """Test results and failures are reported once per job as they complete."""
+        transport, calls = _transport({"a": ["PENDING", "PENDING", "SUCCESS"], "b": ["ERROR"]})
+        poller = ParsePoller("https://parser.test", "key", poll_interval_s=0.01, transport=transport)
+        outcomes = {}
+        finished = threading.Event()
+
+        def on_done(job_id):
+            def record(result, error):
+                outcomes[job_id] = (result, error)
+                if len(outcomes) == 3:
+                    finished.set()
+            return record
+
+        for job_id in ("a", "b", "gone"):
+            poller.reserve()
+            poller.track(job_id, on_done(job_id))
+        assert finished.wait(5)
+        assert poller.wait_idle(1)
+        poller.stop()
+
+        assert outcomes["a"][0]["pages"][0]["md"] == "md-a"
+        assert isinstance(outcomes["b"][1], PdfIngestionError)
+        assert "bad scan" in str(outcomes["b"][1])
+        assert isinstance(outcomes["gone"][1], ParserUnavailable)
+        assert calls.count("/api/parsing/job/a") == 3
+        assert poller.outstanding == 0
+
+    def test_times_out_stuck_jobs(self):
+        """Test a job pending past the timeout is reported as a parser outage."""
+        transport, _ = _transport({"slow": ["PENDING"]})
+        poller = ParsePoller("https://parser.test", "key", poll_interval_s=0.01, job_timeout_s=0.05,
+                             transport=transport)
+        done = threading.Event()
+        errors = []
+        poller.reserve()
+        poller.track("slow", lambda result, error: errors.append(error) or done.set())
+        assert done.wait(5)
+        poller.stop()
+        assert isinstance(errors[0], ParserUnavailable)
+
+    def test_poll_outages_reach_the_breaker(self):
+        """Test 5xx replies while polling open the circuit and a later good reply closes it."""
+        replies = [httpx.Response(503), httpx.Response(429)]
+        opened = threading.Event()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=60)
+
+        def handler(request):
+            if replies:
+                return replies.pop(0)
+            if breaker.state == OPEN:
+                opened.set()
+            if request.url.path.endswith("/result/json"):
+                return httpx.Response(200, json={"pages": []})
+            return httpx.Response(200, json={"status": "SUCCESS"})
+
+        poller = ParsePoller("https://parser.test", "key", poll_interval_s=0.01,
+                             transport=httpx.MockTransport(handler), breaker=breaker)
+        done = threading.Event()
+        poller.reserve()
+        poller.track("a", lambda result, error: done.set())
+        assert done.wait(5)
+        poller.stop()
+        assert opened.is_set()
+        assert breaker.state == CLOSED
+
+    def test_unexpected_error_fails_only_its_job(self):
+        """Test a check that raises reports that job failed and keeps polling the others."""
+        transport, _ = _transport({"a": ["PENDING", "SUCCESS"]})
+
+        async def handler(request):
+            if "/broken" in request.url.path:
+                raise RuntimeError("client bug")
+            return await transport.handle_async_request(request)
+
+        poller = ParsePoller("https://parser.test", "key", poll_interval_s=0.01,
+                             transport=httpx.MockTransport(handler))
+        outcomes = {}
+        finished = threading.Event()
+
+        def on_done(job_id):
+            def record(result, error):
+                outcomes[job_id] = (result, error)
+                if len(outcomes) == 2:
+                    finished.set()
+            return record
+
+        for job_id in ("broken", "a"):
+            poller.reserve()
+            poller.track(job_id, on_done(job_id))
+        assert finished.wait(5)
+        poller.stop()
+
+        assert isinstance(outcomes["broken"][1], RuntimeError)
+        assert outcomes["a"][0]["pages"][0]["md"] == "md-a"
+        assert poller.outstanding == 0
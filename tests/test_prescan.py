@@ -0,0 +1,202 @@
+"""Tests for the PDF prescan stage."""
+
+import zlib
+from pathlib import Path
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from pdf_ingestion.prescan import PrescanCache, prescan_pdf, rejection_reason
+
+
+# A one-page PDF whose only resource is an image, like a scan
+_IMAGE_ONLY_OBJECTS = [
+    b"<< /Type /Catalog /Pages 2 0 R >>",
+    b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+    b"<< /Type /Page /Parent 2 0 R /Resources << /XObject << /Im1 4 0 R >> >> >>",
+    b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray"
+    b" /BitsPerComponent 8 /Length 1 >>\nstream\n\x00\nendstream",
+]
+
+
+def _compressed_pdf(path: Path) -> Path:
+    """Write a PDF 1.5 file using an object stream and a predictor xref stream."""
+    objstm_objects = [
+        (2, b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>"),
+        (3, b"<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 4 0 R >> >> >>"),
+        (4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"),
+    ]
+    body = b""
+    header = b""
+    for num, data in objstm_objects:
+        header += b"%d %d " % (num, len(body))
+        body += data + b" "
+    objstm = zlib.compress(header + body)
+
+    out = bytearray(b"%PDF-1.5\n")
+    offsets = {}
+    offsets[1] = len(out)
+    out += b"1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n"
+    offsets[5] = len(out)
+    out += b"5 0 obj << /Type /ObjStm /N 3 /First %d /Filter /FlateDecode /Length %d >>\nstream\n" % (
+        len(header),
+        len(objstm),
+    )
+    out += objstm + b"\nendstream endobj\n"
+
+    rows = [
+        (0, 0, 0xFFFF),
+        (1, offsets[1], 0),
+        (2, 5, 0),
+        (2, 5, 1),
+        (2, 5, 2),
+        (1, offsets[5], 0),
+    ]
+    offsets[6] = len(out)
+    rows.append((1, offsets[6], 0))
+    raw = bytearray()
+    prev = bytes(5)
+    for kind, a, b in rows:
+        row = bytes([kind]) + a.to_bytes(2, "big") + b.to_bytes(2, "big")
+        raw += b"\x02" + bytes((x - y) & 0xFF for x, y in zip(row, prev, strict=True))
+        prev = row
+    xref = zlib.compress(bytes(raw))
+    out += (
+        b"6 0 obj << /Type /XRef /Size 7 /W [1 2 2] /Root 1 0 R /Filter /FlateDecode "
+        b"/DecodeParms << /Predictor 12 /Columns 5 >> /Length %d >>\nstream\n" % len(xref)
+    )
+    out += xref + b"\nendstream endobj\n"
+    out += b"startxref\n%d\n%%%%EOF\n" % offsets[6]
+    path.write_bytes(bytes(out))
+    return path
+
+
+class TestPrescan:
+    """Test cases for prescan_pdf."""
+
+    def test_valid_pdf(self, sample_pdf):
+        """Test page count and text layer of a reportlab PDF."""
+        result = prescan_pdf(sample_pdf)
+        assert result.valid
+        assert result.page_count == 2
+        assert result.has_text_layer is True
+        assert result.encrypted is False
+        assert len(result.sha256) == 64
+        assert rejection_reason(result) is None
+
+    def test_image_only_pdf_has_no_text_layer(self, temp_dir, raw_pdf):
+        """Test a PDF with no fonts reports no text layer."""
+        result = prescan_pdf(raw_pdf(temp_dir / "scan.pdf", _IMAGE_ONLY_OBJECTS))
+        assert result.valid
+        assert result.page_count == 1
+        assert result.has_text_layer is False
+
+    def test_truncated_pdf_is_rejected(self, sample_pdf, temp_dir):
+        """Test a truncated PDF is invalid and rejected."""
+        truncated = temp_dir / "truncated.pdf"
+        truncated.write_bytes(sample_pdf.read_bytes()[: sample_pdf.stat().st_size // 2])
+        result = prescan_pdf(truncated)
+        assert not result.valid
+        assert "truncated" in result.error
+        assert rejection_reason(result).startswith("Corrupt or truncated PDF")
+
+    def test_not_a_pdf(self, temp_dir):
+        """Test non-PDF and empty files are invalid."""
+        text_file = temp_dir / "notes.pdf"
+        text_file.write_text("hello")
+        assert not prescan_pdf(text_file).valid
+        empty = temp_dir / "empty.pdf"
+        empty.write_bytes(b"")
+        assert prescan_pdf(empty).error == "Empty file"
+
+    def test_encrypted_pdf_is_rejected(self, temp_dir):
+        """Test an encrypted PDF is detected and rejected."""
+        pdf_path = temp_dir / "secret.pdf"
+        c = canvas.Canvas(str(pdf_path), pagesize=letter, encrypt="secret")
+        c.drawString(100, 750, "Encrypted content")
+        c.save()
+        result = prescan_pdf(pdf_path)
+        assert result.encrypted
+        assert rejection_reason(result) == "Encrypted PDF"
+
+    def test_broken_startxref_is_repaired(self, sample_pdf, temp_dir):
+        """Test a wrong startxref offset falls back to an object scan."""
+        data = sample_pdf.read_bytes()
+        start = data.rindex(b"startxref")
+        broken = temp_dir / "broken.pdf"
+        broken.write_bytes(data[:start] + b"startxref\n9\n%%EOF\n")
+        result = prescan_pdf(broken)
+        assert result.valid
+        assert result.repaired
+        assert result.page_count == 2
+
+    def test_malformed_page_tree(self, temp_dir, raw_pdf):
+        """Test resources of the wrong type are ignored and bad /Kids reject the file."""
+        wrong_resources = raw_pdf(temp_dir / "resources.pdf", [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 2 >>",
+            b"<< /Type /Page /Parent 2 0 R /Resources [/Font] >>",
+            b"<< /Type /Page /Parent 2 0 R /Resources << /XObject [/Im1] >> >>",
+        ])
+        result = prescan_pdf(wrong_resources)
+        assert result.valid, result.error
+        assert result.has_text_layer is False
+
+        wrong_kids = raw_pdf(temp_dir / "kids.pdf", [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids 7 /Count 1 >>",
+        ])
+        result = prescan_pdf(wrong_kids)
+        assert not result.valid
+        assert "/Kids" in result.error
+
+    def test_xref_stream_and_object_stream(self, temp_dir):
+        """Test PDF 1.5 cross-reference streams and compressed objects."""
+        result = prescan_pdf(_compressed_pdf(temp_dir / "compressed.pdf"))
+        assert result.valid, result.error
+        assert result.version == "1.5"
+        assert result.page_count == 1
+        assert result.has_text_layer is True
+
+
+class TestPrescanCache:
+    """Test cases for PrescanCache."""
+
+    def test_cache_roundtrip(self, sample_pdf, temp_dir):
+        """Test results are cached by hash and reloaded from disk."""
+        cache_file = temp_dir / "state" / "prescan.jsonl"
+        cache = PrescanCache(cache_file)
+        first = cache.scan(sample_pdf)
+        assert cache.get(first.sha256) == first
+
+        copy = temp_dir / "copy.pdf"
+        copy.write_bytes(sample_pdf.read_bytes())
+        assert cache.scan(copy) is first
+
+        reloaded = PrescanCache(cache_file)
+        assert reloaded.get(first.sha256) == first
+
+    def test_cache_ignores_partial_line(self, sample_pdf, temp_dir):
+        """Test a partial trailing line from a crash is skipped."""
+        cache_file = temp_dir / "prescan.jsonl"
+        PrescanCache(cache_file).scan(sample_pdf)
+        with open(cache_file, "a") as f:
+            f.write('{"sha256": "abc", "size')
+        assert len(PrescanCache(cache_file)._entries) == 1
+
+    def test_hash_memo_is_bounded(self, sample_pdf, temp_dir, monkeypatch):
+        """Test remembered file hashes are evicted least recently used first."""
+        cache = PrescanCache(temp_dir / "prescan.jsonl", max_hashes=2)
+        paths = [temp_dir / name for name in ("a.pdf", "b.pdf", "c.pdf")]
+        for path in paths:
+            path.write_bytes(sample_pdf.read_bytes())
+        hashed = []
+        monkeypatch.setattr("pdf_ingestion.prescan.sha256_file", lambda path: hashed.append(path.name) or "x")
+        cache.hash(paths[0])
+        cache.hash(paths[1])
+        cache.hash(paths[0])
+        cache.hash(paths[2])
+        assert len(cache._hashes) == 2
+        cache.hash(paths[0])
+        cache.hash(paths[1])
+        assert hashed == ["a.pdf", "b.pdf", "c.pdf", "b.pdf"]
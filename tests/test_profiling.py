@@ -0,0 +1,92 @@
+"""Tests for cProfile/tracemalloc capture of cycles and jobs."""
+
+import pstats
+import shutil
+import tracemalloc
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from pdf_ingestion.ingest import ingest, stage_graph
+from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.pipeline import StagePipeline
+from pdf_ingestion.profiling import CPU, MEM, RunProfiler
+
+
+def _busy():
+    return sum(i * i for i in range(20000))
+
+
+class TestRunProfiler:
+    """Test cases for RunProfiler."""
+
+    def test_cpu_capture_writes_pstats(self, temp_dir):
+        """Test CPU mode dumps a loadable .prof and a cumulative-time report."""
+        profiler = RunProfiler(CPU, temp_dir)
+        with profiler.capture("run1", "ingest"):
+            _busy()
+        stats = pstats.Stats(str(temp_dir / "run1" / "ingest.prof"))
+        assert any(name == "_busy" for _, _, name in stats.stats)
+        assert "_busy" in (temp_dir / "run1" / "ingest.txt").read_text()
+
+    def test_memory_capture_lists_growth(self, temp_dir):
+        """Test memory mode reports the allocation sites that grew and stops tracing."""
+        profiler = RunProfiler(MEM, temp_dir, top_n=5)
+        with profiler.capture("run1", "ingest"):
+            kept = [bytearray(1024) for _ in range(200)]
+        report = (temp_dir / "run1" / "ingest.mem.txt").read_text()
+        assert "traced_peak_bytes" in report
+        assert "test_profiling.py" in report
+        assert len(kept) == 200
+        assert not tracemalloc.is_tracing()
+
+    def test_disabled_and_unsampled_write_nothing(self, temp_dir):
+        """Test nothing is written when off or when the run id is not sampled."""
+        with RunProfiler(None, temp_dir).capture("run1", "ingest"):
+            _busy()
+        profiler = RunProfiler(CPU, temp_dir, sample_rate=0.0)
+        with profiler.capture("run2", "ingest"):
+            _busy()
+        assert not any(temp_dir.iterdir())
+        with profiler.capture("run2", "cycle-00001", sampled=False):
+            _busy()
+        assert (temp_dir / "run2" / "cycle-00001.prof").exists()
+
+    def test_sampling_is_stable_per_run_id(self, temp_dir):
+        """Test a run id is either always or never sampled, near the configured rate."""
+        profiler = RunProfiler(CPU, temp_dir, sample_rate=0.25)
+        run_ids = [f"run{n}" for n in range(2000)]
+        sampled = [profiler.sampled(run_id) for run_id in run_ids]
+        assert sampled == [profiler.sampled(run_id) for run_id in run_ids]
+        assert 0.2 < sum(sampled) / len(sampled) < 0.3
+
+    def test_unknown_mode(self, temp_dir):
+        """Test an unknown mode is rejected."""
+        with pytest.raises(ValueError):
+            RunProfiler("gpu", temp_dir)
+
+
+class TestJobProfiling:
+    """Test cases for profiling ingest jobs."""
+
+    def test_stage_graph_profiles_each_stage_under_job_run_id(self, pipeline_config, sample_pdf, monkeypatch):
+        """Test pipeline stages are captured per job when [profiling].mode is cpu."""
+        monkeypatch.setitem(pipeline_config, "profiling", {"mode": CPU, "sample_rate": 1.0})
+        shutil.copy(sample_pdf, Path(pipeline_config["input"]["dir"]) / "a.pdf")
+        parser = Mock()
+        parser.get_json_result.return_value = [{"job_id": "j", "pages": [{"page": 1, "md": "One"}]}]
+        req = PdfIngestionRequest(
+            PdfInput="a.pdf",
+            JsonOutput=pipeline_config["output"]["jsonl_file_format"].format(stem="a.pdf", cuid="job42"),
+            MarkdownOutput=pipeline_config["output"]["markdown_file_format"].format(stem="a.pdf", cuid="job42"),
+        )
+        pipeline = StagePipeline(stage_graph())
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            ingest("job42").enqueue(pipeline, req)
+            assert pipeline.join(timeout=10)
+        pipeline.close()
+
+        profiles = Path(pipeline_config["runs"]["dir"]) / "profiles" / "job42"
+        assert {p.stem for p in profiles.glob("*.prof")} == {
+            "prepare", "parse", "redact", "store_json", "store_markdown", "index", "store_processed", "store_run"}
@@ -0,0 +1,29 @@
+"""Tests for the redaction stage."""
+
+from pdf_ingestion.redaction import redact, rules_hash
+
+
+class TestRedaction:
+    """Test cases for account number redaction."""
+
+    def test_masks_contiguous_account_number(self):
+        """Test a long digit run keeps only its last four digits."""
+        assert redact("Acct 12345678901", ["account_numbers"]) == "Acct *******8901"
+
+    def test_masks_grouped_card_number(self):
+        """Test grouped digits keep their separators."""
+        text = "Card 1234 5678 9012 3456 ends"
+        assert redact(text, ["account_numbers"]) == "Card **** **** **** 3456 ends"
+
+    def test_leaves_short_numbers_and_dates(self):
+        """Test amounts, short numbers and dates are not masked."""
+        text = "Paid $1,234.56 on 2024-01-31, ref 4521"
+        assert redact(text, ["account_numbers"]) == text
+
+    def test_no_rules_is_identity(self):
+        """Test redaction with no rules leaves text unchanged."""
+        assert redact("12345678901", []) == "12345678901"
+
+    def test_rules_hash_is_stable(self):
+        """Test the rule hash does not change between calls."""
+        assert rules_hash() == rules_hash()
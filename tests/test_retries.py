@@ -0,0 +1,152 @@
+"""Tests for the delayed retry of quarantined files."""
+
+import csv
+import shutil
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import httpx
+
+from pdf_ingestion import retries
+from pdf_ingestion.errors import PdfRejectedError
+from pdf_ingestion.hashing import sha256_file
+from pdf_ingestion.ingest import ingest
+from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.retries import RetrySchedule, is_retryable, retry_schedule
+from pdf_ingestion.sinks import SinkError
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+class TestRetrySchedule:
+    """Test cases for RetrySchedule."""
+
+    def test_backoff_doubles_up_to_cap(self, temp_dir):
+        """Test each attempt doubles the delay until max_delay_s."""
+        schedule = RetrySchedule(temp_dir / "retries.json", base_delay_s=10, max_delay_s=50, max_retries=10)
+        assert [schedule.delay(n) for n in range(1, 6)] == [10, 20, 40, 50, 50]
+
+    def test_due_entries_pop_in_order(self, temp_dir):
+        """Test only entries past their due time are returned, oldest first."""
+        clock = _Clock()
+        schedule = RetrySchedule(temp_dir / "retries.json", base_delay_s=10, clock=clock)
+        schedule.schedule("b", "b.pdf", "/inbox", "OSError: x")
+        clock.now += 5
+        schedule.schedule("a", "a.pdf", "/inbox", "OSError: x")
+        assert schedule.pop_due() == []
+        clock.now += 10
+        assert [entry.key for entry in schedule.pop_due()] == ["b", "a"]
+        assert len(schedule) == 0 and schedule.get("a").attempts == 1
+
+    def test_attempts_persist_and_backoff_grows_across_runs(self, temp_dir):
+        """Test a reopened schedule keeps pending entries and attempt counts."""
+        clock = _Clock()
+        path = temp_dir / "retries.json"
+        first = RetrySchedule(path, base_delay_s=10, clock=clock)
+        first.schedule("k", "a.pdf", "/inbox", "OSError: x")
+
+        second = RetrySchedule(path, base_delay_s=10, clock=clock)
+        clock.now += 10
+        assert [entry.key for entry in second.pop_due()] == ["k"]
+        entry = RetrySchedule(path, base_delay_s=10, clock=clock).schedule("k", "a.pdf", "/inbox", "OSError: y")
+        assert entry.attempts == 2 and entry.due_at == clock.now + 20
+
+    def test_exhausted_after_max_retries(self, temp_dir):
+        """Test a file is no longer scheduled once max_retries attempts are used."""
+        schedule = RetrySchedule(temp_dir / "retries.json", max_retries=2)
+        assert schedule.schedule("k", "a.pdf", "/inbox", "e").due_at is not None
+        assert schedule.schedule("k", "a.pdf", "/inbox", "e").due_at is not None
+        exhausted = schedule.schedule("k", "a.pdf", "/inbox", "e")
+        assert exhausted.attempts == 2 and exhausted.due_at is None
+        assert len(schedule) == 0
+
+    def test_cleared_and_rescheduled_entries_are_skipped(self, temp_dir):
+        """Test heap entries left behind by clear or reschedule are ignored."""
+        clock = _Clock()
+        schedule = RetrySchedule(temp_dir / "retries.json", base_delay_s=10, clock=clock)
+        schedule.schedule("gone", "a.pdf", "/inbox", "e")
+        schedule.schedule("moved", "b.pdf", "/inbox", "e")
+        schedule.clear("gone")
+        schedule.pop_due()
+        clock.now += 10
+        (entry,) = schedule.pop_due()
+        schedule.defer(entry.key, 30)
+        clock.now += 20
+        assert schedule.pop_due() == []
+        clock.now += 10
+        assert [entry.key for entry in schedule.pop_due()] == ["moved"]
+
+    def test_is_retryable(self):
+        """Test transient errors are retried and rejections are not."""
+        request = httpx.Request("POST", "https://parser.test")
+        assert is_retryable(SinkError("503"))
+        assert is_retryable(OSError("No space left on device"))
+        assert is_retryable(httpx.ReadTimeout("timed out", request=request))
+        assert not is_retryable(PdfRejectedError("encrypted"))
+        assert not is_retryable(httpx.HTTPStatusError(
+            "bad request", request=request, response=httpx.Response(400, request=request)))
+
+
+class TestQuarantineRetry:
+    """Test cases for scheduling and releasing quarantined files."""
+
+    def _request(self, cfg, name):
+        return PdfIngestionRequest(
+            PdfInput=name,
+            JsonOutput=cfg["output"]["jsonl_file_format"].format(stem=name, cuid="run1"),
+            MarkdownOutput=cfg["output"]["markdown_file_format"].format(stem=name, cuid="run1"),
+        )
+
+    def _fail_with(self, cfg, sample_pdf, error):
+        shutil.copy(sample_pdf, Path(cfg["input"]["dir"]) / "a.pdf")
+        parser = Mock()
+        parser.get_json_result.side_effect = error
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser):
+            try:
+                ingest("run1").run(self._request(cfg, "a.pdf"))
+            except type(error):
+                pass
+
+    def test_retryable_failure_is_scheduled_and_logged(self, pipeline_config, sample_pdf):
+        """Test a transient failure is quarantined with a retry time and a job row."""
+        self._fail_with(pipeline_config, sample_pdf, OSError("No space left on device"))
+        quarantine = Path(pipeline_config["quarantine"]["dir"])
+        assert (quarantine / "a.pdf").exists()
+        assert "retry_at:" in (quarantine / "a.pdf.reason.txt").read_text()
+        entry = retry_schedule().get(sha256_file(sample_pdf))
+        assert entry.attempts == 1 and entry.inbox == pipeline_config["input"]["dir"]
+        (row,) = _rows(pipeline_config["job"]["job_file"])
+        assert (row["status"], row["retries"], row["job_name"]) == (retries.SCHEDULED, "1", "a.pdf")
+
+    def test_permanent_failure_stays_quarantined(self, pipeline_config, sample_pdf):
+        """Test a non-retryable failure is logged with no retry scheduled."""
+        self._fail_with(pipeline_config, sample_pdf, ValueError("unexpected layout"))
+        assert len(retry_schedule()) == 0
+        (row,) = _rows(pipeline_config["job"]["job_file"])
+        assert (row["status"], row["retries"]) == (retries.EXHAUSTED, "0")
+
+    def test_due_retry_is_moved_back_to_inbox(self, pipeline_config, sample_pdf, monkeypatch):
+        """Test the watcher returns due files to their inbox and clears the reason file."""
+        import cli
+
+        self._fail_with(pipeline_config, sample_pdf, OSError("No space left on device"))
+        monkeypatch.setattr(retry_schedule(), "_clock", lambda: 10**12)
+        cli.PdfExtractCli()._release_retries()
+
+        quarantine = Path(pipeline_config["quarantine"]["dir"])
+        assert (Path(pipeline_config["input"]["dir"]) / "a.pdf").exists()
+        assert not any(quarantine.glob("a.pdf*"))
+        rows = _rows(pipeline_config["job"]["job_file"])
+        assert [(row["status"], row["retries"]) for row in rows] == [
+            (retries.SCHEDULED, "1"), (retries.RELEASED, "1")]
@@ -0,0 +1,53 @@
+"""Tests for the full-text search index."""
+
+from pdf_ingestion.search import SearchIndex
+
+
+class TestSearchIndex:
+    """Test cases for SearchIndex."""
+
+    def test_add_flush_and_search(self, temp_dir):
+        """Test indexed pages are found with their hash and page number."""
+        index = SearchIndex(temp_dir / "search.db")
+        index.add("a" * 64, "jan.pdf", ["Opening balance", "Wire transfer to ACME"])
+        index.add("b" * 64, "feb.pdf", ["Closing balance"])
+        assert index.search("transfer") == []  # still buffered
+        index.flush()
+
+        hits = index.search("transfer")
+        assert [(h.source, h.page) for h in hits] == [("jan.pdf", 2)]
+        assert "[transfer]" in hits[0].snippet.lower()
+        assert {h.source for h in index.search("balance")} == {"jan.pdf", "feb.pdf"}
+
+    def test_reprocess_replaces_pages(self, temp_dir):
+        """Test re-adding a document replaces its previous pages."""
+        index = SearchIndex(temp_dir / "search.db", batch_size=1)
+        index.add("a" * 64, "jan.pdf", ["old wording", "second page"])
+        index.add("a" * 64, "jan.pdf", ["new wording"])
+        assert index.search("old") == []
+        assert index.search("second") == []
+        assert [h.page for h in index.search("new")] == [1]
+
+    def test_remove_and_persistence(self, temp_dir):
+        """Test removal and that flushed pages survive reopening."""
+        path = temp_dir / "search.db"
+        index = SearchIndex(path)
+        index.add("a" * 64, "jan.pdf", ["alpha"])
+        index.add("b" * 64, "feb.pdf", ["alpha beta"])
+        index.close()
+
+        reopened = SearchIndex(path)
+        assert len(reopened.search("alpha")) == 2
+        reopened.remove(["a" * 64])
+        assert [h.source for h in reopened.search("alpha")] == ["feb.pdf"]
+
+    def test_pending_pages_survive_a_crash(self, temp_dir):
+        """Test documents added but never flushed are indexed when the index is reopened."""
+        path = temp_dir / "search.db"
+        crashed = SearchIndex(path)
+        crashed.add("a" * 64, "jan.pdf", ["Wire transfer to ACME"])
+
+        reopened = SearchIndex(path)
+        assert [h.source for h in reopened.search("transfer")] == ["jan.pdf"]
+        reopened.close()
+        crashed.close()
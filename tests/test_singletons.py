@@ -0,0 +1,37 @@
+"""Tests for the registry of process-wide singletons."""
+
+import sys
+import types
+
+import pytest
+
+from pdf_ingestion import singletons
+
+
+class TestResetSingletons:
+    """Test cases for register and reset_singletons."""
+
+    def test_reset_closes_and_clears_every_instance(self, monkeypatch):
+        """Test every registered global is cleared and closed, even after a close fails."""
+        monkeypatch.setattr(singletons, "_REGISTRY", [])
+        module = types.ModuleType("fake_singletons")
+        monkeypatch.setitem(sys.modules, "fake_singletons", module)
+        closed = []
+
+        def close(instance):
+            closed.append(instance)
+            if instance == "broken":
+                raise OSError("already gone")
+
+        module._FIRST, module._SECOND, module._UNUSED = "ok", "broken", None
+        singletons.register("fake_singletons", "_FIRST", close)
+        singletons.register("fake_singletons", "_SECOND", close)
+        singletons.register("fake_singletons", "_SECOND", close)
+        singletons.register("fake_singletons", "_UNUSED", close)
+
+        with pytest.raises(OSError, match="already gone"):
+            singletons.reset_singletons()
+        assert closed == ["broken", "ok"]
+        assert module._FIRST is module._SECOND is None
+        singletons.reset_singletons()
+        assert closed == ["broken", "ok"]
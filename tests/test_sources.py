@@ -0,0 +1,138 @@
+"""Tests for inbox sources, fair-share ordering and per-source metrics."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from pdf_ingestion.sources import DeficitRoundRobin, InboxFile, InboxSource, SourceMetrics, inbox_sources
+
+
+def _drain(scheduler):
+    order = []
+    while (item := scheduler.pop()) is not None:
+        order.append(item)
+    return order
+
+
+class TestDeficitRoundRobin:
+    """Test cases for DeficitRoundRobin."""
+
+    def test_bulk_drop_does_not_starve_other_source(self):
+        """Test a small source is served within the first round of a bulk one."""
+        scheduler = DeficitRoundRobin({"bulk": 1, "small": 1}, quantum=2)
+        for n in range(100):
+            scheduler.push("bulk", f"b{n}")
+        scheduler.push("small", "s0")
+        scheduler.push("small", "s1")
+        order = [item for _, item in _drain(scheduler)]
+        assert order[:4] == ["b0", "b1", "s0", "s1"]
+        assert len(order) == 102
+
+    def test_weights_set_the_share(self):
+        """Test dispatch counts follow the weights while both sources are backlogged."""
+        scheduler = DeficitRoundRobin({"a": 3, "b": 1}, quantum=1)
+        for n in range(40):
+            scheduler.push("a", n)
+            scheduler.push("b", n)
+        first = [source for source, _ in _drain(scheduler)[:20]]
+        assert first.count("a") == 15 and first.count("b") == 5
+
+    def test_cost_is_charged_against_credit(self):
+        """Test a large file waits until its source has banked enough credit."""
+        scheduler = DeficitRoundRobin({"a": 1, "b": 1}, quantum=5)
+        scheduler.push("a", "big", cost=12)
+        for n in range(6):
+            scheduler.push("b", f"small{n}")
+        order = [item for _, item in _drain(scheduler)]
+        assert order.index("big") == 6
+        assert scheduler.pop() is None
+
+    def test_idle_source_forfeits_credit(self):
+        """Test a source that empties does not keep leftover credit."""
+        scheduler = DeficitRoundRobin({"a": 1}, quantum=10)
+        scheduler.push("a", "x", cost=1)
+        assert scheduler.pop() == ("a", "x")
+        scheduler.push("a", "y", cost=10)
+        scheduler.push("a", "z", cost=1)
+        assert scheduler.pop() == ("a", "y")
+        assert len(scheduler) == 1
+
+    def test_rejects_non_positive_quantum(self):
+        """Test a zero quantum is refused rather than looping forever."""
+        with pytest.raises(ValueError):
+            DeficitRoundRobin({"a": 1}, quantum=0)
+
+
+class TestInboxSources:
+    """Test cases for inbox_sources and InboxSource."""
+
+    def _cfg(self, temp_dir, sources=None):
+        cfg = {
+            "input": {"dir": str(temp_dir / "inbox"), "pattern": "*.pdf"},
+            "output": {"jsonl_file_format": "out/{stem}.jsonl", "markdown_file_format": "out/{stem}.md"},
+        }
+        if sources is not None:
+            cfg["input"]["sources"] = sources
+        return cfg
+
+    def test_single_inbox_by_default(self, temp_dir):
+        """Test [input].dir alone becomes one source with the [output] formats."""
+        (source,) = inbox_sources(self._cfg(temp_dir))
+        assert source.dir == temp_dir / "inbox"
+        assert source.output["markdown_file_format"] == "out/{stem}.md"
+
+    def test_sources_inherit_and_override(self, temp_dir):
+        """Test per-source settings override the [input] and [output] defaults."""
+        sources = inbox_sources(self._cfg(temp_dir, [
+            {"name": "retail", "dir": str(temp_dir / "retail"), "weight": 3},
+            {"dir": str(temp_dir / "corp"), "pattern": "*.PDF", "markdown_file_format": "corp/{stem}.md"},
+        ]))
+        assert [s.name for s in sources] == ["retail", "corp"]
+        assert sources[0].weight == 3 and sources[0].pattern == "*.pdf"
+        assert sources[1].pattern == "*.PDF"
+        assert sources[1].output == {"jsonl_file_format": "out/{stem}.jsonl", "markdown_file_format": "corp/{stem}.md"}
+
+    def test_invalid_sources(self, temp_dir):
+        """Test duplicate names and non-positive weights are rejected."""
+        with pytest.raises(ValueError, match="Duplicate"):
+            inbox_sources(self._cfg(temp_dir, [{"name": "a", "dir": "x"}, {"name": "a", "dir": "y"}]))
+        with pytest.raises(ValueError, match="weight"):
+            inbox_sources(self._cfg(temp_dir, [{"name": "a", "dir": "x", "weight": 0}]))
+
+    def test_list_files_matches_pattern(self, temp_dir):
+        """Test only regular files matching the pattern are listed, without taking mtime as arrival."""
+        inbox = temp_dir / "inbox"
+        (inbox / "nested.pdf").mkdir(parents=True)
+        (inbox / "a.pdf").write_bytes(b"%PDF")
+        (inbox / "notes.txt").write_text("x")
+        os.utime(inbox / "a.pdf", (1000, 1000))
+        source = InboxSource("default", inbox)
+        (file,) = source.list_files()
+        assert file.path == inbox / "a.pdf"
+        assert file.size_bytes == 4 and file.arrived_at == 0.0
+        assert InboxSource("missing", temp_dir / "missing").list_files() == []
+
+
+class TestSourceMetrics:
+    """Test cases for SourceMetrics."""
+
+    def test_throughput_and_latency_per_source(self):
+        """Test waits, latencies and rates are reported per source."""
+        now = [100.0]
+        metrics = SourceMetrics(clock=lambda: now[0])
+        retail = InboxSource("retail", Path("/in/retail"))
+        files = [InboxFile(retail, f"{n}.pdf", arrived_at=90.0, pages=2) for n in range(3)]
+        for file in files:
+            metrics.dispatched(file)
+        now[0] = 130.0
+        metrics.finished(files[0], "done")
+        metrics.finished(files[1], "done")
+        metrics.finished(files[2], "failed")
+
+        report = metrics.snapshot()["retail"]
+        assert report["dispatched"] == 3 and report["done"] == 2 and report["failed"] == 1
+        assert report["wait_p50_s"] == 10.0
+        assert report["latency_p50_s"] == 40.0
+        assert report["docs_per_min"] == 4.0
+        assert report["pages_per_min"] == 8.0
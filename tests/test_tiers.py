@@ -0,0 +1,132 @@
+"""Tests for backlog-driven degradation tiers and local text extraction."""
+
+import json
+import shutil
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from pdf_ingestion.ingest import ingest
+from pdf_ingestion.ledger import ledger
+from pdf_ingestion.localtext import _ToUnicode, extract_pages
+from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.pdfobjects import iter_operations
+from pdf_ingestion.reprocess import plan_reprocess
+from pdf_ingestion.tiers import LOCAL, PREMIUM, STANDARD, TierPolicy, TierThreshold, is_degraded, tier_policy
+
+
+def _policy():
+    return TierPolicy(PREMIUM, [TierThreshold(STANDARD, depth=100, age_s=600),
+                                TierThreshold(LOCAL, depth=1000)], recover_ratio=0.5)
+
+
+class TestTierPolicy:
+    """Test cases for TierPolicy."""
+
+    def test_depth_and_age_escalate(self):
+        """Test either threshold moves jobs down a tier."""
+        assert _policy().select(10, 0) == PREMIUM
+        assert _policy().select(100, 0) == STANDARD
+        assert _policy().select(10, 600) == STANDARD
+        assert _policy().select(5000, 0) == LOCAL
+
+    def test_recovery_has_hysteresis(self):
+        """Test a tier is left only once the backlog is under recover_ratio of its thresholds."""
+        policy = _policy()
+        assert policy.select(1200, 0) == LOCAL
+        assert policy.select(900, 0) == LOCAL
+        assert policy.select(400, 0) == STANDARD
+        assert policy.select(60, 0) == STANDARD
+        assert policy.select(60, 400) == STANDARD
+        assert policy.select(40, 10) == PREMIUM
+
+    def test_tiers_above_base_are_ignored(self):
+        """Test a standard base tier never selects premium and only degrades to local."""
+        policy = TierPolicy(STANDARD, [TierThreshold(STANDARD, depth=1), TierThreshold(LOCAL, depth=50)])
+        assert policy.select(10, 0) == STANDARD
+        assert policy.select(50, 0) == LOCAL
+
+    def test_disabled_by_default(self, pipeline_config, monkeypatch):
+        """Test no policy is built unless [degradation] is enabled."""
+        assert tier_policy() is None
+        monkeypatch.setitem(pipeline_config, "degradation", {"enabled": True, "local_depth": 5})
+        monkeypatch.setitem(pipeline_config["llamaparse"], "premium_mode", True)
+        assert tier_policy().select(5, 0) == LOCAL
+        assert is_degraded(STANDARD) and not is_degraded(PREMIUM) and not is_degraded(None)
+
+
+class TestLocalText:
+    """Test cases for local text extraction."""
+
+    def test_extracts_text_per_page(self, sample_pdf):
+        """Test each page's text lines come back in order."""
+        pages = extract_pages(sample_pdf)
+        assert pages[0].splitlines() == ["This is a sample PDF document.", "It contains multiple lines of text.",
+                                         "This text is used for testing PDF extraction."]
+        assert extract_pages(sample_pdf, [1]) == [pages[1]]
+        assert extract_pages(sample_pdf, []) == []
+
+    def test_operations_skip_inline_images(self):
+        """Test operators are read across inline image data and starred operators."""
+        data = b"BT (a) Tj T* [(b) -300 (c)] TJ ET BI /W 1 ID \x00)EI( EI Q"
+        ops = [(op, operands) for op, operands in iter_operations(data)]
+        assert [op for op, _ in ops] == ["BT", "Tj", "T*", "TJ", "ET", "BI", "Q"]
+        assert ops[3][1] == [[b"b", -300, b"c"]]
+
+    def test_to_unicode_map(self):
+        """Test two-byte codes are decoded through bfchar and bfrange entries."""
+        cmap = _ToUnicode(b"1 beginbfchar <0001> <0048> endbfchar "
+                          b"2 beginbfrange <0002> <0003> <0069> <0004> <0004> [<00E9>] endbfrange")
+        assert cmap(b"\x00\x01\x00\x02\x00\x03\x00\x04") == "Hijé"
+
+
+class TestDegradedIngest:
+    """Test cases for ingest at a degraded tier."""
+
+    def _run(self, cfg, sample_pdf, tier, pool=None):
+        shutil.copy(sample_pdf, Path(cfg["input"]["dir"]) / "a.pdf")
+        req = PdfIngestionRequest(
+            PdfInput="a.pdf",
+            JsonOutput=cfg["output"]["jsonl_file_format"].format(stem="a.pdf", cuid="run1"),
+            MarkdownOutput=cfg["output"]["markdown_file_format"].format(stem="a.pdf", cuid="run1"),
+            Tier=tier,
+        )
+        parser = Mock()
+        parser.get_json_result.return_value = [{"job_id": "j", "pages": [{"md": "One"}, {"md": "Two"}]}]
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser), \
+                patch("pdf_ingestion.ingest.parser_pool", return_value=pool):
+            ingest("run1").run(req)
+        return parser, req
+
+    def test_local_tier_skips_parser_and_tags_outputs(self, pipeline_config, sample_pdf, monkeypatch):
+        """Test a local-tier job is extracted locally, tagged, and planned for re-parse."""
+        monkeypatch.setitem(pipeline_config["llamaparse"], "premium_mode", True)
+        parser, req = self._run(pipeline_config, sample_pdf, LOCAL)
+        parser.get_json_result.assert_not_called()
+
+        records = [json.loads(line) for line in Path(req.JsonOutput).read_text().splitlines()]
+        assert [record["tier"] for record in records] == [LOCAL, LOCAL]
+        assert "sample PDF document" in records[0]["markdown"]
+        assert Path(req.MarkdownOutput).read_text().startswith("<!-- tier: local -->")
+        assert ledger().find_run("run1")["tier"] == LOCAL
+        assert not any((Path(pipeline_config["state"]["dir"]) / "pages").rglob("*.md"))
+
+        (item,) = plan_reprocess(ledger(), degraded=True)
+        assert item.reparse
+
+    def test_base_tier_outputs_are_untagged(self, pipeline_config, sample_pdf, monkeypatch):
+        """Test a job at the base tier is neither tagged nor planned for re-parse."""
+        monkeypatch.setitem(pipeline_config["llamaparse"], "premium_mode", True)
+        parser, req = self._run(pipeline_config, sample_pdf, None)
+        assert parser.premium_mode is True
+        assert "tier" not in json.loads(Path(req.JsonOutput).read_text().splitlines()[0])
+        assert ledger().find_run("run1")["tier"] == PREMIUM
+        assert plan_reprocess(ledger(), degraded=True) == []
+
+    def test_standard_tier_turns_off_premium_in_worker(self, pipeline_config, sample_pdf, monkeypatch):
+        """Test a standard-tier job asks the worker to parse without premium mode."""
+        monkeypatch.setitem(pipeline_config["llamaparse"], "premium_mode", True)
+        pool = Mock()
+        pool.call.return_value = [{"job_id": "j", "pages": [{"md": "One"}, {"md": "Two"}]}]
+        self._run(pipeline_config, sample_pdf, STANDARD, pool=pool)
+        assert pool.call.call_args.args[-1] is False
+        assert ledger().find_run("run1")["tier"] == STANDARD
@@ -0,0 +1,99 @@
+"""Tests for job traces and their replay."""
+
+import shutil
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from pdf_ingestion.ingest import ingest
+from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.trace import TraceRecord, TraceRecorder, read_traces, replay, trace_recorder
+
+
+def _burst(count, service_s=1.0, parse_s=0.5):
+    """``count`` jobs arriving together, each holding a worker for ``service_s``."""
+    return [TraceRecord(name=f"{n}.pdf", source="default", arrived_at=1000.0, dispatched_at=1000.0,
+                        finished_at=1000.0 + service_s, size_bytes=100, parse_s=parse_s)
+            for n in range(count)]
+
+
+class TestTraceRecorder:
+    """Test cases for TraceRecorder and read_traces."""
+
+    def test_round_trip_in_arrival_order(self, temp_dir):
+        """Test recorded jobs are read back sorted by arrival, across daily files."""
+        recorder = TraceRecorder(temp_dir)
+        late = TraceRecord("b.pdf", "default", arrived_at=200000.0, dispatched_at=200001.0, finished_at=200004.0,
+                           size_bytes=10, pages=3, parse_s=2.5, tier="local")
+        early = TraceRecord("a.pdf", "default", arrived_at=100.0, dispatched_at=103.0, finished_at=110.0)
+        recorder.record(late)
+        recorder.record(early)
+        paths = sorted(temp_dir.glob("trace-*.jsonl"))
+        assert len(paths) == 2
+        assert read_traces(paths) == [early, late]
+        assert early.wait_s == 3.0 and early.service_s == 7.0 and early.worker_s == 7.0
+
+    def test_torn_lines_are_skipped(self, temp_dir):
+        """Test a partial last line left by a crash does not stop the read."""
+        recorder = TraceRecorder(temp_dir)
+        record = TraceRecord("a.pdf", "default", arrived_at=100.0, dispatched_at=101.0, finished_at=102.0)
+        recorder.record(record)
+        path = recorder.path(record.finished_at)
+        with open(path, "a") as f:
+            f.write('{"name": "b.pdf", "sou')
+        assert read_traces([path]) == [record]
+
+    def test_disabled_by_default(self, pipeline_config, monkeypatch):
+        """Test nothing is recorded unless [trace] is enabled."""
+        assert trace_recorder() is None
+        monkeypatch.setitem(pipeline_config, "trace", {"enabled": True})
+        assert trace_recorder().path(0).parent == Path(pipeline_config["state"]["dir"]) / "traces"
+
+
+class TestReplay:
+    """Test cases for replay."""
+
+    def test_fewer_workers_wait_longer(self):
+        """Test a burst replayed on one worker queues while four workers absorb it."""
+        records = _burst(4)
+        single = replay(records, 1, speed=20)
+        wide = replay(records, 4, speed=20)
+        assert single.jobs == wide.jobs == 4
+        assert single.wait_max_s > 2.5 and single.makespan_s > 3.5
+        assert wide.wait_max_s < 0.5 and wide.makespan_s < 1.5
+        assert single.utilization > wide.utilization - 0.2
+
+    def test_poll_wait_does_not_hold_a_worker(self):
+        """Test polled jobs hold their worker for the held span only, so one worker overlaps their poll waits."""
+        records = [TraceRecord(name=f"{n}.pdf", source="default", arrived_at=1000.0, dispatched_at=1000.0,
+                               finished_at=1004.0, parse_s=3.6, held_s=0.4, poll_s=3.6) for n in range(4)]
+        assert records[0].worker_s == 0.4
+        result = replay(records, 1, speed=10)
+        # 4 x 0.4s on the worker, then the last 3.6s poll; 16s if the poll held it
+        assert result.makespan_s < 7.5
+        assert result.wait_max_s < 3.0
+        assert result.utilization < 0.5
+
+    def test_empty_trace(self):
+        """Test an empty trace replays to an empty result."""
+        result = replay([], 2)
+        assert result.jobs == 0 and result.wait_p95_s is None and result.jobs_per_hour == 0.0
+
+
+class TestParseTiming:
+    """Test cases for the parse time recorded by ingest."""
+
+    def test_run_records_parse_seconds(self, pipeline_config, sample_pdf):
+        """Test a synchronous run leaves the time spent parsing on the ingestor."""
+        shutil.copy(sample_pdf, Path(pipeline_config["input"]["dir"]) / "a.pdf")
+        req = PdfIngestionRequest(
+            PdfInput="a.pdf",
+            JsonOutput=pipeline_config["output"]["jsonl_file_format"].format(stem="a.pdf", cuid="run1"),
+            MarkdownOutput=pipeline_config["output"]["markdown_file_format"].format(stem="a.pdf", cuid="run1"),
+        )
+        parser = Mock()
+        parser.get_json_result.return_value = [{"job_id": "j", "pages": [{"md": "One"}, {"md": "Two"}]}]
+        with patch("pdf_ingestion.ingest.LlamaParse", return_value=parser), \
+                patch("pdf_ingestion.ingest.parser_pool", return_value=None):
+            ingestor = ingest("run1")
+            ingestor.run(req)
+        assert ingestor.parse_s is not None and ingestor.parse_s >= 0
@@ -0,0 +1,64 @@
+"""Tests for the memory-mapped upload stream."""
+
+import io
+
+import httpx
+import pytest
+
+from pdf_ingestion.upload import MappedUploadStream
+
+
+class TestMappedUploadStream:
+    """Test cases for MappedUploadStream."""
+
+    def test_reads_are_bounded_by_chunk_size(self, temp_dir):
+        """Test sized reads never exceed the chunk size and reassemble the file."""
+        payload = bytes(range(256)) * 1000
+        path = temp_dir / "large.pdf"
+        path.write_bytes(payload)
+        with MappedUploadStream(path, chunk_size=4096) as stream:
+            chunks = []
+            while chunk := stream.read(65536):
+                assert len(chunk) <= 4096
+                chunks.append(chunk)
+        assert b"".join(chunks) == payload
+
+    def test_seek_and_read_remainder(self, temp_dir):
+        """Test rewinding for retries and reading the remainder."""
+        path = temp_dir / "doc.pdf"
+        path.write_bytes(b"%PDF-1.4 body %%EOF")
+        with MappedUploadStream(path, chunk_size=4) as stream:
+            assert len(stream) == 19
+            assert stream.read(100) == b"%PDF"
+            assert stream.seek(0) == 0
+            assert stream.read() == b"%PDF-1.4 body %%EOF"
+            assert stream.seek(-5, io.SEEK_END) == 14
+            assert stream.read(10) == b"%%EO"
+
+    def test_empty_file(self, temp_dir):
+        """Test an empty file reads as EOF."""
+        path = temp_dir / "empty.pdf"
+        path.write_bytes(b"")
+        with MappedUploadStream(path) as stream:
+            assert stream.read(10) == b""
+
+    def test_closed_stream_raises(self, temp_dir):
+        """Test reading after close raises ValueError."""
+        path = temp_dir / "doc.pdf"
+        path.write_bytes(b"data")
+        stream = MappedUploadStream(path)
+        stream.close()
+        with pytest.raises(ValueError):
+            stream.read(1)
+
+    def test_httpx_multipart_streams_file(self, sample_pdf):
+        """Test httpx encodes the stream as a sized multipart upload."""
+        with MappedUploadStream(sample_pdf, chunk_size=1024) as stream:
+            request = httpx.Request(
+                "POST",
+                "https://parser.invalid/upload",
+                files={"file": (sample_pdf.name, stream, "application/pdf")},
+            )
+            body = b"".join(request.stream)
+        assert int(request.headers["Content-Length"]) == len(body)
+        assert sample_pdf.read_bytes() in body
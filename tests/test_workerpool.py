@@ -0,0 +1,186 @@
+"""Tests for the recycled worker process pool."""
+
+import os
+import shutil
+import threading
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from pdf_ingestion.breaker import HALF_OPEN, OPEN, parser_breaker
+from pdf_ingestion.errors import ParserUnavailable, WorkerLost
+from pdf_ingestion.ingest import ingest
+from pdf_ingestion.models import PdfIngestionRequest
+from pdf_ingestion.workerpool import PARSE, WorkerPool, parse_in_worker, rss_bytes
+
+_LEAKED = []
+
+
+def _pid(value=None):
+    return os.getpid(), value
+
+
+def _leak(nbytes):
+    _LEAKED.append(bytearray(nbytes))
+    return os.getpid()
+
+
+def _fail():
+    raise ValueError("bad page tree")
+
+
+def _exit():
+    os._exit(3)
+
+
+@pytest.fixture
+def pool_factory():
+    pools = []
+
+    def make(**kwargs):
+        pool = WorkerPool(preload=["pdf_ingestion.workerpool", __name__], **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+class TestWorkerPool:
+    """Test cases for WorkerPool."""
+
+    def test_calls_run_in_prewarmed_workers(self, pool_factory):
+        """Test workers are started up front and calls run outside this process."""
+        pool = pool_factory(processes=2)
+        assert len(pool.pids) == 2
+        pid, value = pool.call(_pid, "x")
+        assert value == "x"
+        assert pid != os.getpid() and pid in pool.pids
+
+    def test_worker_recycled_after_max_jobs(self, pool_factory):
+        """Test a worker is replaced after max_jobs calls."""
+        pool = pool_factory(processes=1, max_jobs=2)
+        pids = [pool.call(_pid)[0] for _ in range(5)]
+        assert pids[0] == pids[1] and pids[2] == pids[3]
+        assert len(set(pids)) == 3
+        assert pool.recycled == 2
+
+    def test_worker_recycled_over_rss_limit(self, pool_factory):
+        """Test a worker whose memory grows past max_rss_bytes is replaced."""
+        # The limit is relative to a fresh worker's memory, not this process's
+        probe = pool_factory(processes=1)
+        worker_rss = probe.call(rss_bytes)
+        probe.close()
+        pool = pool_factory(processes=1, max_rss_bytes=worker_rss + 64 * 1024 * 1024)
+        first = pool.call(_leak, 1024)
+        assert pool.call(_leak, 1024) == first
+        assert pool.call(_leak, 128 * 1024 * 1024) == first
+        assert pool.call(_leak, 1024) != first
+        assert pool.recycled == 1
+
+    def test_errors_propagate_and_worker_is_kept(self, pool_factory):
+        """Test an exception in the call is raised in the caller."""
+        pool = pool_factory(processes=1)
+        before = pool.pids
+        with pytest.raises(ValueError, match="bad page tree"):
+            pool.call(_fail)
+        assert pool.pids == before
+
+    def test_dead_worker_raises_worker_lost_and_is_replaced(self, pool_factory):
+        """Test a worker exiting mid-call is reported and a new one takes its place."""
+        pool = pool_factory(processes=1)
+        with pytest.raises(WorkerLost):
+            pool.call(_exit)
+        assert pool.call(_pid, 1)[1] == 1
+
+    def test_concurrent_callers_across_recycling(self, pool_factory):
+        """Test calls from many threads all complete while workers are recycled."""
+        pool = pool_factory(processes=2, max_jobs=3)
+        results = []
+        lock = threading.Lock()
+
+        def caller(n):
+            for i in range(5):
+                _, value = pool.call(_pid, (n, i))
+                with lock:
+                    results.append(value)
+
+        threads = [threading.Thread(target=caller, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(results) == [(n, i) for n in range(4) for i in range(5)]
+        assert pool.recycled >= 5
+
+
+class TestParserCallsInPool:
+    """Test cases for ingest sending parser calls to the worker pool."""
+
+    @pytest.fixture
+    def request_for(self, pipeline_config, sample_pdf):
+        shutil.copy(sample_pdf, Path(pipeline_config["input"]["dir"]) / "a.pdf")
+        return PdfIngestionRequest(
+            PdfInput="a.pdf",
+            JsonOutput=pipeline_config["output"]["jsonl_file_format"].format(stem="a.pdf", cuid="run1"),
+            MarkdownOutput=pipeline_config["output"]["markdown_file_format"].format(stem="a.pdf", cuid="run1"),
+        )
+
+    def _run(self, pool, req):
+        with patch("pdf_ingestion.ingest.parser_pool", return_value=pool), \
+                patch("pdf_ingestion.ingest.LlamaParse", return_value=Mock()):
+            ingest("run1").run(req)
+
+    def test_parse_runs_through_pool(self, pipeline_config, request_for):
+        """Test the parse call is handed to the pool with the file path and pages."""
+        pool = Mock()
+        pool.call.return_value = [{"job_id": "j", "pages": [{"page": 1, "md": "One"}]}]
+        self._run(pool, request_for)
+        fn, method, path, _, _ = pool.call.call_args.args
+        assert (fn, method, Path(path).name) == (parse_in_worker, PARSE, "a.pdf")
+        assert (Path(pipeline_config["processed"]["dir"]) / "a.pdf").exists()
+
+    def test_outage_in_worker_counts_against_breaker(self, pipeline_config, request_for, monkeypatch):
+        """Test a worker-side outage opens the circuit and holds the file."""
+        monkeypatch.setitem(pipeline_config, "circuit_breaker", {"failure_threshold": 1, "reset_timeout_s": 60})
+        pool = Mock()
+        pool.call.side_effect = ParserUnavailable("refused")
+        with pytest.raises(ParserUnavailable):
+            self._run(pool, request_for)
+        assert parser_breaker().state == OPEN
+        assert (Path(pipeline_config["input"]["dir"]) / "a.pdf").exists()
+
+    def test_lost_worker_defers_job(self, pipeline_config, request_for):
+        """Test a worker dying mid-parse defers the file instead of quarantining it."""
+        pool = Mock()
+        pool.call.side_effect = WorkerLost("worker exited")
+        with pytest.raises(WorkerLost):
+            self._run(pool, request_for)
+        assert parser_breaker().state != OPEN
+        assert (Path(pipeline_config["input"]["dir"]) / "a.pdf").exists()
+        assert not any(Path(pipeline_config["quarantine"]["dir"]).glob("*"))
+
+    def test_lost_worker_releases_half_open_probe(self, pipeline_config, request_for, monkeypatch):
+        """Test a worker dying during the half-open probe does not wedge the circuit."""
+        monkeypatch.setitem(pipeline_config, "circuit_breaker", {"failure_threshold": 1, "reset_timeout_s": 0})
+        parser_breaker().record_failure()
+        assert parser_breaker().state == HALF_OPEN
+        pool = Mock()
+        pool.call.side_effect = WorkerLost("worker exited")
+        with pytest.raises(WorkerLost):
+            self._run(pool, request_for)
+        assert parser_breaker().state == HALF_OPEN
+        assert parser_breaker().allow()
+
+    def test_refused_job_is_not_hashed(self, pipeline_config, request_for, monkeypatch):
+        """Test a job the half-open circuit refuses fails before its pages are hashed."""
+        monkeypatch.setitem(pipeline_config, "circuit_breaker", {"failure_threshold": 1, "reset_timeout_s": 0})
+        parser_breaker().record_failure()
+        assert parser_breaker().allow()  # another job holds the only probe
+        pool = Mock()
+        with patch("pdf_ingestion.ingest.ingest._page_hashes") as page_hashes, pytest.raises(ParserUnavailable):
+            self._run(pool, request_for)
+        page_hashes.assert_not_called()
+        pool.call.assert_not_called()